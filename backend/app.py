@@ -1,16 +1,60 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from sqlalchemy.orm import configure_mappers
 from datetime import timedelta
+import importlib
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+from .utils.user_cache import user_cache
+from .utils.hashing import password_hasher
+from .utils.write_behind import last_login_buffer
+from .utils.attendance_summary import register_summary_hooks
+from .utils.fee_ledger import register_ledger_hooks
+from .utils.snapshot_cache import snapshot_cache
+from .utils.concurrent_reads import concurrent_reads
+from .utils.json_provider import init_json_provider
+from .utils.request_metrics import request_metrics
+from .utils.profiler import sampling_profiler
+from .utils.job_queue import job_queue
+from .utils.announcement_feed import announcement_feed
+from .utils.engine import (
+    RoutingSession, READ_BIND_KEY, register_sqlite_transaction_hooks, register_routing_hooks,
+    configure_engine_options, apply_sqlite_pragmas, sqlite_pragmas
+)
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
-def create_app():
+# (module under backend.routes, blueprint attribute, URL prefix)
+BLUEPRINTS = [
+    ('auth_routes', 'auth_bp', '/api/auth'),
+    ('student_routes', 'student_bp', '/api/students'),
+    ('attendance_routes', 'attendance_bp', '/api/attendance'),
+    ('grade_routes', 'grade_bp', '/api/grades'),
+    ('fee_routes', 'fee_bp', '/api/fees'),
+    ('dashboard_routes', 'dashboard_bp', '/api/dashboard'),
+    ('report_routes', 'report_bp', '/api/reports'),
+    ('announcement_routes', 'announcement_bp', '/api/announcements'),
+    ('job_routes', 'job_bp', '/api/jobs'),
+    ('metrics_routes', 'metrics_bp', '/api/metrics'),
+    ('profiler_routes', 'profiler_bp', '/api/profiler'),
+]
+
+def register_blueprints(app, blueprints=BLUEPRINTS):
+    """Import and register each blueprint in ``blueprints``.
+
+    Route modules only import what every request needs; heavier
+    dependencies (numpy for grade analytics, the upsert constructs of
+    dialects not in use) are imported by the endpoints that need them.
+    """
+    for module, name, prefix in blueprints:
+        blueprint = getattr(importlib.import_module(f'.routes.{module}', __package__), name)
+        app.register_blueprint(blueprint, url_prefix=prefix)
+
+def create_app(config=None):
+    """The application; ``config`` overrides settings read from the environment."""
     app = Flask(__name__)
 
     # Configuration
@@ -19,248 +63,104 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+    app.config['DATABASE_READ_URL'] = os.environ.get('DATABASE_READ_URL')  # optional read replica
+    app.config['DB_ENGINE_PROFILE'] = os.environ.get('DB_ENGINE_PROFILE', 'auto')  # auto, sqlite, server, none
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config['SQLITE_BEGIN_MODE'] = os.environ.get('SQLITE_BEGIN_MODE', 'DEFERRED')  # write endpoints use IMMEDIATE regardless
+    app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 300))  # also how long token role claims are trusted
+    app.config['HASHING_POOL'] = os.environ.get('HASHING_POOL', 'thread')  # thread, process
+    app.config['HASHING_WORKERS'] = int(os.environ.get('HASHING_WORKERS', os.cpu_count() or 2))
+    app.config['HASHING_MAX_PENDING'] = int(os.environ.get('HASHING_MAX_PENDING', 64))
+    app.config['HASHING_RETRY_AFTER'] = int(os.environ.get('HASHING_RETRY_AFTER', 2))
+    app.config['LAST_LOGIN_FLUSH_INTERVAL'] = float(os.environ.get('LAST_LOGIN_FLUSH_INTERVAL', 5))
+    app.config['LAST_LOGIN_BATCH_SIZE'] = int(os.environ.get('LAST_LOGIN_BATCH_SIZE', 500))
+    app.config['FEE_GRACE_DAYS'] = int(os.environ.get('FEE_GRACE_DAYS', 0))
+    app.config['FEE_LATE_FEE_FLAT'] = float(os.environ.get('FEE_LATE_FEE_FLAT', 0))
+    app.config['FEE_LATE_FEE_RATE'] = float(os.environ.get('FEE_LATE_FEE_RATE', 0))
+    app.config['DASHBOARD_CACHE_TTL'] = float(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    app.config['DASHBOARD_CACHE_STALE_TTL'] = float(os.environ.get('DASHBOARD_CACHE_STALE_TTL', 600))
+    app.config['CONCURRENT_READ_WORKERS'] = int(os.environ.get('CONCURRENT_READ_WORKERS', 4))  # 1 disables
+    app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER', 'auto')  # auto, orjson, default
+    app.config['SQL_METRICS_ENABLED'] = os.environ.get('SQL_METRICS_ENABLED', 'true').lower() == 'true'
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+    app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # bearer token for Prometheus scrapes
+    app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    app.config['PROFILER_TOKEN'] = os.environ.get('PROFILER_TOKEN')  # X-Profile-Token value for one-request profiles
+    app.config['PROFILER_INTERVAL_MS'] = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    app.config['PROFILER_MAX_SECONDS'] = float(os.environ.get('PROFILER_MAX_SECONDS', 60))
+    app.config['JOBS_DATABASE_URL'] = os.environ.get('JOBS_DATABASE_URL')  # default: the app database
+    app.config['JOB_LEASE_SECONDS'] = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+    app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    app.config['JOB_RETRY_BASE_SECONDS'] = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 10))
+    app.config['JOB_RETRY_MAX_SECONDS'] = float(os.environ.get('JOB_RETRY_MAX_SECONDS', 3600))
+    app.config['FEED_CACHE_TTL'] = float(os.environ.get('FEED_CACHE_TTL', 30))  # check for other processes' writes
+    app.config['FEED_EVENT_LOG'] = int(os.environ.get('FEED_EVENT_LOG', 1000))  # events kept for reconnects
+    app.config['FEED_HEARTBEAT_SECONDS'] = float(os.environ.get('FEED_HEARTBEAT_SECONDS', 15))
+    app.config['FEED_MAX_STREAMS'] = int(os.environ.get('FEED_MAX_STREAMS', 32))  # per process, when threads hold them
+    app.config['FEED_STREAM_SECONDS'] = float(os.environ.get('FEED_STREAM_SECONDS', 300))
+    app.config['REPORT_CARD_DIR'] = os.environ.get('REPORT_CARD_DIR', os.path.join(app.instance_path, 'report_cards'))
+    app.config.update(config or {})
 
     # Initialize extensions with app
+    init_json_provider(app)
+    register_sqlite_transaction_hooks()
+    register_routing_hooks()
+    configure_engine_options(app)
     db.init_app(app)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            apply_sqlite_pragmas(
+                engine, sqlite_pragmas(app.config),
+                begin_mode='DEFERRED' if bind_key == READ_BIND_KEY else app.config['SQLITE_BEGIN_MODE']
+            )
     jwt.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    last_login_buffer.init_app(app)
+    snapshot_cache.init_app(app)
+    concurrent_reads.init_app(app)
+    request_metrics.init_app(app)
+    sampling_profiler.init_app(app)
+    job_queue.init_app(app)
+    announcement_feed.init_app(app)
+    register_summary_hooks()
+    register_ledger_hooks()
     CORS(app, origins=["http://localhost:3000", "https://your-frontend-domain.replit.app"])
 
-    # Register blueprints
-    from .routes.auth_routes import auth_bp
-    from .routes.student_routes import student_bp
-    from .routes.teacher_routes import teacher_bp
-    from .routes.class_routes import class_bp
-    from .routes.attendance_routes import attendance_bp
-    from .routes.grade_routes import grade_bp
-    from .routes.fee_routes import fee_bp
-    from .routes.dashboard_routes import dashboard_bp
-    from .routes.report_routes import report_bp
-
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(student_bp, url_prefix='/api/students')
-    app.register_blueprint(teacher_bp, url_prefix='/api/teachers')
-    app.register_blueprint(class_bp, url_prefix='/api/classes')
-    app.register_blueprint(attendance_bp, url_prefix='/api/attendance')
-    app.register_blueprint(grade_bp, url_prefix='/api/grades')
-    app.register_blueprint(fee_bp, url_prefix='/api/fees')
-    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
-    app.register_blueprint(report_bp, url_prefix='/api/reports')
-
-    # Database Models (moved from original app.py)
-    class User(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        email = db.Column(db.String(120), unique=True, nullable=False)
-        password_hash = db.Column(db.String(128))
-        first_name = db.Column(db.String(80), nullable=False)
-        last_name = db.Column(db.String(80), nullable=False)
-        role = db.Column(db.String(20), nullable=False)  # admin, principal, teacher, accountant, receptionist
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-        is_active = db.Column(db.Boolean, default=True)
-
-        def set_password(self, password):
-            self.password_hash = generate_password_hash(password)
-
-        def check_password(self, password):
-            return check_password_hash(self.password_hash, password)
-
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'email': self.email,
-                'firstName': self.first_name,
-                'lastName': self.last_name,
-                'role': self.role,
-                'isActive': self.is_active,
-                'createdAt': self.created_at.isoformat()
-            }
-
-    class Student(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        student_id = db.Column(db.String(20), unique=True, nullable=False)
-        first_name = db.Column(db.String(80), nullable=False)
-        last_name = db.Column(db.String(80), nullable=False)
-        email = db.Column(db.String(120), unique=True, nullable=False)
-        phone = db.Column(db.String(20))
-        address = db.Column(db.Text)
-        date_of_birth = db.Column(db.Date)
-        grade = db.Column(db.String(20), nullable=False)
-        enrollment_date = db.Column(db.DateTime, default=datetime.utcnow)
-        is_active = db.Column(db.Boolean, default=True)
-        guardian_name = db.Column(db.String(100))
-        guardian_phone = db.Column(db.String(20))
-        guardian_email = db.Column(db.String(120))
-
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'studentId': self.student_id,
-                'firstName': self.first_name,
-                'lastName': self.last_name,
-                'email': self.email,
-                'phone': self.phone,
-                'address': self.address,
-                'dateOfBirth': self.date_of_birth.isoformat() if self.date_of_birth else None,
-                'grade': self.grade,
-                'enrollmentDate': self.enrollment_date.isoformat(),
-                'isActive': self.is_active,
-                'guardianName': self.guardian_name,
-                'guardianPhone': self.guardian_phone,
-                'guardianEmail': self.guardian_email
-            }
-
-    class Teacher(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        teacher_id = db.Column(db.String(20), unique=True, nullable=False)
-        first_name = db.Column(db.String(80), nullable=False)
-        last_name = db.Column(db.String(80), nullable=False)
-        email = db.Column(db.String(120), unique=True, nullable=False)
-        phone = db.Column(db.String(20))
-        address = db.Column(db.Text)
-        subject = db.Column(db.String(100))
-        qualification = db.Column(db.String(200))
-        hire_date = db.Column(db.DateTime, default=datetime.utcnow)
-        salary = db.Column(db.Float)
-        is_active = db.Column(db.Boolean, default=True)
-
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'teacherId': self.teacher_id,
-                'firstName': self.first_name,
-                'lastName': self.last_name,
-                'email': self.email,
-                'phone': self.phone,
-                'address': self.address,
-                'subject': self.subject,
-                'qualification': self.qualification,
-                'hireDate': self.hire_date.isoformat(),
-                'salary': self.salary,
-                'isActive': self.is_active
-            }
-
-    class Class(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        name = db.Column(db.String(100), nullable=False)
-        grade = db.Column(db.String(20), nullable=False)
-        section = db.Column(db.String(10), nullable=False)
-        teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'))
-        room_number = db.Column(db.String(10))
-        capacity = db.Column(db.Integer, default=30)
-        is_active = db.Column(db.Boolean, default=True)
-
-        teacher = db.relationship('Teacher', backref='classes')
-
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'name': self.name,
-                'grade': self.grade,
-                'section': self.section,
-                'teacherId': self.teacher_id,
-                'teacherName': f"{self.teacher.first_name} {self.teacher.last_name}" if self.teacher else None,
-                'roomNumber': self.room_number,
-                'capacity': self.capacity,
-                'isActive': self.is_active
-            }
-
-    class Attendance(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-        class_id = db.Column(db.Integer, db.ForeignKey('class.id'), nullable=False)
-        date = db.Column(db.Date, nullable=False)
-        status = db.Column(db.String(20), nullable=False)  # present, absent, late
-        marked_by = db.Column(db.Integer, db.ForeignKey('user.id'))
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-        student = db.relationship('Student', backref='attendances')
-        class_ = db.relationship('Class', backref='attendances')
-        marked_by_user = db.relationship('User', backref='marked_attendances')
-
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'studentId': self.student_id,
-                'studentName': f"{self.student.first_name} {self.student.last_name}",
-                'classId': self.class_id,
-                'className': self.class_.name,
-                'date': self.date.isoformat(),
-                'status': self.status,
-                'markedBy': self.marked_by,
-                'createdAt': self.created_at.isoformat()
-            }
-
-    class Grade(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-        subject = db.Column(db.String(100), nullable=False)
-        exam_type = db.Column(db.String(50), nullable=False)  # quiz, midterm, final, assignment
-        marks_obtained = db.Column(db.Float, nullable=False)
-        total_marks = db.Column(db.Float, nullable=False)
-        grade_letter = db.Column(db.String(2))
-        semester = db.Column(db.String(20))
-        academic_year = db.Column(db.String(10))
-        teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'))
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-        student = db.relationship('Student', backref='grades')
-        teacher = db.relationship('Teacher', backref='grades_given')
-
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'studentId': self.student_id,
-                'studentName': f"{self.student.first_name} {self.student.last_name}",
-                'subject': self.subject,
-                'examType': self.exam_type,
-                'marksObtained': self.marks_obtained,
-                'totalMarks': self.total_marks,
-                'gradeLetter': self.grade_letter,
-                'percentage': round((self.marks_obtained / self.total_marks) * 100, 2),
-                'semester': self.semester,
-                'academicYear': self.academic_year,
-                'teacherId': self.teacher_id,
-                'teacherName': f"{self.teacher.first_name} {self.teacher.last_name}" if self.teacher else None,
-                'createdAt': self.created_at.isoformat()
-            }
-
-    class Fee(db.Model):
-        id = db.Column(db.Integer, primary_key=True)
-        student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-        fee_type = db.Column(db.String(50), nullable=False)  # tuition, library, lab, transport
-        amount = db.Column(db.Float, nullable=False)
-        due_date = db.Column(db.Date, nullable=False)
-        paid_amount = db.Column(db.Float, default=0)
-        status = db.Column(db.String(20), default='Pending')  # Pending, Paid, Overdue, Partial
-        payment_date = db.Column(db.DateTime)
-        payment_method = db.Column(db.String(50))
-        semester = db.Column(db.String(20))
-        academic_year = db.Column(db.String(10))
-        created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # One model registry: every table is declared in backend.models
+    from . import models  # noqa: F401
+    register_blueprints(app)
 
-        student = db.relationship('Student', backref='fees')
+    @app.route('/api/health', methods=['GET'])
+    def health():
+        return jsonify({'status': 'ok'}), 200
 
-        def to_dict(self):
-            return {
-                'id': self.id,
-                'studentId': self.student_id,
-                'studentName': f"{self.student.first_name} {self.student.last_name}",
-                'feeType': self.fee_type,
-                'amount': self.amount,
-                'dueDate': self.due_date.isoformat(),
-                'paidAmount': self.paid_amount,
-                'status': self.status,
-                'paymentDate': self.payment_date.isoformat() if self.payment_date else None,
-                'paymentMethod': self.payment_method,
-                'semester': self.semester,
-                'academicYear': self.academic_year,
-                'createdAt': self.created_at.isoformat()
-            }
+    # Configure the mappers now rather than on the first query, so that a
+    # preloading server (gunicorn --preload) forks workers that start warm
+    configure_mappers()
     return app
 
 def init_database(app):
     with app.app_context():
         from .models import User
+        from .utils.search import ensure_student_search_index
+        from .utils.engine import create_missing_columns, create_missing_indexes
         db.create_all()
+        create_missing_columns(db.engine, db.metadata)
+        create_missing_indexes(db.engine, db.metadata)
+        ensure_student_search_index(db.engine)
 
         # Create default admin user if not exists
         admin = User.query.filter_by(email='admin@emsu.edu').first()
@@ -0,0 +1,169 @@
+
+"""ASGI entry point, for serving the app from an event-loop server:
+
+    uvicorn backend.asgi:app --workers 4 --limit-concurrency 5000
+
+The server's event loop holds the client connections (idle keep-alives
+included) and each request runs the usual synchronous handlers on a
+bounded thread pool, so thousands of open connections no longer need
+thousands of threads. ``ASGI_THREADS`` caps the requests running at once
+per process; leave room for it in DB_POOL_SIZE and DB_MAX_OVERFLOW.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from .app import create_app
+from .utils.announcement_feed import ASYNC_STREAMS_KEY, ASYNC_STREAM_KEY
+
+# Request bodies larger than this are spooled to disk (spreadsheet imports)
+MAX_MEMORY_BODY = 1024 * 1024
+
+class WsgiAsgiAdapter:
+    """Serves a WSGI application to an ASGI server.
+
+    The request body is read on the event loop, then the WSGI call and the
+    iteration over its response run on the adapter's thread pool. Each
+    body chunk is handed back to the loop and awaited before the next one
+    is produced, so streamed exports keep their backpressure and stop when
+    the client goes away.
+
+    Long-lived event streams would hold a pool thread each, so views can
+    hand them over instead: a view that finds ``ASYNC_STREAMS_KEY`` in the
+    environ may return just the headers and put a coroutine function under
+    ``ASYNC_STREAM_KEY``, which the adapter then awaits on the event loop.
+    """
+
+    def __init__(self, wsgi_app, threads=64):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-request')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+
+        body = SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        length = body.tell()
+        body.seek(0)
+
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, body, length)
+        environ[ASYNC_STREAMS_KEY] = True
+        try:
+            stream = await loop.run_in_executor(self._executor, self._run, environ, send, loop)
+        finally:
+            body.close()
+        if stream is not None:
+            await stream(send, receive)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _run(self, environ, send, loop):
+        """Worker thread: call the application and relay its response.
+
+        Returns the view's async stream, if it handed one over, with the
+        response still open.
+        """
+        started = []
+        pending = []
+
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            pending[:] = [{
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+                ]
+            }]
+
+        def start():
+            if not started:
+                emit(pending[0])
+                started.append(True)
+
+        response = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in response:
+                if chunk:
+                    start()
+                    emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            start()
+            stream = environ.get(ASYNC_STREAM_KEY)
+            if stream is None:
+                emit({'type': 'http.response.body', 'body': b''})
+            return stream
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+def build_environ(scope, body, length):
+    """The PEP 3333 environ for an ASGI HTTP ``scope`` and its buffered ``body``."""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI strings are the raw bytes decoded as latin-1
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        # The body has been read in full, chunked or not
+        'CONTENT_LENGTH': str(length)
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name == 'CONTENT_TYPE':
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+def create_asgi_app(threads=None):
+    return WsgiAsgiAdapter(create_app(), threads or int(os.environ.get('ASGI_THREADS', 64)))
+
+app = create_asgi_app()
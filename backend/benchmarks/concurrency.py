@@ -0,0 +1,239 @@
+
+"""Connection scaling: many concurrent clients against one server.
+
+Each level in ``--clients`` opens that many keep-alive connections at
+once. Every connection then sends ``--requests`` requests for ``--path``
+back to back. Reported per level: how many clients connected, errors,
+throughput, and latency percentiles measured from the client's side.
+Without ``--url``, a synthetic school is seeded into a temporary SQLite
+file and served by the threaded development server in a child process,
+one thread per connection. To measure the ASGI entry point (see
+``backend/asgi.py``), start it against the same kind of data and pass
+its address:
+
+    uvicorn backend.asgi:app --port 8000
+    python -m backend.benchmarks.concurrency --url http://127.0.0.1:8000 --token ...
+
+Run it once with each server to compare how they cope as the number of
+clients grows.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def _show(value):
+    return '-' if value is None else value
+
+async def _read_response(reader):
+    """Status code and whether the connection stays open after one HTTP/1.x response."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Server closed the connection')
+    version, status = status_line.split(b' ', 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return int(status), False
+    keep_alive = version == b'HTTP/1.1' and headers.get('connection') != 'close'
+    return int(status), keep_alive
+
+async def _client(host, port, request, requests, connect_timeout, samples, errors, start):
+    await start.wait()
+    connection = None
+    for _ in range(requests):
+        try:
+            if connection is None:
+                connection = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+            reader, writer = connection
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+            samples.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(str(status))
+            if not keep_alive:
+                writer.close()
+                connection = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(type(e).__name__)
+            if connection is not None:
+                connection[1].close()
+                connection = None
+    if connection is not None:
+        connection[1].close()
+
+async def run_level(host, port, path, headers, clients, requests=5, connect_timeout=30):
+    """Run ``clients`` concurrent connections of ``requests`` requests each."""
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+        + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        + '\r\n'
+    ).encode('latin-1')
+    samples = []
+    errors = []
+    start = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_client(host, port, request, requests, connect_timeout, samples, errors, start))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+
+    latencies = sorted(sample * 1000 for sample in samples)
+    error_counts = {}
+    for error in errors:
+        error_counts[error] = error_counts.get(error, 0) + 1
+    return {
+        'clients': clients,
+        'requests': clients * requests,
+        'completed': len(samples),
+        'errors': len(errors),
+        'errorKinds': error_counts,
+        'seconds': round(wall, 2),
+        'throughputRps': round(len(samples) / wall, 1) if wall else None,
+        'latencyMs': {
+            'p50': round(_percentile(latencies, 50), 2) if latencies else None,
+            'p95': round(_percentile(latencies, 95), 2) if latencies else None,
+            'p99': round(_percentile(latencies, 99), 2) if latencies else None,
+            'max': round(latencies[-1], 2) if latencies else None
+        }
+    }
+
+def _serve(database_url, config, port_pipe):
+    """Child process: the benchmark app on the threaded development server."""
+    import logging
+    from werkzeug.serving import make_server
+    from .query_plans import build_app
+
+    app = build_app(database_url, **config)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    # Room for every level's connections to queue while threads start
+    server.socket.listen(4096)
+    port_pipe.send(server.server_port)
+    server.serve_forever()
+
+def _raise_open_file_limit(clients):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = clients * 2 + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+        if limit < wanted:
+            print(f'Open file limit is {limit}; expect connection errors above {(limit - 256) // 2} clients')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', help='Server to test (default: start one on a synthetic school).')
+    parser.add_argument('--token', help='Bearer token to send with --url.')
+    parser.add_argument('--path', default='/api/dashboard', help='Request every client sends.')
+    parser.add_argument('--clients', default='10,100,500,1000,2000',
+                        help='Comma-separated numbers of concurrent connections, one level each.')
+    parser.add_argument('--requests', type=int, default=5, help='Requests per connection.')
+    parser.add_argument('--connect-timeout', type=float, default=30)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=20, help='Days of attendance to generate.')
+    parser.add_argument('--cache', action='store_true', help='Keep the dashboard snapshot cache on.')
+    parser.add_argument('-o', '--output', help='Write the JSON report here.')
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.clients.split(',')]
+    _raise_open_file_limit(max(levels))
+
+    server = None
+    directory = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+        server_name = args.url
+    else:
+        from ..app import db
+        from .query_plans import build_app, admin_headers
+        from .synthetic import seed_synthetic_school
+
+        directory = tempfile.mkdtemp(prefix='emsu-concurrency-')
+        database_url = f"sqlite:///{os.path.join(directory, 'concurrency.db')}"
+        app = build_app(database_url)
+        with app.app_context():
+            db.create_all()
+            print(f'Seeding {args.students} students...')
+            seed_synthetic_school(db.engine, students=args.students, school_days=args.days)
+            for engine in db.engines.values():
+                engine.dispose()
+        headers = admin_headers(app)
+
+        # Fork before any thread starts; the server gets the CPU to itself
+        config = {'DASHBOARD_CACHE_TTL': 60, 'DASHBOARD_CACHE_STALE_TTL': 600} if args.cache else {}
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        server = multiprocessing.get_context('fork').Process(
+            target=_serve, args=(database_url, config, sender), daemon=True
+        )
+        server.start()
+        host, port = '127.0.0.1', receiver.recv()
+        server_name = 'threaded development server'
+
+    print(f'{server_name}: GET {args.path}, {args.requests} requests per connection')
+    print(f"{'clients':>8} {'completed':>10} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    results = []
+    try:
+        for clients in levels:
+            stats = asyncio.run(run_level(host, port, args.path, headers, clients, args.requests,
+                                          args.connect_timeout))
+            results.append(stats)
+            latency = stats['latencyMs']
+            print(f"{clients:>8} {stats['completed']:>10} {stats['errors']:>7} "
+                  f"{_show(stats['throughputRps']):>9} {_show(latency['p50']):>9} {_show(latency['p95']):>9} "
+                  f"{_show(latency['p99']):>9} {_show(latency['max']):>9}")
+            if stats['errorKinds']:
+                print(f"{'':>8} errors: {stats['errorKinds']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+        if directory:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({'server': server_name, 'path': args.path, 'levels': results}, handle, indent=2)
+            handle.write('\n')
+    return 1 if any(stats['completed'] == 0 for stats in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
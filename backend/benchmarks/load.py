@@ -0,0 +1,323 @@
+
+"""Load harness: concurrent clients against the real endpoints.
+
+Builds a synthetic school (see ``synthetic.py``), then runs each scenario
+in ``SCENARIOS`` with ``--concurrency`` clients sharing ``--requests``
+requests, and writes a JSON report of latency percentiles, throughput,
+SQL statements and response size per endpoint. Reports from two commits
+can be compared:
+
+    python -m backend.benchmarks.load --students 20000 -o before.json
+    python -m backend.benchmarks.load --students 20000 -o after.json
+    python -m backend.benchmarks.load --compare before.json after.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import sqlalchemy
+from flask import g
+from sqlalchemy import select
+from .query_plans import build_app, admin_headers
+
+_today = date.today()
+_recent = (_today - timedelta(days=7)).isoformat()
+
+def _mark_class_body(app):
+    """A full roll call for class 5 today, so every request rewrites the same rows."""
+    from ..app import db
+    from ..models.attendance import Attendance
+    from ..models.student import Student
+
+    with app.app_context():
+        student_ids = db.session.execute(
+            select(Attendance.student_id).distinct()
+            .join(Student, Student.id == Attendance.student_id)
+            .where(Attendance.class_id == 5, Student.is_active == True)
+        ).scalars().all()
+    statuses = ('present', 'late', 'absent')
+    return {
+        'classId': 5,
+        'date': _today.isoformat(),
+        'records': [
+            {'studentId': student_id, 'status': statuses[index % len(statuses)]}
+            for index, student_id in enumerate(sorted(student_ids))
+        ]
+    }
+
+# (name, method, url, body factory or None)
+SCENARIOS = [
+    ('students: first page', 'GET', '/api/students', None),
+    ('students: roster fields', 'GET', '/api/students?grade=7&per_page=100&fields=id,studentId,firstName,lastName', None),
+    ('students: cursor', 'GET', '/api/students?after=&grade=7', None),
+    ('students: search', 'GET', '/api/students?search=Last12', None),
+    ('attendance: class on a day', 'GET', f'/api/attendance?classId=5&date={_recent}', None),
+    ('attendance: summary', 'GET', f'/api/attendance/summary?classId=5&from={_recent}', None),
+    ('attendance: mark class', 'POST', '/api/attendance/bulk', _mark_class_body),
+    ('grades: student', 'GET', '/api/grades?studentId=42', None),
+    ('grades: analytics', 'GET', f'/api/grades/analytics?grade=7&academicYear={_today.year}', None),
+    ('fees: overdue', 'GET', '/api/fees?status=Overdue', None),
+    ('fees: summary', 'GET', '/api/fees/summary?groupBy=grade', None),
+    ('announcements: active', 'GET', '/api/announcements', None),
+    ('dashboard: school', 'GET', '/api/dashboard', None),
+    ('export: class attendance', 'GET', '/api/reports/attendance/export?classId=5', None),
+]
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def _show(value):
+    return '-' if value is None else value
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class _QueryCounter:
+    """Statements per request, read from the request's SQL metrics.
+
+    ``g.sql_stats`` already includes the statements that ``concurrent_reads``
+    ran on its worker threads, which a cursor listener on the client thread
+    would miss. Flask runs teardown functions in reverse order, so this one
+    sees the stats before ``request_metrics`` takes them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def __enter__(self):
+        # Straight onto the list: teardown_request() refuses once the app has served a request
+        self.app.teardown_request_funcs.setdefault(None, []).append(self._collect)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.app.teardown_request_funcs[None].remove(self._collect)
+
+    def _collect(self, exc):
+        stats = g.get('sql_stats')
+        if stats is not None:
+            self._local.count = getattr(self._local, 'count', 0) + stats.queries
+
+    def take(self):
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+def run_scenario(app, headers, counter, method, url, body=None, requests=200, concurrency=4, warmup=5):
+    """Send ``requests`` requests from ``concurrency`` threads; returns the endpoint's stats."""
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def send(client):
+        started = time.perf_counter()
+        response = client.open(url, method=method, headers=headers, json=body)
+        size = len(response.get_data())
+        return time.perf_counter() - started, response.status_code, size
+
+    def worker():
+        client = app.test_client()
+        counter.take()
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            elapsed, status, size = send(client)
+            queries = counter.take()
+            with lock:
+                if status >= 400:
+                    errors.append(status)
+                else:
+                    samples.append((elapsed, queries, size))
+
+    client = app.test_client()
+    for _ in range(warmup):
+        send(client)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    sizes = [size for _, _, size in samples]
+    return {
+        'method': method,
+        'url': url,
+        'requests': requests,
+        'errors': len(errors),
+        'errorStatuses': sorted(set(errors)),
+        'throughputRps': round(len(samples) / wall, 1) if wall else None,
+        'latencyMs': {
+            'p50': round(_percentile(latencies, 50), 2) if latencies else None,
+            'p95': round(_percentile(latencies, 95), 2) if latencies else None,
+            'p99': round(_percentile(latencies, 99), 2) if latencies else None,
+            'max': round(latencies[-1], 2) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else None
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 1) if queries else None,
+            'max': max(queries) if queries else None
+        },
+        'responseBytes': round(sum(sizes) / len(sizes)) if sizes else None
+    }
+
+def run(app, scenarios=None, requests=200, concurrency=4, warmup=5, out=sys.stdout):
+    """Run every scenario in turn; returns ``{name: stats}``."""
+    headers = admin_headers(app)
+    results = {}
+    with _QueryCounter(app) as counter:
+        for name, method, url, body_factory in (SCENARIOS if scenarios is None else scenarios):
+            body = body_factory(app) if body_factory else None
+            stats = run_scenario(
+                app, headers, counter, method, url, body,
+                requests=requests, concurrency=concurrency, warmup=warmup
+            )
+            results[name] = stats
+            latency = stats['latencyMs']
+            print(
+                f"{name:<32} p50 {_show(latency['p50']):>8} ms  p95 {_show(latency['p95']):>8} ms  "
+                f"p99 {_show(latency['p99']):>8} ms  {_show(stats['throughputRps']):>8} req/s  "
+                f"{_show(stats['queries']['mean']):>5} queries  {stats['errors']} errors",
+                file=out
+            )
+    return results
+
+def compare(before, after, threshold=None, out=sys.stdout):
+    """Print p95, throughput and query changes between two reports.
+
+    Returns the scenarios whose p95 grew by more than ``threshold`` percent.
+    """
+    print(f"{'scenario':<32} {'p95 before':>11} {'p95 after':>10} {'change':>8} "
+          f"{'req/s before':>13} {'req/s after':>12} {'queries':>11}", file=out)
+    regressions = []
+    for name, new in after['endpoints'].items():
+        old = before['endpoints'].get(name)
+        if old is None:
+            print(f'{name:<32} (new)', file=out)
+            continue
+        old_p95, new_p95 = old['latencyMs']['p95'], new['latencyMs']['p95']
+        change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 and new_p95 is not None else None
+        if threshold is not None and change is not None and change > threshold:
+            regressions.append(name)
+        print(
+            f"{name:<32} {_show(old_p95):>11} {_show(new_p95):>10} "
+            f"{'' if change is None else f'{change:+.1f}%':>8} "
+            f"{_show(old['throughputRps']):>13} {_show(new['throughputRps']):>12} "
+            f"{_show(old['queries']['mean']):>5} -> {_show(new['queries']['mean']):<4}",
+            file=out
+        )
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database-url', help='Database to run against. Without --no-seed it must be '
+                                               'empty (default: a temporary SQLite file).')
+    parser.add_argument('--no-seed', action='store_true', help='Use the data already in --database-url.')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=30, help='Days of attendance to generate.')
+    parser.add_argument('--years', type=int, default=1, help='Academic years of grades and fees.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients.')
+    parser.add_argument('--warmup', type=int, default=5, help='Unrecorded requests per scenario.')
+    parser.add_argument('--only', action='append', default=[], help='Run scenarios whose name contains this.')
+    parser.add_argument('--cache', action='store_true', help='Keep the dashboard snapshot cache on.')
+    parser.add_argument('-o', '--output', help='Write the JSON report here.')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two reports and exit.')
+    parser.add_argument('--fail-over', type=float, default=None,
+                        help='With --compare, exit 1 if any p95 grew by more than this many percent.')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            regressions = compare(json.load(before), json.load(after), args.fail_over)
+        return 1 if regressions else 0
+
+    from ..app import db
+    from .synthetic import seed_synthetic_school
+    import backend.models  # noqa: F401  (registers every table)
+
+    directory = None
+    database_url = args.database_url
+    if not database_url:
+        directory = tempfile.mkdtemp(prefix='emsu-load-')
+        database_url = f"sqlite:///{os.path.join(directory, 'load.db')}"
+
+    config = {'DASHBOARD_CACHE_TTL': 60, 'DASHBOARD_CACHE_STALE_TTL': 600} if args.cache else {}
+    app = build_app(database_url, **config)
+    seed_seconds = None
+    if not args.no_seed:
+        with app.app_context():
+            db.create_all()
+            print(f'Seeding {args.students} students...')
+            started = time.perf_counter()
+            seed_synthetic_school(db.engine, students=args.students, school_days=args.days,
+                                  seed=args.seed, years=args.years)
+            seed_seconds = round(time.perf_counter() - started, 2)
+
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if not args.only or any(part in scenario[0] for part in args.only)
+    ]
+    try:
+        results = run(app, scenarios, requests=args.requests, concurrency=args.concurrency,
+                      warmup=args.warmup)
+    finally:
+        with app.app_context():
+            dialect = db.engine.dialect.name
+            for engine in db.engines.values():
+                engine.dispose()
+        if directory:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    report = {
+        'meta': {
+            'generatedAt': datetime.utcnow().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'database': dialect,
+            'students': None if args.no_seed else args.students,
+            'days': None if args.no_seed else args.days,
+            'years': None if args.no_seed else args.years,
+            'seed': args.seed,
+            'seedSeconds': seed_seconds,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'dashboardCache': args.cache
+        },
+        'endpoints': results
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+            handle.write('\n')
+        print(f'Report written to {args.output}')
+    return 1 if any(stats['errors'] for stats in results.values()) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+
+"""Query-plan regression harness for the hot list and report endpoints.
+
+Builds a synthetic school (see ``synthetic.py``), calls every case in
+``CASES`` through the test client, captures each SELECT it runs and checks
+the plan. A full scan of a large table fails the run unless the case
+explicitly allows it (an unfiltered export has to read everything).
+
+    python -m backend.benchmarks.query_plans --students 20000 -v
+
+The test suite runs every case against its own seeded app as well
+(``tests/test_benchmarks.py``).
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+# Lookup tables small enough that scanning them is the right plan
+SMALL_TABLES = {'user', 'teacher', 'class', 'fee_ledger'}
+
+_today = date.today()
+_recent = (_today - timedelta(days=7)).isoformat()
+
+# (name, url, tables allowed to be scanned)
+CASES = [
+    ('students: first page', '/api/students', ()),
+    ('students: by grade', '/api/students?grade=7', ()),
+    ('students: cursor', '/api/students?after=&grade=7', ()),
+    ('students: search', '/api/students?search=Last12', ()),
+    ('students: search cursor', '/api/students?after=&search=First15', ()),
+    ('attendance: class on a day', f'/api/attendance?classId=5&date={_recent}', ()),
+    ('attendance: student history', '/api/attendance?studentId=42', ()),
+    ('attendance: class range', f'/api/attendance?classId=5&from={_recent}&to={_today.isoformat()}', ()),
+    ('attendance: day', f'/api/attendance?date={_recent}', ()),
+    ('attendance: summary', f'/api/attendance/summary?classId=5&from={_recent}', ()),
+    ('attendance: at risk', '/api/attendance/summary/at-risk?classId=5&days=30', ()),
+    ('grades: student', '/api/grades?studentId=42', ()),
+    ('grades: student term', '/api/grades?studentId=42&academicYear=%d&semester=1' % _today.year, ()),
+    ('grades: teacher', '/api/grades?teacherId=3', ()),
+    ('grades: analytics', '/api/grades/analytics?grade=7&academicYear=%d' % _today.year, ()),
+    ('fees: student', '/api/fees?studentId=42', ()),
+    ('fees: overdue', '/api/fees?status=Overdue', ()),
+    ('fees: summary', '/api/fees/summary?groupBy=grade', ()),
+    ('announcements: active', '/api/announcements', ()),
+    ('announcements: audience', '/api/announcements?audience=students', ()),
+    ('dashboard: school', '/api/dashboard', ()),
+    ('dashboard: class', '/api/dashboard?classId=5', ()),
+    ('export: class attendance', '/api/reports/attendance/export?classId=5', ()),
+    ('export: student grades', '/api/reports/grades/export?studentId=42', ()),
+    ('export: overdue fees', '/api/reports/fees/export?status=Overdue', ()),
+    ('export: fee register', '/api/reports/fees/export', ('fee',)),
+]
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+# ``student AS student_1``: SQLite's plans name the alias, not the table
+_TABLE_ALIAS = re.compile(r'"?(\w+)"? AS "?(\w+)"?')
+
+# On top of create_app's production settings
+HARNESS_CONFIG = {
+    'JWT_SECRET_KEY': 'benchmark-harness-secret-key-0123456789',
+    # Only the database under test, whatever the environment points at
+    'DATABASE_READ_URL': None,
+    'JOBS_DATABASE_URL': None,
+    # Every request has to reach the database
+    'DASHBOARD_CACHE_TTL': 0,
+    'DASHBOARD_CACHE_STALE_TTL': 0,
+    # Per-request SQL counts for the load harness, without a warning for every seeding insert
+    'SLOW_QUERY_MS': 60 * 1000
+}
+
+def build_app(database_url, **config):
+    """The production app from ``create_app`` on ``database_url``.
+
+    ``config`` overrides any setting, e.g. ``DASHBOARD_CACHE_TTL=60``.
+    """
+    from ..app import create_app
+
+    return create_app({**HARNESS_CONFIG, 'SQLALCHEMY_DATABASE_URI': database_url, **config})
+
+def admin_headers(app):
+    """Authorization headers for the first admin user."""
+    from ..utils.user_cache import user_claims
+    from ..models.user import User
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin').first()
+        token = create_access_token(identity=str(admin.id), additional_claims=user_claims(admin))
+    return {'Authorization': f'Bearer {token}'}
+
+def plan_for(connection, statement, parameters):
+    """The plan lines for one captured statement."""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()
+    return [row[0] for row in rows]
+
+def table_aliases(statement):
+    """``{alias: table}`` for the aliased tables in ``statement``."""
+    return {alias: table for table, alias in _TABLE_ALIAS.findall(statement)}
+
+def full_scans(plan, aliases=None):
+    """Tables ``plan`` reads in full, by table name even where it shows an alias."""
+    aliases = aliases or {}
+    tables = set()
+    for line in plan:
+        match = _SQLITE_SCAN.match(line.strip()) or _POSTGRES_SCAN.search(line)
+        if match:
+            tables.add(aliases.get(match.group(1), match.group(1)))
+    return tables
+
+def run(app, cases=None, verbose=False, out=sys.stdout):
+    from ..app import db
+    from ..utils.snapshot_cache import snapshot_cache
+
+    headers = admin_headers(app)
+    with app.app_context():
+        large_tables = set(db.metadata.tables) - SMALL_TABLES
+        # Read-only endpoints may run on the read bind
+        engines = list(db.engines.values())
+
+    cases = CASES if cases is None else cases
+    captured = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')) and not executemany:
+            captured.append((connection.engine, statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    client = app.test_client()
+    failures = []
+    try:
+        for name, url, allowed in cases:
+            snapshot_cache.clear()
+            del captured[:]
+            response = client.get(url, headers=headers)
+            response.get_data()
+            if response.status_code != 200:
+                failures.append((name, f'HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}'))
+                print(f'FAIL  {name}: HTTP {response.status_code}', file=out)
+                continue
+
+            statements = list(captured)
+            problems = []
+            for engine, statement, parameters in statements:
+                with engine.connect() as connection:
+                    plan = plan_for(connection, statement, parameters)
+                scanned = (full_scans(plan, table_aliases(statement)) & large_tables) - set(allowed)
+                if scanned:
+                    problems.append((statement, plan, scanned))
+                if verbose:
+                    print(f'      {" ".join(statement.split())}', file=out)
+                    for line in plan:
+                        print(f'        {line}', file=out)
+
+            if problems:
+                tables = sorted(set().union(*(scanned for _, _, scanned in problems)))
+                failures.append((name, f"full scan of {', '.join(tables)}"))
+                print(f"FAIL  {name}: full scan of {', '.join(tables)}", file=out)
+                for statement, plan, _ in problems:
+                    print(f'      {" ".join(statement.split())[:200]}', file=out)
+                    for line in plan:
+                        print(f'        {line}', file=out)
+            else:
+                print(f'ok    {name} ({len(statements)} queries)', file=out)
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database-url', help='Empty database to build the synthetic school in '
+                                               '(default: a temporary SQLite file).')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=30, help='School days of attendance to generate.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every statement and its plan.')
+    args = parser.parse_args(argv)
+
+    from ..app import db
+    from .synthetic import seed_synthetic_school
+    import backend.models  # noqa: F401  (registers every table)
+
+    directory = None
+    database_url = args.database_url
+    if not database_url:
+        directory = tempfile.mkdtemp(prefix='emsu-plans-')
+        database_url = f"sqlite:///{os.path.join(directory, 'plans.db')}"
+
+    app = build_app(database_url)
+    with app.app_context():
+        db.create_all()
+        print(f'Seeding {args.students} students...')
+        seed_synthetic_school(db.engine, students=args.students, school_days=args.days)
+
+    failures = run(app, verbose=args.verbose)
+    print(f'\n{len(CASES) - len(failures)}/{len(CASES)} cases use indexed plans')
+    if directory:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+
+"""Startup check: cold start to first response, with an import profile.
+
+Runs a fresh interpreter under ``python -X importtime`` that imports the
+app, calls ``create_app()`` against an empty SQLite file and sends one
+request, then reports where the time went: imports (slowest modules and
+top-level packages by self time), ``create_app()`` and the first
+response. With ``--budget-ms`` the exit status is 1 when cold start to
+first response takes longer, so CI can hold the line:
+
+    python -m backend.benchmarks.startup --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+# Runs in the child; prints one JSON line of timings
+_CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from backend.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+responded = time.perf_counter()
+print(json.dumps({
+    'importMs': (imported - started) * 1000,
+    'createAppMs': (created - imported) * 1000,
+    'firstResponseMs': (responded - created) * 1000,
+    'status': response.status_code,
+    'routes': len(list(app.url_map.iter_rules()))
+}))
+'''
+
+def parse_importtime(stderr):
+    """``(module, self_us, cumulative_us, depth)`` for each line of -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return modules
+
+def measure(path='/api/health', python=sys.executable):
+    """Start a fresh interpreter and time it up to the response to ``path``."""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory(prefix='emsu-startup-') as directory:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'startup.db')}")
+        env.pop('DATABASE_READ_URL', None)
+        result = subprocess.run(
+            [python, '-X', 'importtime', '-c', _CHILD, path],
+            capture_output=True, text=True, cwd=root, env=env
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f'Startup failed:\n{result.stderr[-4000:]}')
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+    packages = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        packages[name.split('.')[0]] += self_us
+    timings['totalMs'] = timings['importMs'] + timings['createAppMs'] + timings['firstResponseMs']
+    timings['modules'] = len(modules)
+    timings['importTimeMs'] = sum(self_us for _, self_us, _, _ in modules) / 1000
+    timings['slowestModules'] = [
+        {'module': name, 'selfMs': self_us / 1000, 'cumulativeMs': cumulative_us / 1000}
+        for name, self_us, cumulative_us, _ in sorted(modules, key=lambda module: -module[1])
+    ]
+    timings['packages'] = [
+        {'package': name, 'selfMs': self_us / 1000}
+        for name, self_us in sorted(packages.items(), key=lambda item: -item[1])
+    ]
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--path', default='/api/health', help='Request to time as the first response.')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to start; the fastest counts.')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules and packages to list.')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Exit 1 if cold start to first response takes longer than this.')
+    parser.add_argument('-o', '--output', help='Write the JSON report here.')
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.path) for _ in range(args.runs)]
+    best = min(runs, key=lambda run: run['totalMs'])
+
+    print(f"{'package':<28} {'self ms':>9}")
+    for package in best['packages'][:args.top]:
+        print(f"{package['package']:<28} {package['selfMs']:>9.1f}")
+    print()
+    print(f"{'module':<48} {'self ms':>9} {'cumul. ms':>10}")
+    for module in best['slowestModules'][:args.top]:
+        print(f"{module['module']:<48} {module['selfMs']:>9.1f} {module['cumulativeMs']:>10.1f}")
+    print()
+    print(f"{best['modules']} modules imported in {best['importTimeMs']:.1f} ms (-X importtime self total)")
+    print(f"import backend.app    {best['importMs']:>8.1f} ms")
+    print(f"create_app()          {best['createAppMs']:>8.1f} ms  ({best['routes']} routes)")
+    print(f"first response ({best['status']})  {best['firstResponseMs']:>8.1f} ms  {args.path}")
+    print(f"cold start total      {best['totalMs']:>8.1f} ms  (best of {args.runs})")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({'best': best, 'totalsMs': [run['totalMs'] for run in runs]}, handle, indent=2)
+            handle.write('\n')
+    if best['status'] >= 400:
+        print(f"{args.path} answered {best['status']}")
+        return 1
+    if args.budget_ms is not None and best['totalMs'] > args.budget_ms:
+        print(f"Over the startup budget of {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
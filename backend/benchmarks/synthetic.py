@@ -0,0 +1,211 @@
+"""Deterministic synthetic school data for benchmarks and plan checks.
+
+    python -m backend.benchmarks.synthetic --database-url sqlite:///school.db \
+        --students 50000 --days 180 --years 3
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+SUBJECTS = ('Mathematics', 'Science', 'English', 'History', 'Geography', 'Art', 'Music', 'Physical Education')
+EXAM_TYPES = ('quiz', 'assignment', 'midterm', 'project', 'final')
+FEE_TYPES = ('tuition', 'library', 'lab', 'transport', 'exam')
+FEE_STATUSES = ('Pending', 'Paid', 'Partial', 'Overdue', 'Waived')
+ATTENDANCE_STATUSES = ('present', 'present', 'present', 'present', 'late', 'absent', 'excused')
+DEPARTMENTS = ('Mathematics', 'Science', 'Languages', 'Humanities', 'Arts', 'Sports')
+SECTIONS = ('A', 'B', 'C', 'D')
+GRADE_LEVELS = tuple(str(level) for level in range(1, 13))
+
+def _batches(rows, size=5000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _insert(connection, table, rows):
+    """executemany in batches; returns the number of rows inserted."""
+    count = 0
+    for batch in _batches(rows):
+        connection.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+def seed_synthetic_school(engine, students=5000, school_days=30, seed=42, teachers=None,
+                          years=1, assessments=8):
+    """Fill an empty schema with a deterministic synthetic school.
+
+    Volumes scale with ``students``: ``assessments`` grades and three fees
+    per student for each of the last ``years`` academic years, and one
+    attendance row per student for each of the last ``school_days`` days.
+    ``teachers`` defaults to one per 25 students. Rows go in through Core
+    ``executemany`` batches, so no ORM objects are built. The attendance
+    summary and fee ledger are rebuilt at the end and the planner
+    statistics refreshed. Returns the row count per table.
+    """
+    from ..models.user import User
+    from ..models.teacher import Teacher
+    from ..models.class_model import Class
+    from ..models.student import Student
+    from ..models.grade import Grade
+    from ..models.attendance import Attendance
+    from ..models.fee import Fee
+    from ..models.announcement import Announcement
+    from ..utils.attendance_summary import rebuild_attendance_summary
+    from ..utils.fee_ledger import rebuild_fee_ledger
+
+    rng = random.Random(seed)
+    today = date.today()
+    start = today - timedelta(days=school_days)
+    teacher_count = teachers or max(students // 25, 12)
+    academic_year = str(today.year)
+    # Oldest first; the current year's assessments fall within the attendance window
+    terms = [
+        (str(year), date(year, 1, 15) if year < today.year else start,
+         300 if year < today.year else max(school_days, 1))
+        for year in range(today.year - years + 1, today.year + 1)
+    ]
+    counts = {}
+
+    with engine.begin() as connection:
+        counts[User.__tablename__] = _insert(connection, User.__table__, ({
+            'email': f'staff{i}@school.test',
+            'password_hash': 'x',
+            'first_name': 'Staff',
+            'last_name': str(i),
+            'role': ('admin', 'principal', 'teacher', 'accountant', 'receptionist')[i % 5],
+            'is_active': True
+        } for i in range(50)))
+        counts[Teacher.__tablename__] = _insert(connection, Teacher.__table__, ({
+            'teacher_id': f'T{i:05d}',
+            'first_name': f'Teacher{i}',
+            'last_name': f'Surname{i % 300}',
+            'email': f'teacher{i}@school.test',
+            'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+            'is_active': i % 40 != 0
+        } for i in range(teacher_count)))
+        counts[Class.__tablename__] = _insert(connection, Class.__table__, ({
+            'name': f'{level}{section}',
+            'grade': level,
+            'section': section,
+            'teacher_id': 1 + (index % teacher_count),
+            'academic_year': academic_year,
+            'is_active': True
+        } for index, (level, section) in enumerate(
+            (level, section) for level in GRADE_LEVELS for section in SECTIONS
+        )))
+        counts[Student.__tablename__] = _insert(connection, Student.__table__, ({
+            'student_id': f'S{i:07d}',
+            'first_name': f'First{rng.randrange(2000)}',
+            'last_name': f'Last{rng.randrange(5000)}',
+            'email': f'student{i}@school.test',
+            'grade': GRADE_LEVELS[i % len(GRADE_LEVELS)],
+            'is_active': rng.random() > 0.03,
+            'enrollment_date': datetime(today.year - 1, 9, 1)
+        } for i in range(students)))
+
+        class_ids = {
+            (level, section): 1 + index
+            for index, (level, section) in enumerate(
+                (level, section) for level in GRADE_LEVELS for section in SECTIONS
+            )
+        }
+
+        def student_class(student_id):
+            return class_ids[(GRADE_LEVELS[(student_id - 1) % len(GRADE_LEVELS)],
+                              SECTIONS[(student_id - 1) // len(GRADE_LEVELS) % len(SECTIONS)])]
+
+        counts[Grade.__tablename__] = _insert(connection, Grade.__table__, ({
+            'student_id': student_id,
+            'subject': SUBJECTS[(student_id + j) % len(SUBJECTS)],
+            'exam_type': EXAM_TYPES[j % len(EXAM_TYPES)],
+            'marks_obtained': float(rng.randrange(20, 101)),
+            'total_marks': 100.0,
+            'semester': str(1 + j % 2),
+            'academic_year': term_year,
+            'teacher_id': 1 + rng.randrange(teacher_count),
+            'exam_date': term_start + timedelta(days=rng.randrange(term_days)),
+            'weight': (1.0, 1.0, 2.0, 1.5, 3.0)[j % 5],
+            'created_at': datetime.combine(term_start, datetime.min.time()) + timedelta(hours=rng.randrange(term_days * 24))
+        } for term_year, term_start, term_days in terms
+          for student_id in range(1, students + 1) for j in range(assessments)))
+
+        counts[Attendance.__tablename__] = _insert(connection, Attendance.__table__, ({
+            'student_id': student_id,
+            'class_id': student_class(student_id),
+            'date': start + timedelta(days=day),
+            'status': rng.choice(ATTENDANCE_STATUSES),
+            'marked_by': 1
+        } for day in range(school_days) for student_id in range(1, students + 1)))
+
+        counts[Fee.__tablename__] = _insert(connection, Fee.__table__, ({
+            'student_id': student_id,
+            'fee_type': FEE_TYPES[j % len(FEE_TYPES)],
+            'amount': float(rng.choice((50, 120, 300, 1500))),
+            'due_date': term_start + timedelta(days=rng.randrange(-60, 60)),
+            'paid_amount': float(rng.choice((0, 0, 50, 120))),
+            'status': rng.choice(FEE_STATUSES),
+            'semester': str(1 + j % 2),
+            'academic_year': term_year,
+            'discount_amount': 0.0,
+            'late_fee': 0.0
+        } for term_year, term_start, _ in terms
+          for student_id in range(1, students + 1) for j in range(3)))
+
+        counts[Announcement.__tablename__] = _insert(connection, Announcement.__table__, ({
+            'title': f'Announcement {i}',
+            'content': 'Synthetic announcement body',
+            'author_id': 1 + i % 50,
+            'target_audience': ('all', 'students', 'teachers', 'parents')[i % 4],
+            'priority': ('low', 'normal', 'high', 'urgent')[i % 4],
+            # Years of history, of which only the latest few are still live
+            'is_active': i >= 4900 and i % 5 != 0,
+            'created_at': datetime.combine(today, datetime.min.time()) - timedelta(hours=5000 - i),
+            'expires_at': None if i % 3 else datetime.combine(today, datetime.min.time()) + timedelta(days=i % 60 - 30)
+        } for i in range(5000)))
+
+        rebuild_attendance_summary(connection)
+        rebuild_fee_ledger(connection)
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql('ANALYZE')
+        connection.commit()
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Seed an empty database with a synthetic school.')
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--teachers', type=int, default=None, help='Default: one per 25 students.')
+    parser.add_argument('--days', type=int, default=30, help='Days of attendance to generate.')
+    parser.add_argument('--years', type=int, default=1, help='Academic years of grades and fees.')
+    parser.add_argument('--assessments', type=int, default=8, help='Grades per student per year.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine
+    from ..app import db
+    from ..utils.engine import register_sqlite_transaction_hooks
+    import backend.models  # noqa: F401  (registers every table)
+
+    register_sqlite_transaction_hooks()
+    engine = create_engine(args.database_url)
+    db.metadata.create_all(engine)
+    started = time.perf_counter()
+    counts = seed_synthetic_school(
+        engine, students=args.students, school_days=args.days, seed=args.seed,
+        teachers=args.teachers, years=args.years, assessments=args.assessments
+    )
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f'{table:>14} {count:>10}')
+    print(f'Seeded {sum(counts.values())} rows in {elapsed:.1f}s')
+    engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,16 @@ from .student import Student
 from .teacher import Teacher
 from .class_model import Class
 from .attendance import Attendance
+from .attendance_summary import AttendanceSummary
 from .grade import Grade
 from .fee import Fee
+from .fee_ledger import FeeLedger
 from .subject import Subject
 from .announcement import Announcement
 from .event import Event
+from .job import Job
 
 __all__ = [
-    'User', 'Student', 'Teacher', 'Class', 'Attendance', 
-    'Grade', 'Fee', 'Subject', 'Announcement', 'Event'
+    'User', 'Student', 'Teacher', 'Class', 'Attendance', 'AttendanceSummary',
+    'Grade', 'Fee', 'FeeLedger', 'Subject', 'Announcement', 'Event', 'Job'
 ]
@@ -11,9 +11,16 @@ class Announcement(db.Model):
     priority = db.Column(db.String(20), default='normal')  # low, normal, high, urgent
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     expires_at = db.Column(db.DateTime)
     attachment_url = db.Column(db.String(255))
 
+    __table_args__ = (
+        # The live feed only ever reads active announcements, newest first
+        db.Index('ix_announcement_active_id', 'id', 'target_audience',
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+    )
+
     author = db.relationship('User', backref='announcements')
 
     def to_dict(self):
@@ -26,7 +33,7 @@ class Announcement(db.Model):
             'targetAudience': self.target_audience,
             'priority': self.priority,
             'isActive': self.is_active,
-            'createdAt': self.created_at.isoformat(),
-            'expiresAt': self.expires_at.isoformat() if self.expires_at else None,
+            'createdAt': self.created_at,
+            'expiresAt': self.expires_at,
             'attachmentUrl': self.attachment_url
         }
@@ -10,10 +10,19 @@ class Attendance(db.Model):
     status = db.Column(db.String(20), nullable=False)  # present, absent, late, excused
     marked_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     notes = db.Column(db.Text)
     time_in = db.Column(db.Time)
     time_out = db.Column(db.Time)
 
+    __table_args__ = (
+        # One mark per student per class per day; target of the bulk upsert
+        db.UniqueConstraint('student_id', 'class_id', 'date', name='uq_attendance_student_class_date'),
+        # Class registers by day or date range, and whole-school days
+        db.Index('ix_attendance_class_date', 'class_id', 'date'),
+        db.Index('ix_attendance_date', 'date'),
+    )
+
     student = db.relationship('Student', backref='attendances')
     class_ = db.relationship('Class', backref='attendances')
     marked_by_user = db.relationship('User', backref='marked_attendances')
@@ -25,11 +34,11 @@ class Attendance(db.Model):
             'studentName': f"{self.student.first_name} {self.student.last_name}",
             'classId': self.class_id,
             'className': self.class_.name,
-            'date': self.date.isoformat(),
+            'date': self.date,
             'status': self.status,
             'markedBy': self.marked_by,
             'notes': self.notes,
-            'timeIn': self.time_in.isoformat() if self.time_in else None,
-            'timeOut': self.time_out.isoformat() if self.time_out else None,
-            'createdAt': self.created_at.isoformat()
+            'timeIn': self.time_in,
+            'timeOut': self.time_out,
+            'createdAt': self.created_at
         }
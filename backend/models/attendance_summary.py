@@ -0,0 +1,42 @@
+
+from ..app import db
+
+class AttendanceSummary(db.Model):
+    """Attendance counts per student and class for one day or one month.
+
+    Maintained incrementally on every attendance write (see
+    ``utils/attendance_summary.py``) and rebuildable from the raw table.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
+    class_id = db.Column(db.Integer, db.ForeignKey('class.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # day, month
+    period_start = db.Column(db.Date, nullable=False)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    excused = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'class_id', 'period', 'period_start',
+                            name='uq_attendance_summary_key'),
+        db.Index('ix_attendance_summary_period', 'period', 'period_start'),
+    )
+
+    def to_dict(self):
+        total = self.present + self.absent + self.late + self.excused
+        attended = self.present + self.late
+        counted = attended + self.absent
+        return {
+            'id': self.id,
+            'studentId': self.student_id,
+            'classId': self.class_id,
+            'period': self.period,
+            'periodStart': self.period_start,
+            'present': self.present,
+            'absent': self.absent,
+            'late': self.late,
+            'excused': self.excused,
+            'total': total,
+            'attendanceRate': round(attended / counted * 100, 2) if counted else None
+        }
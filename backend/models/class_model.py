@@ -1,4 +1,5 @@
 
+from datetime import datetime
 from ..app import db
 
 class Class(db.Model):
@@ -12,6 +13,12 @@ class Class(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     schedule = db.Column(db.Text)  # JSON string for class schedule
     academic_year = db.Column(db.String(10))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Newest change, for list ETags that include class names
+        db.Index('ix_class_updated_at', 'updated_at'),
+    )
 
     teacher = db.relationship('Teacher', backref='classes')
 
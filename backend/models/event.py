@@ -22,13 +22,13 @@ class Event(db.Model):
             'id': self.id,
             'title': self.title,
             'description': self.description,
-            'eventDate': self.event_date.isoformat(),
-            'endDate': self.end_date.isoformat() if self.end_date else None,
+            'eventDate': self.event_date,
+            'endDate': self.end_date,
             'location': self.location,
             'eventType': self.event_type,
             'organizerId': self.organizer_id,
             'organizerName': f"{self.organizer.first_name} {self.organizer.last_name}" if self.organizer else None,
             'isPublic': self.is_public,
             'maxParticipants': self.max_participants,
-            'createdAt': self.created_at.isoformat()
+            'createdAt': self.created_at
         }
@@ -15,11 +15,21 @@ class Fee(db.Model):
     semester = db.Column(db.String(20))
     academic_year = db.Column(db.String(10))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     transaction_id = db.Column(db.String(100))
     discount_amount = db.Column(db.Float, default=0)
     late_fee = db.Column(db.Float, default=0)
+    late_fee_applied_at = db.Column(db.DateTime)  # set once the fee engine has charged the late fee
     receipt_number = db.Column(db.String(50))
 
+    __table_args__ = (
+        # A student's fees for a term, registers by status (in id order),
+        # and the status engine's due-date sweeps
+        db.Index('ix_fee_student_term', 'student_id', 'academic_year', 'semester'),
+        db.Index('ix_fee_status_id', 'status', 'id'),
+        db.Index('ix_fee_status_due_date', 'status', 'due_date'),
+    )
+
     student = db.relationship('Student', backref='fees')
 
     def to_dict(self):
@@ -29,10 +39,10 @@ class Fee(db.Model):
             'studentName': f"{self.student.first_name} {self.student.last_name}",
             'feeType': self.fee_type,
             'amount': self.amount,
-            'dueDate': self.due_date.isoformat(),
+            'dueDate': self.due_date,
             'paidAmount': self.paid_amount,
             'status': self.status,
-            'paymentDate': self.payment_date.isoformat() if self.payment_date else None,
+            'paymentDate': self.payment_date,
             'paymentMethod': self.payment_method,
             'semester': self.semester,
             'academicYear': self.academic_year,
@@ -40,5 +50,5 @@ class Fee(db.Model):
             'discountAmount': self.discount_amount,
             'lateFee': self.late_fee,
             'receiptNumber': self.receipt_number,
-            'createdAt': self.created_at.isoformat()
+            'createdAt': self.created_at
         }
@@ -0,0 +1,41 @@
+
+from ..app import db
+
+class FeeLedger(db.Model):
+    """Running fee totals per grade, fee type, semester and academic year.
+
+    Maintained in the same transaction as every fee write (see
+    ``utils/fee_ledger.py``). Missing semesters and years are stored as ''
+    so they still form one unique key.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    grade = db.Column(db.String(20), nullable=False, default='')
+    fee_type = db.Column(db.String(50), nullable=False)
+    semester = db.Column(db.String(20), nullable=False, default='')
+    academic_year = db.Column(db.String(10), nullable=False, default='')
+    fee_count = db.Column(db.Integer, nullable=False, default=0)
+    billed = db.Column(db.Float, nullable=False, default=0)
+    discount = db.Column(db.Float, nullable=False, default=0)
+    late_fees = db.Column(db.Float, nullable=False, default=0)
+    collected = db.Column(db.Float, nullable=False, default=0)
+    outstanding = db.Column(db.Float, nullable=False, default=0)
+    overdue = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('grade', 'fee_type', 'semester', 'academic_year', name='uq_fee_ledger_key'),
+    )
+
+    def to_dict(self):
+        return {
+            'grade': self.grade or None,
+            'feeType': self.fee_type,
+            'semester': self.semester or None,
+            'academicYear': self.academic_year or None,
+            'feeCount': self.fee_count,
+            'billed': round(self.billed, 2),
+            'discount': round(self.discount, 2),
+            'lateFees': round(self.late_fees, 2),
+            'collected': round(self.collected, 2),
+            'outstanding': round(self.outstanding, 2),
+            'overdue': round(self.overdue, 2)
+        }
@@ -14,10 +14,18 @@ class Grade(db.Model):
     academic_year = db.Column(db.String(10))
     teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     exam_date = db.Column(db.Date)
     remarks = db.Column(db.Text)
     weight = db.Column(db.Float, default=1.0)  # Weight for calculating overall grade
 
+    __table_args__ = (
+        # A student's marks for a term, a teacher's gradebook, recent activity
+        db.Index('ix_grade_student_term', 'student_id', 'academic_year', 'semester'),
+        db.Index('ix_grade_teacher_id', 'teacher_id'),
+        db.Index('ix_grade_created_at', 'created_at'),
+    )
+
     student = db.relationship('Student', backref='grades')
     teacher = db.relationship('Teacher', backref='grades_given')
 
@@ -36,8 +44,8 @@ class Grade(db.Model):
             'academicYear': self.academic_year,
             'teacherId': self.teacher_id,
             'teacherName': f"{self.teacher.first_name} {self.teacher.last_name}" if self.teacher else None,
-            'examDate': self.exam_date.isoformat() if self.exam_date else None,
+            'examDate': self.exam_date,
             'remarks': self.remarks,
             'weight': self.weight,
-            'createdAt': self.created_at.isoformat()
+            'createdAt': self.created_at
         }
@@ -0,0 +1,39 @@
+from datetime import datetime
+from ..app import db
+from ..utils.engine import JOBS_BIND_KEY
+
+class Job(db.Model):
+    """A unit of background work and its progress (see ``utils/job_queue.py``).
+
+    Lives on the jobs bind: the app database unless JOBS_DATABASE_URL
+    points it at a file of its own, so it has no foreign keys. Payload and
+    result are JSON text.
+    """
+    __bind_key__ = JOBS_BIND_KEY
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed, cancelled
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not before; pushed back on retry
+    locked_by = db.Column(db.String(100))
+    lease_expires_at = db.Column(db.DateTime)
+    progress_done = db.Column(db.Integer)
+    progress_total = db.Column(db.Integer)
+    progress_message = db.Column(db.String(200))
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Workers look for the best runnable job, and for expired leases
+        db.Index('ix_job_claim', 'status', 'priority', 'run_at'),
+        db.Index('ix_job_lease', 'status', 'lease_expires_at'),
+    )
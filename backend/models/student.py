@@ -1,6 +1,8 @@
 
 from datetime import datetime
+from sqlalchemy import event
 from ..app import db
+from ..utils.search import create_student_search_index
 
 class Student(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -22,6 +24,15 @@ class Student(db.Model):
     emergency_contact = db.Column(db.String(20))
     transport_mode = db.Column(db.String(50))  # bus, private, walking
     blood_group = db.Column(db.String(5))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination order for the active roster
+        db.Index('ix_student_active_last_name_id', 'is_active', 'last_name', 'id'),
+        db.Index('ix_student_active_grade', 'is_active', 'grade'),
+        # Newest change, for list ETags that include student names
+        db.Index('ix_student_updated_at', 'updated_at'),
+    )
 
     def to_dict(self):
         return {
@@ -32,9 +43,9 @@ class Student(db.Model):
             'email': self.email,
             'phone': self.phone,
             'address': self.address,
-            'dateOfBirth': self.date_of_birth.isoformat() if self.date_of_birth else None,
+            'dateOfBirth': self.date_of_birth,
             'grade': self.grade,
-            'enrollmentDate': self.enrollment_date.isoformat(),
+            'enrollmentDate': self.enrollment_date,
             'isActive': self.is_active,
             'guardianName': self.guardian_name,
             'guardianPhone': self.guardian_phone,
@@ -45,3 +56,5 @@ class Student(db.Model):
             'transportMode': self.transport_mode,
             'bloodGroup': self.blood_group
         }
+
+event.listen(Student.__table__, 'after_create', create_student_search_index)
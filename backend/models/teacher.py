@@ -21,6 +21,12 @@ class Teacher(db.Model):
     specialization = db.Column(db.String(200))
     emergency_contact = db.Column(db.String(20))
     blood_group = db.Column(db.String(5))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Newest change, for list ETags that include teacher names
+        db.Index('ix_teacher_updated_at', 'updated_at'),
+    )
 
     def to_dict(self):
         return {
@@ -33,7 +39,7 @@ class Teacher(db.Model):
             'address': self.address,
             'subject': self.subject,
             'qualification': self.qualification,
-            'hireDate': self.hire_date.isoformat(),
+            'hireDate': self.hire_date,
             'salary': self.salary,
             'isActive': self.is_active,
             'profilePicture': self.profile_picture,
@@ -1,7 +1,7 @@
 
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from ..app import db
+from ..utils.hashing import password_hasher
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,16 +11,22 @@ class User(db.Model):
     last_name = db.Column(db.String(80), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # admin, principal, teacher, accountant, receptionist
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     profile_picture = db.Column(db.String(255))
     phone = db.Column(db.String(20))
     last_login = db.Column(db.DateTime)
 
+    __table_args__ = (
+        # Newest change, for list ETags that include author names
+        db.Index('ix_user_updated_at', 'updated_at'),
+    )
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
     def to_dict(self):
         return {
@@ -32,6 +38,6 @@ class User(db.Model):
             'isActive': self.is_active,
             'profilePicture': self.profile_picture,
             'phone': self.phone,
-            'lastLogin': self.last_login.isoformat() if self.last_login else None,
-            'createdAt': self.created_at.isoformat()
+            'lastLogin': self.last_login,
+            'createdAt': self.created_at
         }
@@ -0,0 +1,179 @@
+
+from functools import partial
+from flask import Blueprint, Response, current_app, request, jsonify
+from sqlalchemy import insert
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from ..models.announcement import Announcement
+from ..utils.decorators import current_role, read_replica
+from ..utils.pagination import InvalidCursor, DEFAULT_LIMIT, MAX_LIMIT
+from ..utils.serializers import get_serializer, paginated_list, requested_fields
+from ..utils.http_cache import (
+    collection_validators, content_validators, is_not_modified, not_modified_response, with_validators
+)
+from ..utils.announcement_feed import announcement_feed, Subscription, ASYNC_STREAMS_KEY, ASYNC_STREAM_KEY
+from ..utils.job_queue import job_type
+from ..utils.snapshot_cache import note_tables_changed
+from ..app import db
+
+announcement_bp = Blueprint('announcements', __name__)
+
+AUDIENCES = ('all', 'students', 'teachers', 'parents')
+
+@announcement_bp.route('', methods=['GET'])
+@jwt_required()
+@read_replica
+def get_announcements():
+    try:
+        serializer = get_serializer('announcement')
+        stmt, fields = serializer.select(requested_fields(), current_role()[0])
+
+        audience = request.args.get('audience')
+        if audience:
+            stmt = stmt.where(Announcement.target_audience.in_([audience, 'all']))
+        if request.args.get('priority'):
+            stmt = stmt.where(Announcement.priority == request.args['priority'])
+        if request.args.get('includeInactive', 'false').lower() != 'true':
+            stmt = stmt.where(
+                Announcement.is_active == True,
+                (Announcement.expires_at == None) | (Announcement.expires_at > datetime.utcnow())
+            )
+
+        validators = collection_validators(
+            db.session, stmt, Announcement, related=serializer.related_models(fields), fields=fields
+        )
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+
+        result = paginated_list(
+            db.session, serializer, stmt, fields, [Announcement.id], 'announcements', total=validators.total
+        )
+        return with_validators(jsonify(result), validators), 200
+
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+def _feed_audience():
+    audience = request.args.get('audience') or None
+    if audience is not None and audience not in AUDIENCES:
+        raise ValueError(f"audience must be one of {', '.join(AUDIENCES)}")
+    return audience
+
+@announcement_bp.route('/feed', methods=['GET'])
+@jwt_required()
+def get_feed():
+    """Live announcements for an audience, most urgent and newest first.
+
+    Served from the in-process feed (``utils/announcement_feed.py``), so a
+    page costs no query. ``lastEventId`` is where a client opening the
+    event stream should start.
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+        # Taken first: a change racing the page is replayed, never missed
+        last_event_id = announcement_feed.event_id()
+        items, next_cursor = announcement_feed.page(_feed_audience(), request.args.get('after'), limit)
+
+        validators = content_validators(last_event_id, *[item['id'] for item in items])
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+        return with_validators(jsonify({
+            'announcements': items,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'lastEventId': last_event_id
+        }), validators), 200
+
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@announcement_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_feed():
+    """Server-sent events for the feed: ``announcement``, ``expired``, ``removed``.
+
+    EventSource cannot set headers, so the token may come as ``?jwt=``.
+    Pass the feed's ``lastEventId`` (or let the browser send Last-Event-ID
+    on reconnect) to get every event since; a ``reset`` event means the
+    feed should be reloaded. Under the ASGI server streams wait on the
+    event loop; otherwise each holds a thread, so they are capped at
+    FEED_MAX_STREAMS and closed after FEED_STREAM_SECONDS for the client
+    to reconnect.
+    """
+    try:
+        subscription = Subscription(
+            _feed_audience(), request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+        )
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        dumps = current_app.json.dumps
+        # Bring the feed up to date here, not on the event loop
+        announcement_feed.refresh()
+
+        if request.environ.get(ASYNC_STREAMS_KEY):
+            request.environ[ASYNC_STREAM_KEY] = partial(announcement_feed.stream_async, subscription, dumps)
+            return Response(iter(()), mimetype='text/event-stream', headers=headers)
+
+        if not announcement_feed.open_stream():
+            return jsonify({'message': 'Too many open streams, try again shortly'}), 503, {'Retry-After': '5'}
+        response = Response(announcement_feed.stream(subscription, dumps), mimetype='text/event-stream', headers=headers)
+        response.call_on_close(announcement_feed.close_stream)
+        return response
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+PRIORITIES = ('low', 'normal', 'high', 'urgent')
+PUBLISH_BATCH_SIZE = 500
+
+def _announcement_row(item, author_id, now):
+    missing = [key for key in ('title', 'content', 'targetAudience') if not item.get(key)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    if item['targetAudience'] not in AUDIENCES:
+        raise ValueError(f"targetAudience must be one of {', '.join(AUDIENCES)}")
+    if item.get('priority', 'normal') not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    return {
+        'title': item['title'][:200],
+        'content': item['content'],
+        'author_id': author_id,
+        'target_audience': item['targetAudience'],
+        'priority': item.get('priority', 'normal'),
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now,
+        'expires_at': datetime.fromisoformat(item['expiresAt']) if item.get('expiresAt') else None,
+        'attachment_url': item.get('attachmentUrl')
+    }
+
+def _validate_publish_job(payload):
+    items = payload.get('announcements')
+    if not isinstance(items, list) or not items:
+        raise ValueError('announcements must be a non-empty list')
+    now = datetime.utcnow()
+    for index, item in enumerate(items):
+        try:
+            _announcement_row(item, None, now)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f'announcements[{index}]: {e}')
+
+@job_type('publish-announcements', roles=('admin', 'principal'), validate=_validate_publish_job)
+def publish_announcements_job(payload, job):
+    """Insert a batch of announcements, authored by whoever queued the job."""
+    if job.created_by is None:
+        raise ValueError('Announcements need an author; queue the job as a user')
+    items = payload['announcements']
+    now = datetime.utcnow()
+    rows = [_announcement_row(item, job.created_by, now) for item in items]
+    for start in range(0, len(rows), PUBLISH_BATCH_SIZE):
+        db.session.execute(insert(Announcement), rows[start:start + PUBLISH_BATCH_SIZE])
+        note_tables_changed(db.session, 'announcement')
+        db.session.commit()
+        job.progress(min(start + PUBLISH_BATCH_SIZE, len(rows)), len(rows), 'announcements published')
+    return {'published': len(rows)}
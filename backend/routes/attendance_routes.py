@@ -0,0 +1,250 @@
+
+import click
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from ..models.attendance import Attendance
+from ..models.attendance_summary import AttendanceSummary
+from ..models.class_model import Class
+from ..models.student import Student
+from ..utils.decorators import role_required, current_role, read_replica, write_transaction
+from ..utils.upsert import upsert_statement, UnsupportedDialect
+from ..utils.pagination import InvalidCursor
+from ..utils.serializers import get_serializer, paginated_list, requested_fields
+from ..utils.http_cache import collection_validators, is_not_modified, not_modified_response, with_validators
+from ..utils.attendance_summary import (
+    apply_attendance_changes, rebuild_attendance_summary, students_below_rate
+)
+from ..utils.snapshot_cache import note_tables_changed
+from ..app import db
+
+attendance_bp = Blueprint('attendance', __name__)
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late', 'excused')
+
+UPSERT_COLUMNS = ('status', 'marked_by', 'notes', 'time_in', 'time_out', 'updated_at')
+
+def _parse_time(value):
+    return datetime.strptime(value, '%H:%M').time() if value else None
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+@attendance_bp.route('', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher'])
+@read_replica
+def get_attendance():
+    try:
+        serializer = get_serializer('attendance')
+        stmt, fields = serializer.select(requested_fields(), current_role()[0])
+
+        for arg, column in [
+            ('studentId', Attendance.student_id),
+            ('classId', Attendance.class_id)
+        ]:
+            value = request.args.get(arg, type=int)
+            if value:
+                stmt = stmt.where(column == value)
+        if request.args.get('status'):
+            stmt = stmt.where(Attendance.status == request.args['status'])
+        if request.args.get('date'):
+            stmt = stmt.where(Attendance.date == _parse_date(request.args['date']))
+        if request.args.get('from'):
+            stmt = stmt.where(Attendance.date >= _parse_date(request.args['from']))
+        if request.args.get('to'):
+            stmt = stmt.where(Attendance.date <= _parse_date(request.args['to']))
+
+        validators = collection_validators(
+            db.session, stmt, Attendance, related=serializer.related_models(fields), fields=fields
+        )
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+
+        result = paginated_list(
+            db.session, serializer, stmt, fields, [Attendance.id], 'attendance', total=validators.total
+        )
+        return with_validators(jsonify(result), validators), 200
+
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@attendance_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher'])
+@write_transaction
+def mark_class_attendance():
+    try:
+        data = request.get_json()
+
+        # Markings of one class run one at a time (write_transaction takes
+        # SQLite's lock, the row lock does it elsewhere), so the statuses
+        # read below are the ones the upsert replaces and the summary
+        # deltas cannot drift
+        class_ = Class.query.filter_by(id=data['classId']).with_for_update().first()
+        if not class_ or not class_.is_active:
+            return jsonify({'message': 'Class not found'}), 404
+
+        date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        records = data.get('records') or []
+        if not records:
+            return jsonify({'message': 'No attendance records provided'}), 400
+
+        # Validate the whole roll before touching the database
+        errors = []
+        student_ids = []
+        for index, record in enumerate(records):
+            student_id = record.get('studentId')
+            if not isinstance(student_id, int) or isinstance(student_id, bool):
+                errors.append({'index': index, 'message': 'studentId is required'})
+            elif student_id in student_ids:
+                errors.append({'index': index, 'message': f'Duplicate student {student_id}'})
+            if record.get('status') not in ATTENDANCE_STATUSES:
+                errors.append({'index': index, 'message': f"Invalid status {record.get('status')!r}"})
+            student_ids.append(student_id)
+        if errors:
+            return jsonify({'message': 'Invalid attendance records', 'errors': errors}), 400
+
+        # One query for class membership: active students in the class's grade
+        members = {
+            row.id for row in db.session.query(Student.id).filter(
+                Student.id.in_(student_ids),
+                Student.is_active == True,
+                Student.grade == class_.grade
+            )
+        }
+        not_members = [student_id for student_id in student_ids if student_id not in members]
+        if not_members:
+            return jsonify({
+                'message': 'Students are not enrolled in this class',
+                'studentIds': not_members
+            }), 400
+
+        existing = dict(db.session.query(Attendance.student_id, Attendance.status).filter(
+            Attendance.class_id == class_.id,
+            Attendance.date == date,
+            Attendance.student_id.in_(student_ids)
+        ).all())
+
+        marked_by = get_jwt_identity()
+        now = datetime.utcnow()
+        rows = [{
+            'student_id': record['studentId'],
+            'class_id': class_.id,
+            'date': date,
+            'status': record['status'],
+            'marked_by': marked_by,
+            'notes': record.get('notes'),
+            'time_in': _parse_time(record.get('timeIn')),
+            'time_out': _parse_time(record.get('timeOut')),
+            'created_at': now,
+            'updated_at': now
+        } for record in records]
+
+        connection = db.session.connection()
+        connection.execute(upsert_statement(
+            connection.dialect.name,
+            Attendance.__table__,
+            rows,
+            key_columns=('student_id', 'class_id', 'date'),
+            constraint='uq_attendance_student_class_date',
+            update_columns=UPSERT_COLUMNS
+        ))
+        apply_attendance_changes(connection, [
+            (row['student_id'], class_.id, date, existing.get(row['student_id']), row['status'])
+            for row in rows
+        ])
+        note_tables_changed(db.session, 'attendance', 'attendance_summary')
+        db.session.commit()
+
+        return jsonify({
+            'classId': class_.id,
+            'date': date.isoformat(),
+            'created': len(rows) - len(existing),
+            'updated': len(existing),
+            'total': len(rows)
+        }), 200
+
+    except (KeyError, ValueError) as e:
+        return jsonify({'message': f'Invalid request: {e}'}), 400
+    except UnsupportedDialect as e:
+        return jsonify({'message': str(e)}), 501
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@attendance_bp.route('/summary', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher'])
+@read_replica
+def get_attendance_summary():
+    try:
+        period = request.args.get('period', 'month')
+        if period not in ('day', 'month'):
+            return jsonify({'message': 'period must be day or month'}), 400
+
+        query = AttendanceSummary.query.filter_by(period=period)
+        student_id = request.args.get('studentId', type=int)
+        class_id = request.args.get('classId', type=int)
+        date_from = _parse_date(request.args.get('from'))
+        date_to = _parse_date(request.args.get('to'))
+
+        if student_id:
+            query = query.filter_by(student_id=student_id)
+        if class_id:
+            query = query.filter_by(class_id=class_id)
+        if date_from:
+            query = query.filter(AttendanceSummary.period_start >= date_from)
+        if date_to:
+            query = query.filter(AttendanceSummary.period_start <= date_to)
+
+        rows = query.order_by(AttendanceSummary.period_start, AttendanceSummary.id).limit(1000).all()
+        return jsonify({'summary': [row.to_dict() for row in rows]}), 200
+
+    except ValueError as e:
+        return jsonify({'message': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@attendance_bp.route('/summary/at-risk', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher'])
+@read_replica
+def get_students_below_rate():
+    try:
+        threshold = request.args.get('threshold', 85, type=float)
+        days = request.args.get('days', 30, type=int)
+        class_id = request.args.get('classId', type=int)
+        if days < 1:
+            return jsonify({'message': 'days must be positive'}), 400
+
+        start, end, rows = students_below_rate(db.session, threshold, days, class_id)
+        names = dict(db.session.query(
+            Student.id, Student.first_name + ' ' + Student.last_name
+        ).filter(Student.id.in_([row.student_id for row in rows])).all()) if rows else {}
+
+        return jsonify({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'threshold': threshold,
+            'students': [{
+                'studentId': row.student_id,
+                'studentName': names.get(row.student_id),
+                'present': row.present,
+                'absent': row.absent,
+                'late': row.late,
+                'excused': row.excused,
+                'attendanceRate': round(row.rate, 2)
+            } for row in rows]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@attendance_bp.cli.command('rebuild-summary')
+def rebuild_summary_command():
+    """Rebuild the attendance summary table from raw attendance rows."""
+    with db.engine.begin() as connection:
+        count = rebuild_attendance_summary(connection)
+    click.echo(f'Rebuilt {count} attendance summary rows')
@@ -3,10 +3,19 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from datetime import datetime
 from ..models.user import User
+from ..utils.user_cache import user_claims, get_user_snapshot
+from ..utils.hashing import HashingBusy
+from ..utils.write_behind import last_login_buffer
+from ..utils.decorators import write_transaction
 from ..app import db
 
 auth_bp = Blueprint('auth', __name__)
 
+def _busy_response(error):
+    response = jsonify({'message': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -31,13 +40,15 @@ def register():
         db.session.commit()
         
         # Generate token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=user_claims(user))
         
         return jsonify({
             'user': user.to_dict(),
             'token': access_token
         }), 201
         
+    except HashingBusy as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -49,18 +60,22 @@ def login():
         user = User.query.filter_by(email=data['email']).first()
         
         if user and user.check_password(data['password']) and user.is_active:
-            # Update last login
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+            # Update last login (written in batches by the flusher)
+            login_at = datetime.utcnow()
+            last_login_buffer.record(user.id, login_at)
+            user_data = user.to_dict()
+            user_data['lastLogin'] = login_at
             
-            access_token = create_access_token(identity=user.id)
+            access_token = create_access_token(identity=user.id, additional_claims=user_claims(user))
             return jsonify({
-                'user': user.to_dict(),
+                'user': user_data,
                 'token': access_token
             }), 200
         
         return jsonify({'message': 'Invalid credentials'}), 401
         
+    except HashingBusy as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -69,10 +84,10 @@ def login():
 def get_current_user():
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_user_snapshot(current_user_id)
         
-        if user and user.is_active:
-            return jsonify(user.to_dict()), 200
+        if user and user['isActive']:
+            return jsonify(user), 200
         
         return jsonify({'message': 'User not found'}), 404
         
@@ -81,6 +96,7 @@ def get_current_user():
 
 @auth_bp.route('/profile', methods=['PUT'])
 @jwt_required()
+@write_transaction
 def update_profile():
     try:
         current_user_id = get_jwt_identity()
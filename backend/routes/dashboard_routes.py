@@ -0,0 +1,199 @@
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import date, datetime, timedelta
+from ..models.student import Student
+from ..models.teacher import Teacher
+from ..models.class_model import Class
+from ..models.attendance import Attendance
+from ..models.attendance_summary import AttendanceSummary
+from ..models.grade import Grade
+from ..models.fee import Fee
+from ..models.fee_ledger import FeeLedger
+from ..models.announcement import Announcement
+from ..models.user import User
+from ..utils.decorators import role_required, current_role, read_replica
+from ..utils.concurrent_reads import concurrent_reads
+from ..utils.serializers import get_serializer
+from ..utils.snapshot_cache import snapshot_cache
+from ..utils.user_cache import get_user_snapshot
+from ..app import db
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+ROLE_WIDGETS = {
+    'admin': ('students', 'teachers', 'attendance', 'grades', 'fees', 'announcements'),
+    'principal': ('students', 'teachers', 'attendance', 'grades', 'fees', 'announcements'),
+    'teacher': ('students', 'attendance', 'grades', 'announcements'),
+    'accountant': ('students', 'fees', 'announcements'),
+    'receptionist': ('students', 'teachers', 'announcements')
+}
+
+def _tables(*models):
+    return {model.__table__.name for model in models}
+
+def _resolve_scope(scope):
+    """Class ids and grade levels a scope covers; ``None`` means the whole school."""
+    if scope == 'school':
+        return None, None
+    kind, _, value = scope.partition(':')
+    if kind == 'class':
+        classes = Class.query.filter_by(id=int(value)).all()
+    else:
+        classes = Class.query.filter_by(teacher_id=int(value), is_active=True).all()
+    return [c.id for c in classes], sorted({c.grade for c in classes})
+
+def _students_widget(class_ids, grades):
+    query = db.session.query(Student.grade, db.func.count(Student.id)).filter(Student.is_active == True)
+    if grades is not None:
+        query = query.filter(Student.grade.in_(grades))
+    by_grade = dict(query.group_by(Student.grade).all())
+    return {'total': sum(by_grade.values()), 'byGrade': by_grade}
+
+def _teachers_widget(class_ids, grades):
+    by_department = dict(
+        db.session.query(Teacher.department, db.func.count(Teacher.id))
+        .filter(Teacher.is_active == True)
+        .group_by(Teacher.department).all()
+    )
+    return {
+        'total': sum(by_department.values()),
+        'byDepartment': {department or 'Unassigned': count for department, count in by_department.items()}
+    }
+
+def _attendance_widget(class_ids, grades):
+    today = date.today()
+    columns = [db.func.coalesce(db.func.sum(getattr(AttendanceSummary, status)), 0)
+               for status in ('present', 'absent', 'late', 'excused')]
+    result = {}
+    for label, period, start in (('today', 'day', today), ('month', 'month', today.replace(day=1))):
+        query = db.session.query(*columns).filter(
+            AttendanceSummary.period == period, AttendanceSummary.period_start == start
+        )
+        if class_ids is not None:
+            query = query.filter(AttendanceSummary.class_id.in_(class_ids))
+        present, absent, late, excused = query.one()
+        counted = present + late + absent
+        result[label] = {
+            'present': present,
+            'absent': absent,
+            'late': late,
+            'excused': excused,
+            'attendanceRate': round((present + late) / counted * 100, 2) if counted else None
+        }
+    return result
+
+def _grades_widget(class_ids, grades):
+    since = datetime.utcnow() - timedelta(days=30)
+    query = db.session.query(
+        db.func.count(Grade.id),
+        db.func.avg(Grade.marks_obtained * 100.0 / Grade.total_marks)
+    ).filter(Grade.created_at >= since, Grade.total_marks > 0)
+    if grades is not None:
+        query = query.join(Student, Student.id == Grade.student_id).filter(Student.grade.in_(grades))
+    count, average = query.one()
+    return {'recentCount': count, 'recentAverage': round(average, 2) if average is not None else None}
+
+def _fees_widget(class_ids, grades):
+    query = db.session.query(
+        db.func.coalesce(db.func.sum(FeeLedger.billed), 0),
+        db.func.coalesce(db.func.sum(FeeLedger.collected), 0),
+        db.func.coalesce(db.func.sum(FeeLedger.outstanding), 0),
+        db.func.coalesce(db.func.sum(FeeLedger.overdue), 0)
+    )
+    if grades is not None:
+        query = query.filter(FeeLedger.grade.in_(grades))
+    billed, collected, outstanding, overdue = query.one()
+    return {
+        'billed': round(billed, 2),
+        'collected': round(collected, 2),
+        'outstanding': round(outstanding, 2),
+        'overdue': round(overdue, 2)
+    }
+
+def _announcements_widget(class_ids, grades):
+    serializer = get_serializer('announcement')
+    stmt, fields = serializer.select(['id', 'title', 'priority', 'targetAudience', 'authorName', 'createdAt'])
+    stmt = stmt.where(
+        Announcement.is_active == True,
+        (Announcement.expires_at == None) | (Announcement.expires_at > datetime.utcnow())
+    ).order_by(Announcement.id.desc()).limit(5)
+    return serializer.to_dicts(db.session.execute(stmt).all(), fields)
+
+# Widget builder and the tables whose writes invalidate it
+WIDGETS = {
+    'students': (_students_widget, _tables(Student, Class)),
+    'teachers': (_teachers_widget, _tables(Teacher)),
+    'attendance': (_attendance_widget, _tables(Attendance, AttendanceSummary, Class)),
+    'grades': (_grades_widget, _tables(Grade, Student, Class)),
+    'fees': (_fees_widget, _tables(Fee, FeeLedger, Class)),
+    'announcements': (_announcements_widget, _tables(Announcement, User))
+}
+
+_MISSING = object()
+
+def _own_teacher_id():
+    """The Teacher record of the signed-in user, matched by email."""
+    user = get_user_snapshot(get_jwt_identity())
+    if user is None:
+        return None
+    return db.session.query(Teacher.id).filter(Teacher.email == user['email'], Teacher.is_active == True).scalar()
+
+def _teacher_may_see(scope, teacher_id):
+    """Teachers see their own classes only: all of them, or one at a time."""
+    kind, _, value = scope.partition(':')
+    if kind == 'teacher':
+        return int(value) == teacher_id
+    if kind == 'class':
+        return db.session.query(Class.id).filter_by(id=int(value), teacher_id=teacher_id).first() is not None
+    return False
+
+def _widget_build(name, scope, class_ids, grades):
+    builder, tables = WIDGETS[name]
+    return lambda: snapshot_cache.get_or_build((name, scope), tables, lambda: builder(class_ids, grades))
+
+@dashboard_bp.route('', methods=['GET'])
+@jwt_required()
+@role_required(list(ROLE_WIDGETS))
+@read_replica
+def get_dashboard():
+    try:
+        role, _ = current_role()
+
+        if request.args.get('classId'):
+            scope = f"class:{int(request.args['classId'])}"
+        elif request.args.get('teacherId'):
+            scope = f"teacher:{int(request.args['teacherId'])}"
+        else:
+            scope = 'school'
+
+        if role == 'teacher':
+            teacher_id = _own_teacher_id()
+            if teacher_id is None:
+                return jsonify({'message': 'No teacher record for this account'}), 403
+            if scope == 'school':
+                scope = f'teacher:{teacher_id}'
+            elif not _teacher_may_see(scope, teacher_id):
+                return jsonify({'message': 'Access denied'}), 403
+
+        class_ids, grades = snapshot_cache.get_or_build(
+            ('scope', scope), _tables(Class), lambda: _resolve_scope(scope)
+        )
+
+        snapshot = {}
+        missing = []
+        for name in ROLE_WIDGETS[role]:
+            snapshot[name] = snapshot_cache.fresh((name, scope), _MISSING)
+            if snapshot[name] is _MISSING:
+                missing.append(name)
+
+        # The widgets are independent queries, so the misses are built side by side
+        builds = [_widget_build(name, scope, class_ids, grades) for name in missing]
+        snapshot.update(zip(missing, concurrent_reads.run(builds)))
+
+        return jsonify({'role': role, 'scope': scope, 'widgets': snapshot}), 200
+
+    except ValueError as e:
+        return jsonify({'message': f'Invalid scope: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
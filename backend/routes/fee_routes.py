@@ -0,0 +1,259 @@
+
+import click
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from ..models.fee import Fee
+from ..models.fee_ledger import FeeLedger
+from ..models.student import Student
+from ..utils.decorators import role_required, current_role, read_replica, write_transaction
+from ..utils.pagination import InvalidCursor
+from ..utils.serializers import get_serializer, paginated_list, requested_fields
+from ..utils.http_cache import collection_validators, is_not_modified, not_modified_response, with_validators
+from ..utils.fee_engine import LateFeeRules, recompute_fee_status, DEFAULT_CHUNK_SIZE
+from ..utils.fee_ledger import reconcile_fee_ledger
+from ..utils.job_queue import job_type
+from ..app import db
+
+fee_bp = Blueprint('fees', __name__)
+
+SUMMARY_DIMENSIONS = {
+    'grade': 'grade',
+    'feeType': 'fee_type',
+    'semester': 'semester',
+    'academicYear': 'academic_year'
+}
+
+SUMMARY_METRICS = {
+    'feeCount': 'fee_count',
+    'billed': 'billed',
+    'discount': 'discount',
+    'lateFees': 'late_fees',
+    'collected': 'collected',
+    'outstanding': 'outstanding',
+    'overdue': 'overdue'
+}
+
+def _payment_status(fee):
+    balance = fee.amount - (fee.discount_amount or 0) + (fee.late_fee or 0) - (fee.paid_amount or 0)
+    if balance <= 0:
+        return 'Paid'
+    if fee.status == 'Overdue':
+        return 'Overdue'
+    return 'Partial' if fee.paid_amount else 'Pending'
+
+@fee_bp.route('', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'accountant'])
+@read_replica
+def get_fees():
+    try:
+        serializer = get_serializer('fee')
+        stmt, fields = serializer.select(requested_fields(), current_role()[0])
+
+        student_id = request.args.get('studentId', type=int)
+        if student_id:
+            stmt = stmt.where(Fee.student_id == student_id)
+        for arg, column in [
+            ('status', Fee.status),
+            ('feeType', Fee.fee_type),
+            ('semester', Fee.semester),
+            ('academicYear', Fee.academic_year)
+        ]:
+            value = request.args.get(arg)
+            if value:
+                stmt = stmt.where(column == value)
+
+        validators = collection_validators(
+            db.session, stmt, Fee, related=serializer.related_models(fields), fields=fields
+        )
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+
+        result = paginated_list(
+            db.session, serializer, stmt, fields, [Fee.id], 'fees', total=validators.total
+        )
+        return with_validators(jsonify(result), validators), 200
+
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@fee_bp.route('', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'principal', 'accountant'])
+@write_transaction
+def create_fee():
+    try:
+        data = request.get_json()
+
+        student = Student.query.get(data['studentId'])
+        if not student or not student.is_active:
+            return jsonify({'message': 'Student not found'}), 404
+
+        fee = Fee(
+            student_id=student.id,
+            fee_type=data['feeType'],
+            amount=float(data['amount']),
+            due_date=datetime.strptime(data['dueDate'], '%Y-%m-%d').date(),
+            discount_amount=float(data.get('discountAmount') or 0),
+            semester=data.get('semester'),
+            academic_year=data.get('academicYear'),
+            status='Pending',
+            paid_amount=0,
+            late_fee=0
+        )
+
+        # The ledger is updated by the flush hook in this same transaction
+        db.session.add(fee)
+        db.session.commit()
+
+        return jsonify(fee.to_dict()), 201
+
+    except (KeyError, ValueError) as e:
+        return jsonify({'message': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@fee_bp.route('/<int:fee_id>/payments', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'accountant'])
+@write_transaction
+def record_payment(fee_id):
+    try:
+        data = request.get_json()
+
+        # Locked until commit, so concurrent payments add up instead of one
+        # overwriting the other (on SQLite write_transaction already holds
+        # the database write lock)
+        fee = Fee.query.filter_by(id=fee_id).with_for_update().first()
+        if not fee:
+            return jsonify({'message': 'Fee not found'}), 404
+        if fee.status in ('Paid', 'Waived'):
+            return jsonify({'message': f'Fee is already {fee.status}'}), 400
+
+        amount = float(data['amount'])
+        if amount <= 0:
+            return jsonify({'message': 'Payment amount must be positive'}), 400
+
+        fee.paid_amount = (fee.paid_amount or 0) + amount
+        fee.payment_date = datetime.utcnow()
+        fee.payment_method = data.get('paymentMethod')
+        fee.transaction_id = data.get('transactionId')
+        fee.receipt_number = data.get('receiptNumber')
+        fee.status = _payment_status(fee)
+
+        db.session.commit()
+
+        return jsonify(fee.to_dict()), 200
+
+    except (KeyError, ValueError) as e:
+        return jsonify({'message': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@fee_bp.route('/summary', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'accountant'])
+@read_replica
+def get_fee_summary():
+    try:
+        group_by = [name for name in request.args.get('groupBy', '').split(',') if name]
+        unknown = [name for name in group_by if name not in SUMMARY_DIMENSIONS]
+        if unknown:
+            return jsonify({'message': f"Unknown groupBy: {', '.join(unknown)}"}), 400
+
+        # Reads only the ledger, never the fee rows
+        dimensions = [getattr(FeeLedger, SUMMARY_DIMENSIONS[name]) for name in group_by]
+        metrics = [db.func.sum(getattr(FeeLedger, column)) for column in SUMMARY_METRICS.values()]
+        query = db.session.query(*dimensions, *metrics)
+        for name, column in SUMMARY_DIMENSIONS.items():
+            value = request.args.get(name)
+            if value:
+                query = query.filter(getattr(FeeLedger, column) == value)
+        if dimensions:
+            query = query.group_by(*dimensions).order_by(*dimensions)
+
+        rows = []
+        for row in query.all():
+            item = {name: row[i] or None for i, name in enumerate(group_by)}
+            for i, name in enumerate(SUMMARY_METRICS):
+                value = row[len(group_by) + i] or 0
+                item[name] = value if name == 'feeCount' else round(value, 2)
+            rows.append(item)
+
+        return jsonify({'groupBy': group_by, 'summary': rows}), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@fee_bp.route('/recompute-status', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'accountant'])
+def recompute_status():
+    try:
+        data = request.get_json(silent=True) or {}
+        as_of = datetime.strptime(data['asOf'], '%Y-%m-%d').date() if data.get('asOf') else None
+        # Commits range by range on connections of its own; the request's
+        # session must not be holding the write lock meanwhile
+        report = recompute_fee_status(
+            db.engine,
+            LateFeeRules.from_config(current_app.config),
+            as_of=as_of,
+            chunk_size=int(data.get('chunkSize', DEFAULT_CHUNK_SIZE))
+        )
+        return jsonify(report), 200
+
+    except ValueError as e:
+        return jsonify({'message': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+def _validate_recompute_job(payload):
+    if payload.get('asOf'):
+        datetime.strptime(payload['asOf'], '%Y-%m-%d')
+    if int(payload.get('chunkSize', DEFAULT_CHUNK_SIZE)) < 1:
+        raise ValueError('chunkSize must be positive')
+
+@job_type('recompute-fee-status', roles=('admin', 'accountant'), validate=_validate_recompute_job)
+def recompute_status_job(payload, job):
+    """The recompute-status endpoint's work, run by a job worker."""
+    return recompute_fee_status(
+        db.engine,
+        LateFeeRules.from_config(current_app.config),
+        as_of=datetime.strptime(payload['asOf'], '%Y-%m-%d').date() if payload.get('asOf') else None,
+        chunk_size=int(payload.get('chunkSize', DEFAULT_CHUNK_SIZE)),
+        progress=lambda done, total: job.progress(done, total, 'fee ranges recomputed')
+    )
+
+@fee_bp.cli.command('recompute-status')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), help='Evaluate due dates as of this day.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True)
+def recompute_status_command(as_of, chunk_size):
+    """Move unpaid fees to Overdue and apply late-fee rules."""
+    report = recompute_fee_status(
+        db.engine,
+        LateFeeRules.from_config(current_app.config),
+        as_of=as_of.date() if as_of else None,
+        chunk_size=chunk_size
+    )
+    click.echo(
+        f"Changed {report['totalChanged']} rows {report['rowsChanged']} "
+        f"in {report['chunks']} chunks, {report['elapsedMs']}ms"
+    )
+
+@fee_bp.cli.command('reconcile-ledger')
+@click.option('--fix', is_flag=True, help='Rebuild the ledger when it has drifted.')
+def reconcile_ledger_command(fix):
+    """Recompute fee ledger totals from scratch and report any drift."""
+    with db.engine.begin() as connection:
+        drift = reconcile_fee_ledger(connection, fix=fix)
+    for entry in drift:
+        click.echo(f"{entry['key']}: stored {entry['stored']} expected {entry['expected']}")
+    if not drift:
+        click.echo('Fee ledger is in sync')
+    elif fix:
+        click.echo(f'Rebuilt fee ledger ({len(drift)} keys had drifted)')
+    else:
+        click.echo(f'{len(drift)} keys have drifted; rerun with --fix to rebuild')
@@ -0,0 +1,100 @@
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from ..models.grade import Grade
+from ..models.student import Student
+from ..utils.decorators import role_required, current_role, read_replica
+from ..utils.pagination import InvalidCursor
+from ..utils.serializers import get_serializer, paginated_list, requested_fields
+from ..utils.http_cache import collection_validators, is_not_modified, not_modified_response, with_validators
+from ..app import db
+
+grade_bp = Blueprint('grades', __name__)
+
+@grade_bp.route('', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher'])
+@read_replica
+def get_grades():
+    try:
+        serializer = get_serializer('grade')
+        stmt, fields = serializer.select(requested_fields(), current_role()[0])
+
+        for arg, column in [
+            ('studentId', Grade.student_id),
+            ('teacherId', Grade.teacher_id)
+        ]:
+            value = request.args.get(arg, type=int)
+            if value:
+                stmt = stmt.where(column == value)
+        for arg, column in [
+            ('subject', Grade.subject),
+            ('examType', Grade.exam_type),
+            ('semester', Grade.semester),
+            ('academicYear', Grade.academic_year)
+        ]:
+            value = request.args.get(arg)
+            if value:
+                stmt = stmt.where(column == value)
+
+        validators = collection_validators(
+            db.session, stmt, Grade, related=serializer.related_models(fields), fields=fields
+        )
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+
+        result = paginated_list(
+            db.session, serializer, stmt, fields, [Grade.id], 'grades', total=validators.total
+        )
+        return with_validators(jsonify(result), validators), 200
+
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@grade_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher'])
+@read_replica
+def get_grade_analytics():
+    # numpy is the slowest import in the app; only this endpoint needs it
+    from ..utils.grade_analytics import load_cohort, analyze_cohort
+
+    try:
+        filters = {
+            'class_id': request.args.get('classId', type=int),
+            'grade_level': request.args.get('grade'),
+            'academic_year': request.args.get('academicYear'),
+            'semester': request.args.get('semester'),
+            'subject': request.args.get('subject')
+        }
+        if not (filters['class_id'] or filters['grade_level'] or filters['academic_year']):
+            return jsonify({'message': 'classId, grade or academicYear is required'}), 400
+
+        columns = load_cohort(db.session, **filters)
+        if columns is None:
+            return jsonify({'message': 'No grades found for this cohort'}), 404
+
+        result = analyze_cohort(columns)
+
+        if request.args.get('includeStudents', 'true').lower() == 'true':
+            names = dict(db.session.query(
+                Student.id, Student.first_name + ' ' + Student.last_name
+            ).filter(Student.id.in_([row['studentId'] for row in result['students']])).all())
+            for row in result['students']:
+                row['studentName'] = names.get(row['studentId'])
+        else:
+            del result['students']
+
+        result['cohort'] = {
+            'classId': filters['class_id'],
+            'grade': filters['grade_level'],
+            'academicYear': filters['academic_year'],
+            'semester': filters['semester'],
+            'subject': filters['subject']
+        }
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
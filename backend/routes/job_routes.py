@@ -0,0 +1,149 @@
+
+import json
+import multiprocessing
+import signal
+import click
+from flask import Blueprint, current_app, request, jsonify, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..utils.decorators import current_role
+from ..utils.job_queue import job_queue, JobWorker, JOB_TYPES
+from ..app import db
+
+job_bp = Blueprint('jobs', __name__)
+
+# May see and cancel every job, not only their own
+SUPERVISOR_ROLES = ('admin', 'principal')
+
+def _visible(job, role):
+    return role in SUPERVISOR_ROLES or str(job['createdBy']) == get_jwt_identity()
+
+@job_bp.route('', methods=['POST'])
+@jwt_required()
+def enqueue_job():
+    try:
+        data = request.get_json(silent=True) or {}
+        definition = JOB_TYPES.get(data.get('type'))
+        if definition is None:
+            return jsonify({
+                'message': f"Unknown job type '{data.get('type')}'",
+                'types': sorted(JOB_TYPES)
+            }), 400
+        role, is_active = current_role()
+        if not is_active or role not in definition.roles:
+            return jsonify({'message': 'Access denied'}), 403
+
+        payload = data.get('payload') or {}
+        if not isinstance(payload, dict):
+            return jsonify({'message': 'payload must be an object'}), 400
+        job_id = job_queue.enqueue(
+            definition.name,
+            payload,
+            priority=int(data.get('priority', 0)),
+            max_attempts=data.get('maxAttempts'),
+            created_by=int(get_jwt_identity())
+        )
+        status_url = url_for('jobs.get_job', job_id=job_id)
+        return jsonify({'jobId': job_id, 'status': 'queued', 'statusUrl': status_url}), 202, {'Location': status_url}
+
+    except ValueError as e:
+        return jsonify({'message': f'Invalid job: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@job_bp.route('', methods=['GET'])
+@jwt_required()
+def get_jobs():
+    try:
+        role, is_active = current_role()
+        if not is_active:
+            return jsonify({'message': 'Access denied'}), 403
+        jobs = job_queue.recent(
+            status=request.args.get('status'),
+            kind=request.args.get('type'),
+            created_by=None if role in SUPERVISOR_ROLES else int(get_jwt_identity()),
+            limit=min(request.args.get('limit', 50, type=int), 200)
+        )
+        return jsonify({'jobs': jobs}), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@job_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Status, progress and, once finished, the result or error of a job."""
+    try:
+        job = job_queue.get(job_id)
+        role, is_active = current_role()
+        if job is None or not is_active or not _visible(job, role):
+            return jsonify({'message': 'Job not found'}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@job_bp.route('/<int:job_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_job(job_id):
+    try:
+        job = job_queue.get(job_id)
+        role, is_active = current_role()
+        if job is None or not is_active or not _visible(job, role):
+            return jsonify({'message': 'Job not found'}), 404
+        if not job_queue.cancel(job_id):
+            return jsonify({'message': f"Only queued jobs can be cancelled; this one is {job['status']}"}), 409
+        return jsonify(job_queue.get(job_id)), 200
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+def _work(app, kinds, burst, max_jobs):
+    # Connections inherited from the parent must not be shared with it
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    worker = JobWorker(app, kinds=kinds)
+    worker.install_signal_handlers()
+    return worker.run(burst=burst, max_jobs=max_jobs)
+
+@job_bp.cli.command('work')
+@click.option('--processes', default=1, show_default=True, help='Worker processes to run.')
+@click.option('--type', 'kinds', multiple=True, help='Only run jobs of this type (repeatable).')
+@click.option('--burst', is_flag=True, help='Exit once no job is runnable.')
+@click.option('--max-jobs', type=int, default=None, help='Exit after this many jobs (per process).')
+def work_command(processes, kinds, burst, max_jobs):
+    """Run queued background jobs until stopped."""
+    app = current_app._get_current_object()
+    kinds = list(kinds) or None
+    click.echo(f"Working on {', '.join(kinds or sorted(JOB_TYPES))} with {processes} process(es)")
+    if processes == 1:
+        processed = _work(app, kinds, burst, max_jobs)
+        click.echo(f'Ran {processed} jobs')
+        return
+
+    context = multiprocessing.get_context('fork')
+    children = [
+        context.Process(target=_work, args=(app, kinds, burst, max_jobs), name=f'job-worker-{n}')
+        for n in range(processes)
+    ]
+    for child in children:
+        child.start()
+    # Pass a stop on to the workers, which finish the job in hand first
+    signal.signal(signal.SIGTERM, lambda *args: [child.terminate() for child in children])
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and finish their current job
+        for child in children:
+            child.join()
+
+@job_bp.cli.command('enqueue')
+@click.argument('kind')
+@click.option('--payload', default='{}', help='JSON object passed to the handler.')
+@click.option('--priority', default=0, show_default=True)
+@click.option('--as-user', 'user_id', type=int, default=None, help='User id the job runs on behalf of.')
+def enqueue_command(kind, payload, priority, user_id):
+    """Queue a job from the command line."""
+    job_id = job_queue.enqueue(kind, json.loads(payload), priority=priority, created_by=user_id)
+    click.echo(f'Queued job {job_id}')
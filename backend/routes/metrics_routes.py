@@ -0,0 +1,36 @@
+
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, verify_jwt_in_request
+from ..utils.decorators import role_required, current_role
+from ..utils.request_metrics import request_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape target for this worker's request metrics.
+
+    Scrapers authenticate with ``Authorization: Bearer <METRICS_TOKEN>``;
+    without a token configured, an admin JWT is required.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if not (token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')):
+        verify_jwt_in_request()
+        role, is_active = current_role()
+        if not is_active or role != 'admin':
+            return jsonify({'message': 'Access denied'}), 403
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@metrics_bp.route('/n-plus-one', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def get_n_plus_one():
+    """The latest requests that repeated one statement shape, with the statement."""
+    try:
+        return jsonify({
+            'threshold': request_metrics.n_plus_one_threshold,
+            'detections': request_metrics.recent_n_plus_one()
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
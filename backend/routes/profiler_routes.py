@@ -0,0 +1,77 @@
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from ..utils.decorators import role_required
+from ..utils.profiler import sampling_profiler
+
+profiler_bp = Blueprint('profiler', __name__)
+
+PROFILE_FORMATS = ('speedscope', 'collapsed')
+
+@profiler_bp.route('/sessions', methods=['POST'])
+@jwt_required()
+@role_required(['admin'])
+def start_profile():
+    """Sample this worker's threads for ``durationSeconds`` (capped by PROFILER_MAX_SECONDS)."""
+    try:
+        if not sampling_profiler.enabled:
+            return jsonify({'message': 'Profiler is disabled'}), 404
+        data = request.get_json(silent=True) or {}
+        duration = float(data.get('durationSeconds', 10))
+        interval_ms = data.get('intervalMs')
+        if duration <= 0 or (interval_ms is not None and not 1 <= float(interval_ms) <= 1000):
+            return jsonify({'message': 'durationSeconds must be positive and intervalMs between 1 and 1000'}), 400
+        profile = sampling_profiler.start(
+            duration, interval=float(interval_ms) / 1000 if interval_ms is not None else None
+        )
+        return jsonify(profile.summary()), 202
+
+    except (TypeError, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'message': str(e)}), 409
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@profiler_bp.route('/sessions', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def list_profiles():
+    try:
+        return jsonify({
+            'enabled': sampling_profiler.enabled,
+            'profiles': [profile.summary() for profile in reversed(sampling_profiler.profiles())]
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@profiler_bp.route('/sessions/<profile_id>', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def get_profile(profile_id):
+    """A finished profile as speedscope JSON (default) or ``?format=collapsed`` stacks.
+
+    Profiles live in the worker that took them; with several workers, ask
+    the one whose process id prefixes the profile id.
+    """
+    try:
+        profile = sampling_profiler.get(profile_id)
+        if profile is None:
+            return jsonify({'message': 'Profile not found'}), 404
+        if profile.running:
+            return jsonify(profile.summary()), 202
+
+        export_format = request.args.get('format', 'speedscope')
+        if export_format not in PROFILE_FORMATS:
+            return jsonify({'message': 'format must be speedscope or collapsed'}), 400
+        filename = f'profile-{profile.id}.' + ('speedscope.json' if export_format == 'speedscope' else 'txt')
+        if export_format == 'collapsed':
+            body, mimetype = profile.collapsed(), 'text/plain; charset=utf-8'
+        else:
+            body, mimetype = current_app.json.dumps(profile.speedscope()), 'application/json'
+        return Response(body, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        })
+
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -0,0 +1,192 @@
+
+import click
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from ..models.attendance import Attendance
+from ..models.grade import Grade
+from ..models.fee import Fee
+from ..utils.decorators import role_required, current_role, read_replica
+from ..utils.exports import iter_rows, csv_chunks, xlsx_chunks, EXPORT_MIMETYPES
+from ..utils.report_cards import prefetch_report_card_inputs, generate_report_cards
+from ..utils.serializers import get_serializer, requested_fields
+from ..utils.job_queue import job_type
+from ..app import db
+
+report_bp = Blueprint('reports', __name__)
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+# Report name -> serializer, model, roles allowed, and query-string filters
+EXPORTS = {
+    'attendance': {
+        'serializer': 'attendance',
+        'model': Attendance,
+        'roles': ('admin', 'principal', 'teacher'),
+        'filters': [
+            ('studentId', int, lambda v: Attendance.student_id == v),
+            ('classId', int, lambda v: Attendance.class_id == v),
+            ('status', str, lambda v: Attendance.status == v),
+            ('dateFrom', _date, lambda v: Attendance.date >= v),
+            ('dateTo', _date, lambda v: Attendance.date <= v)
+        ]
+    },
+    'grades': {
+        'serializer': 'grade',
+        'model': Grade,
+        'roles': ('admin', 'principal', 'teacher'),
+        'filters': [
+            ('studentId', int, lambda v: Grade.student_id == v),
+            ('teacherId', int, lambda v: Grade.teacher_id == v),
+            ('subject', str, lambda v: Grade.subject == v),
+            ('examType', str, lambda v: Grade.exam_type == v),
+            ('semester', str, lambda v: Grade.semester == v),
+            ('academicYear', str, lambda v: Grade.academic_year == v)
+        ]
+    },
+    'fees': {
+        'serializer': 'fee',
+        'model': Fee,
+        'roles': ('admin', 'principal', 'accountant'),
+        'filters': [
+            ('studentId', int, lambda v: Fee.student_id == v),
+            ('status', str, lambda v: Fee.status == v),
+            ('feeType', str, lambda v: Fee.fee_type == v),
+            ('semester', str, lambda v: Fee.semester == v),
+            ('academicYear', str, lambda v: Fee.academic_year == v)
+        ]
+    }
+}
+
+@report_bp.route('/<report>/export', methods=['GET'])
+@jwt_required()
+@role_required(['admin', 'principal', 'teacher', 'accountant'])
+@read_replica
+def export_report(report):
+    """Stream a whole register as CSV or XLSX.
+
+    Rows are written in id order as they are fetched, with chunked transfer
+    and no Content-Length. ``?fields=`` picks the columns. The first column
+    is always the row id, so an interrupted download resumes with
+    ``?afterId=<last id received>``.
+    """
+    try:
+        spec = EXPORTS.get(report)
+        if spec is None:
+            return jsonify({'message': f'Unknown report: {report}'}), 404
+        role, _ = current_role()
+        if role not in spec['roles']:
+            return jsonify({'message': 'Access denied'}), 403
+
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_MIMETYPES:
+            return jsonify({'message': 'format must be csv or xlsx'}), 400
+
+        model = spec['model']
+        serializer = get_serializer(spec['serializer'])
+        names = requested_fields()
+        if names:
+            # The id column is what ?afterId resumes from
+            names = ['id'] + [name for name in names if name != 'id']
+        try:
+            stmt, fields = serializer.select(names, role)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        for arg, parse, condition in spec['filters']:
+            value = request.args.get(arg)
+            if value:
+                stmt = stmt.where(condition(parse(value)))
+        after_id = request.args.get('afterId', type=int)
+        if after_id:
+            stmt = stmt.where(model.id > after_id)
+        stmt = stmt.order_by(model.id)
+
+        header = [field.name for field in fields]
+        rows = iter_rows(db.session, stmt, fields)
+        if export_format == 'xlsx':
+            chunks = xlsx_chunks(header, rows, sheet_name=report.title())
+        else:
+            chunks = csv_chunks(header, rows)
+
+        suffix = f'-after-{after_id}' if after_id else ''
+        filename = f"{report}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{suffix}.{export_format}"
+        return Response(
+            stream_with_context(chunks),
+            mimetype=EXPORT_MIMETYPES[export_format],
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Cache-Control': 'no-store',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    except ValueError as e:
+        return jsonify({'message': f'Invalid filter: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+def _report_cards(grade_level, academic_year=None, semester=None, date_from=None, date_to=None,
+                  workers=None, output=None, progress=None):
+    payloads = prefetch_report_card_inputs(
+        db.session, grade_level,
+        academic_year=academic_year,
+        semester=semester,
+        date_from=date_from,
+        date_to=date_to
+    )
+    db.session.close()
+    return generate_report_cards(
+        payloads,
+        output or current_app.config['REPORT_CARD_DIR'],
+        workers=workers,
+        progress=progress
+    )
+
+def _validate_report_card_job(payload):
+    if not payload.get('grade'):
+        raise ValueError('grade is required')
+    for key in ('from', 'to'):
+        if payload.get(key):
+            _date(payload[key])
+
+@job_type('report-cards', roles=('admin', 'principal'), validate=_validate_report_card_job)
+def report_cards_job(payload, job):
+    """Generate a grade level's report cards; the result has the counts."""
+    return _report_cards(
+        payload['grade'],
+        academic_year=payload.get('academicYear'),
+        semester=payload.get('semester'),
+        date_from=_date(payload['from']) if payload.get('from') else None,
+        date_to=_date(payload['to']) if payload.get('to') else None,
+        progress=lambda done, total: job.progress(done, total, 'cards rendered')
+    )
+
+@report_bp.cli.command('report-cards')
+@click.option('--grade', 'grade_level', required=True, help='Grade level to generate cards for.')
+@click.option('--academic-year', default=None)
+@click.option('--semester', default=None)
+@click.option('--from', 'date_from', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='First day of attendance to count.')
+@click.option('--to', 'date_to', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Last day of attendance to count.')
+@click.option('--workers', type=int, default=None, help='Rendering processes (default: CPU count).')
+@click.option('--output', default=None, help='Output directory (default: REPORT_CARD_DIR).')
+def report_cards_command(grade_level, academic_year, semester, date_from, date_to, workers, output):
+    """Generate report cards for a grade level, skipping unchanged ones."""
+    def progress(done, total):
+        if total and (done == total or done % 100 == 0):
+            click.echo(f'  {done}/{total} cards rendered')
+
+    report = _report_cards(
+        grade_level, academic_year, semester,
+        date_from=date_from.date() if date_from else None,
+        date_to=date_to.date() if date_to else None,
+        workers=workers,
+        output=output,
+        progress=progress
+    )
+    click.echo(
+        f"{report['students']} students: {report['generated']} generated, "
+        f"{report['unchanged']} unchanged, {report['elapsedMs']}ms"
+    )
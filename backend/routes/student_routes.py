@@ -1,27 +1,70 @@
 
+import io
+from math import ceil
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from datetime import datetime
 from ..models.student import Student
-from ..utils.decorators import role_required
+from ..utils.decorators import role_required, current_role, read_replica, write_transaction
+from ..utils.pagination import keyset_paginate_select, InvalidCursor
+from ..utils.serializers import get_serializer, requested_fields
+from ..utils.search import is_search_index_supported, student_search_subquery
+from ..utils.snapshot_cache import note_tables_changed
+from ..utils.http_cache import (
+    collection_validators, resource_validators, is_not_modified, not_modified_response, with_validators
+)
+from ..utils.student_import import StudentImport, ImportFormatError, IMPORT_COLUMNS, DEFAULT_IMPORT_CHUNK_SIZE
 from ..app import db
 
 student_bp = Blueprint('students', __name__)
 
+def _restricted_fields(names):
+    """Which of ``names`` the caller's role may not see, and so may not set either."""
+    serializer = get_serializer('student')
+    role = current_role()[0]
+    return [name for name in names if name in serializer.fields and not serializer.fields[name].visible_to(role)]
+
+def _student_response(student_id):
+    """The student as the caller's role may see it, like ``get_student``."""
+    serializer = get_serializer('student')
+    stmt, fields = serializer.select(None, current_role()[0])
+    row = db.session.execute(stmt.where(Student.id == student_id)).one()
+    return serializer.to_dicts([row], fields)[0]
+
 @student_bp.route('', methods=['GET'])
 @jwt_required()
 @role_required(['admin', 'principal', 'teacher', 'receptionist'])
+@read_replica
 def get_students():
     try:
-        page = request.args.get('page', 1, type=int)
+        page = max(request.args.get('page', 1, type=int), 1)
         per_page = request.args.get('per_page', 20, type=int)
+        per_page = per_page if per_page > 0 else 20
         search = request.args.get('search', '')
         grade = request.args.get('grade', '')
         
-        query = Student.query.filter_by(is_active=True)
+        # ?fields=id,firstName,lastName selects only those columns
+        serializer = get_serializer('student')
+        stmt, fields = serializer.select(requested_fields(), current_role()[0])
+        
+        cursor_mode = 'after' in request.args
+        ranked = False
+        stmt = stmt.where(Student.is_active == True)
         
-        if search:
-            query = query.filter(
+        if search and is_search_index_supported(db.engine):
+            matches = student_search_subquery(db.session, search)
+            if matches is None:
+                stmt = stmt.where(db.false())
+            elif cursor_mode:
+                # Cursor pages keep the (last_name, id) order
+                stmt = stmt.where(Student.id.in_(db.select(matches.c.rowid)))
+            else:
+                ranked = True
+                stmt = stmt.join(matches, Student.id == matches.c.rowid).order_by(
+                    matches.c.score, Student.last_name, Student.id
+                )
+        elif search:
+            stmt = stmt.where(
                 (Student.first_name.contains(search)) |
                 (Student.last_name.contains(search)) |
                 (Student.student_id.contains(search)) |
@@ -29,26 +72,59 @@ def get_students():
             )
         
         if grade:
-            query = query.filter_by(grade=grade)
+            stmt = stmt.where(Student.grade == grade)
+        
+        validators = collection_validators(db.session, stmt, Student, fields=fields)
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+        
+        # Cursor mode: ?after=<cursor>&limit=N (pass an empty after for the first page)
+        if cursor_mode:
+            page = keyset_paginate_select(
+                db.session,
+                stmt,
+                [Student.last_name, Student.id],
+                after=request.args.get('after'),
+                limit=request.args.get('limit', per_page, type=int),
+                include_total=request.args.get('include_total', 'false').lower() == 'true'
+            )
+            result = {
+                'students': serializer.to_dicts(page.items, fields),
+                'next_cursor': page.next_cursor,
+                'has_more': page.has_more
+            }
+            if page.total is not None:
+                result['total'] = page.total
+            return with_validators(jsonify(result), validators), 200
         
-        students = query.paginate(page=page, per_page=per_page, error_out=False)
+        # Offset pages need a total order or rows can repeat or go missing between pages
+        if not ranked:
+            stmt = stmt.order_by(Student.last_name, Student.id)
+        # The validators query already counted the matching rows
+        rows = db.session.execute(stmt.limit(per_page).offset((page - 1) * per_page)).all()
         
-        return jsonify({
-            'students': [student.to_dict() for student in students.items],
-            'total': students.total,
-            'pages': students.pages,
-            'current_page': students.page
-        }), 200
+        return with_validators(jsonify({
+            'students': serializer.to_dicts(rows, fields),
+            'total': validators.total,
+            'pages': ceil(validators.total / per_page) if validators.total else 0,
+            'current_page': page
+        }), validators), 200
         
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 @student_bp.route('', methods=['POST'])
 @jwt_required()
 @role_required(['admin', 'principal', 'receptionist'])
+@write_transaction
 def create_student():
     try:
         data = request.get_json()
+        restricted = _restricted_fields(data)
+        if restricted:
+            return jsonify({'message': f"Your role may not set: {', '.join(restricted)}"}), 403
         
         # Check if student ID already exists
         existing_student = Student.query.filter_by(student_id=data['studentId']).first()
@@ -81,28 +157,83 @@ def create_student():
         db.session.add(student)
         db.session.commit()
         
-        return jsonify(student.to_dict()), 201
+        return jsonify(_student_response(student.id)), 201
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@student_bp.route('/import', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'principal', 'receptionist'])
+@write_transaction
+def import_students():
+    """Import students from a CSV upload (multipart ``file`` or a text/csv body).
+
+    Headers are the JSON keys ``create_student`` accepts. Valid rows are
+    inserted and invalid ones reported per row; with ``atomic=true`` any
+    error rolls back the whole import, and ``dryRun=true`` only validates.
+    """
+    try:
+        dry_run = request.args.get('dryRun', 'false').lower() == 'true'
+        atomic = request.args.get('atomic', 'false').lower() == 'true'
+        chunk_size = max(min(request.args.get('chunkSize', DEFAULT_IMPORT_CHUNK_SIZE, type=int), 5000), 1)
+
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+        job = StudentImport(
+            db.session, chunk_size=chunk_size, dry_run=dry_run,
+            excluded_columns=_restricted_fields(IMPORT_COLUMNS)
+        ).run(text)
+        report = job.report()
+        if atomic and job.errors:
+            db.session.rollback()
+            report['imported'] = 0
+            return jsonify(report), 400
+        if dry_run or not job.imported:
+            db.session.rollback()
+            return jsonify(report), 200
+
+        note_tables_changed(db.session, 'student')
+        db.session.commit()
+        return jsonify(report), 201
+
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'message': f'Invalid CSV: {e}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
 @student_bp.route('/<int:student_id>', methods=['GET'])
 @jwt_required()
 @role_required(['admin', 'principal', 'teacher', 'receptionist'])
 def get_student(student_id):
     try:
-        student = Student.query.get(student_id)
-        if not student or not student.is_active:
+        serializer = get_serializer('student')
+        stmt, fields = serializer.select(requested_fields(), current_role()[0])
+        row = db.session.execute(
+            stmt.add_columns(Student.updated_at).where(Student.id == student_id, Student.is_active == True)
+        ).first()
+        if row is None:
             return jsonify({'message': 'Student not found'}), 404
         
-        return jsonify(student.to_dict()), 200
+        validators = resource_validators(row[-1], fields)
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+        
+        return with_validators(jsonify(serializer.to_dicts([row], fields)[0]), validators), 200
         
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 @student_bp.route('/<int:student_id>', methods=['PUT'])
 @jwt_required()
 @role_required(['admin', 'principal', 'receptionist'])
+@write_transaction
 def update_student(student_id):
     try:
         student = Student.query.get(student_id)
@@ -110,6 +241,9 @@ def update_student(student_id):
             return jsonify({'message': 'Student not found'}), 404
         
         data = request.get_json()
+        restricted = _restricted_fields(data)
+        if restricted:
+            return jsonify({'message': f"Your role may not set: {', '.join(restricted)}"}), 403
         
         # Update fields
         for field_map in [
@@ -135,7 +269,7 @@ def update_student(student_id):
         
         db.session.commit()
         
-        return jsonify(student.to_dict()), 200
+        return jsonify(_student_response(student.id)), 200
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
@@ -143,6 +277,7 @@ def update_student(student_id):
 @student_bp.route('/<int:student_id>', methods=['DELETE'])
 @jwt_required()
 @role_required(['admin', 'principal'])
+@write_transaction
 def delete_student(student_id):
     try:
         student = Student.query.get(student_id)
@@ -0,0 +1,99 @@
+"""Shared fixtures: one app on a temporary SQLite file with a small synthetic school.
+
+Tests that write use rows of their own (or put back what they change), so
+the session's data stays usable by every module.
+"""
+
+from contextlib import contextmanager
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+# Settings for the test app; everything else keeps create_app's defaults
+TEST_ENVIRONMENT = {
+    'JWT_SECRET_KEY': 'test-suite-secret-key-0123456789abcdef',
+    # Every request reaches the database, and widgets build on the request thread
+    'DASHBOARD_CACHE_TTL': '0',
+    'DASHBOARD_CACHE_STALE_TTL': '0',
+    'CONCURRENT_READ_WORKERS': '1',
+    'JOB_RETRY_BASE_SECONDS': '0',
+}
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('school')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('DATABASE_URL', f"sqlite:///{directory / 'school.db'}")
+        patch.setenv('REPORT_CARD_DIR', str(directory / 'report_cards'))
+        for name, value in TEST_ENVIRONMENT.items():
+            patch.setenv(name, value)
+        from backend.app import create_app, init_database, db
+        from backend.benchmarks.synthetic import seed_synthetic_school
+
+        app = create_app()
+    app.config['TESTING'] = True
+    init_database(app)
+    with app.app_context():
+        seed_synthetic_school(db.engine, students=240, school_days=5)
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def headers_for(app):
+    """``headers_for(user_id)``: Authorization headers with the claims login would issue."""
+    from backend.app import db
+    from backend.models.user import User
+    from backend.utils.user_cache import user_claims
+
+    def headers(user_id):
+        with app.app_context():
+            user = db.session.get(User, user_id)
+            token = create_access_token(identity=str(user.id), additional_claims=user_claims(user))
+        return {'Authorization': f'Bearer {token}'}
+
+    return headers
+
+@pytest.fixture
+def admin_headers(app, headers_for):
+    from backend.models.user import User
+
+    with app.app_context():
+        admin = User.query.filter_by(email='admin@emsu.edu').one()
+    return headers_for(admin.id)
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@pytest.fixture
+def count_queries(app):
+    """``with count_queries() as counter:`` counts statements on every engine."""
+    from backend.app import db
+
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', counter)
+
+    return counting
@@ -0,0 +1,51 @@
+"""Announcement feed event log and stream positions."""
+
+import json
+from backend.utils.announcement_feed import AnnouncementFeed, _Snapshot
+
+def _item(announcement_id, audience='all'):
+    return {'id': announcement_id, 'targetAudience': audience, 'priority': 'normal', 'expiresAt': None}
+
+def _publish(feed, *items):
+    feed._publish_changes(_Snapshot([], (0, None, None)), _Snapshot(list(items), (len(items), None, None)))
+
+def _ids(chunk):
+    return [json.loads(line[len('data: '):])['id'] for line in chunk.splitlines() if line.startswith('data: ')]
+
+def test_chunks_replay_events_after_last_id():
+    feed = AnnouncementFeed()
+    chunk, last = feed._next_chunk('student', None, json.dumps)
+    assert chunk == ''
+
+    _publish(feed, _item(1), _item(2, 'teacher'), _item(3, 'student'))
+    chunk, last = feed._next_chunk('student', last, json.dumps)
+    assert _ids(chunk) == [3, 1]  # feed order: newest first
+    # The teacher-only event still moves the position on
+    assert last == feed.event_id(3)
+    assert feed._next_chunk('student', last, json.dumps) == ('', last)
+
+def test_event_published_between_read_and_position_still_arrives(monkeypatch):
+    feed = AnnouncementFeed()
+    _, last = feed._next_chunk(None, None, json.dumps)
+    _publish(feed, _item(1))
+    events_since = feed.events_since
+
+    def publish_right_after(last_event_id, audience):
+        result = events_since(last_event_id, audience)
+        _publish(feed, _item(2))
+        return result
+
+    monkeypatch.setattr(feed, 'events_since', publish_right_after)
+    chunk, last = feed._next_chunk(None, last, json.dumps)
+    assert _ids(chunk) == [1]
+    monkeypatch.undo()
+
+    chunk, last = feed._next_chunk(None, last, json.dumps)
+    assert _ids(chunk) == [2]
+
+def test_unknown_position_resets():
+    feed = AnnouncementFeed()
+    _publish(feed, _item(1))
+    chunk, last = feed._next_chunk(None, 'another-process-7', json.dumps)
+    assert 'event: reset' in chunk
+    assert last == feed.event_id(1)
@@ -0,0 +1,121 @@
+"""Bulk class-roll marking and the attendance summary it maintains."""
+
+import threading
+from datetime import date
+import pytest
+from sqlalchemy import select
+from backend.app import db
+from backend.models.attendance import Attendance
+from backend.models.attendance_summary import AttendanceSummary
+from backend.models.class_model import Class
+from backend.models.student import Student
+from backend.utils.attendance_summary import STATUS_COLUMNS
+from backend.utils.upsert import upsert_statement, UnsupportedDialect
+
+@pytest.fixture
+def roll(app):
+    """A class and its first few active students."""
+    with app.app_context():
+        class_ = db.session.get(Class, 1)
+        student_ids = db.session.scalars(
+            select(Student.id).where(Student.grade == class_.grade, Student.is_active == True)
+            .order_by(Student.id).limit(4)
+        ).all()
+    return class_.id, student_ids
+
+def _mark(client, headers, class_id, day, statuses):
+    return client.post('/api/attendance/bulk', headers=headers, json={
+        'classId': class_id,
+        'date': day.isoformat(),
+        'records': [{'studentId': student_id, 'status': status} for student_id, status in statuses.items()]
+    })
+
+def _stored(app, class_id, day):
+    with app.app_context():
+        return dict(db.session.execute(
+            select(Attendance.student_id, Attendance.status).where(Attendance.class_id == class_id, Attendance.date == day)
+        ).all())
+
+def test_bulk_mark_creates_then_updates(app, client, admin_headers, roll):
+    class_id, student_ids = roll
+    day = date(2001, 3, 5)
+
+    response = _mark(client, admin_headers, class_id, day, dict.fromkeys(student_ids[:3], 'present'))
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json() == {
+        'classId': class_id, 'date': day.isoformat(), 'created': 3, 'updated': 0, 'total': 3
+    }
+
+    statuses = {student_ids[0]: 'absent', student_ids[1]: 'present', student_ids[3]: 'late'}
+    response = _mark(client, admin_headers, class_id, day, statuses)
+    assert response.get_json()['created'] == 1
+    assert response.get_json()['updated'] == 2
+    assert _stored(app, class_id, day) == {
+        student_ids[0]: 'absent', student_ids[1]: 'present', student_ids[2]: 'present', student_ids[3]: 'late'
+    }
+
+def test_bulk_mark_rejects_the_whole_roll(app, client, admin_headers, roll):
+    class_id, student_ids = roll
+    day = date(2001, 3, 6)
+    response = _mark(client, admin_headers, class_id, day, {student_ids[0]: 'present', student_ids[1]: 'asleep'})
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'index': 1, 'message': "Invalid status 'asleep'"}]
+    assert _stored(app, class_id, day) == {}
+
+def test_upsert_names_unsupported_databases(app):
+    with pytest.raises(UnsupportedDialect, match='not supported on oracle'):
+        upsert_statement('oracle', Attendance.__table__, [{}], ('id',), 'pk')
+
+def _day_summary(app, class_id, day):
+    with app.app_context():
+        rows = db.session.execute(
+            select(AttendanceSummary).where(
+                AttendanceSummary.class_id == class_id,
+                AttendanceSummary.period == 'day',
+                AttendanceSummary.period_start == day
+            )
+        ).scalars().all()
+        return {row.student_id: {status: getattr(row, status) for status in STATUS_COLUMNS} for row in rows}
+
+def _expected_summary(statuses):
+    return {
+        student_id: {column: int(column == status) for column in STATUS_COLUMNS}
+        for student_id, status in statuses.items()
+    }
+
+def test_summary_follows_remarking(app, client, admin_headers, roll):
+    class_id, student_ids = roll
+    day = date(2001, 4, 2)
+    _mark(client, admin_headers, class_id, day, dict.fromkeys(student_ids, 'present'))
+    _mark(client, admin_headers, class_id, day, {student_ids[0]: 'absent', student_ids[1]: 'excused'})
+    assert _day_summary(app, class_id, day) == _expected_summary(_stored(app, class_id, day))
+
+def test_concurrent_markings_keep_the_summary_exact(app, admin_headers, roll):
+    class_id, student_ids = roll
+    day = date(2001, 4, 3)
+    rounds = 5
+    barrier = threading.Barrier(2)
+    failures = []
+
+    def mark(status):
+        client = app.test_client()
+        for _ in range(rounds):
+            barrier.wait()
+            response = _mark(client, admin_headers, class_id, day, dict.fromkeys(student_ids, status))
+            if response.status_code != 200:
+                failures.append(response.get_json())
+
+    threads = [threading.Thread(target=mark, args=(status,)) for status in ('present', 'absent')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    assert _day_summary(app, class_id, day) == _expected_summary(_stored(app, class_id, day))
+
+def test_boolean_student_ids_are_rejected(client, admin_headers, roll):
+    class_id, _ = roll
+    response = _mark(client, admin_headers, class_id, date(2001, 4, 4), {True: 'present'})
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'index': 0, 'message': 'studentId is required'}]
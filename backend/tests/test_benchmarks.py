@@ -0,0 +1,39 @@
+"""The benchmark harnesses, run against the test app."""
+
+import io
+import pytest
+from backend.benchmarks import query_plans
+from backend.benchmarks.load import _QueryCounter, run_scenario
+from backend.benchmarks.query_plans import admin_headers
+from backend.utils.concurrent_reads import concurrent_reads
+
+def test_load_counts_queries_run_on_worker_threads(app, monkeypatch):
+    monkeypatch.setattr(concurrent_reads, 'workers', 2)
+    with _QueryCounter(app) as counter:
+        stats = run_scenario(app, admin_headers(app), counter, 'GET', '/api/dashboard',
+                             requests=4, concurrency=2, warmup=1)
+    assert stats['errors'] == 0
+    assert stats['queries']['mean'] > 1
+    assert counter._collect not in app.teardown_request_funcs[None]
+
+@pytest.mark.parametrize('case', query_plans.CASES, ids=[case[0] for case in query_plans.CASES])
+def test_query_plans_use_indexes(app, case):
+    out = io.StringIO()
+    assert query_plans.run(app, [case], out=out) == [], out.getvalue()
+
+def test_full_scans_name_aliased_tables(app):
+    from sqlalchemy import select
+    from sqlalchemy.orm import aliased
+    from backend.app import db
+    from backend.models.student import Student
+
+    # Serializer joins alias their tables, and SQLite's plan shows only the alias
+    student = aliased(Student)
+    stmt = select(student.id).where(student.phone == '555-0100')
+    with app.app_context():
+        compiled = stmt.compile(db.engine)
+        statement = str(compiled)
+        with db.engine.connect() as connection:
+            plan = query_plans.plan_for(connection, statement, tuple(compiled.params.values()))
+    assert plan == ['SCAN student_1']
+    assert query_plans.full_scans(plan, query_plans.table_aliases(statement)) == {'student'}
@@ -0,0 +1,50 @@
+"""Dashboard scopes: teachers only see their own classes."""
+
+import pytest
+from sqlalchemy import delete
+from backend.app import db
+from backend.models.class_model import Class
+from backend.models.teacher import Teacher
+from backend.models.user import User
+from backend.utils.user_cache import user_cache
+
+@pytest.fixture
+def teacher(app, headers_for):
+    """A teacher account, the Teacher record it matches and one class of theirs."""
+    with app.app_context():
+        record = Teacher.query.filter_by(is_active=True).order_by(Teacher.id).first()
+        user = User(email=record.email, first_name='Own', last_name='Classes', role='teacher')
+        user.password_hash = 'x'
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        own_class = db.session.query(Class.id).filter_by(teacher_id=record.id).order_by(Class.id).limit(1).scalar()
+        other_class = db.session.query(Class.id).filter(Class.teacher_id != record.id).order_by(Class.id).limit(1).scalar()
+    yield headers_for(user_id), record.id, own_class, other_class
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(delete(User.__table__).where(User.__table__.c.id == user_id))
+    user_cache.invalidate(user_id)
+
+def test_teacher_defaults_to_own_classes(client, teacher):
+    headers, teacher_id, _, _ = teacher
+    response = client.get('/api/dashboard', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['scope'] == f'teacher:{teacher_id}'
+    assert 'fees' not in response.get_json()['widgets']
+
+def test_teacher_may_open_own_class(client, teacher):
+    headers, _, own_class, _ = teacher
+    response = client.get(f'/api/dashboard?classId={own_class}', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['scope'] == f'class:{own_class}'
+
+@pytest.mark.parametrize('query', ['classId={other_class}', 'teacherId={other_teacher}'])
+def test_teacher_may_not_open_other_scopes(client, teacher, query):
+    headers, teacher_id, _, other_class = teacher
+    url = '/api/dashboard?' + query.format(other_class=other_class, other_teacher=teacher_id + 1)
+    assert client.get(url, headers=headers).status_code == 403
+
+def test_admin_may_open_any_class(client, admin_headers, teacher):
+    _, _, _, other_class = teacher
+    assert client.get(f'/api/dashboard?classId={other_class}', headers=admin_headers).status_code == 200
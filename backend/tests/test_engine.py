@@ -0,0 +1,38 @@
+"""SQLite transactions: reads begin deferred, write endpoints take the lock up front."""
+
+from backend.app import db
+from backend.utils.engine import begin_write
+
+def _begins(counter):
+    return [statement for statement in counter.statements if statement.startswith('BEGIN')]
+
+def test_read_endpoints_begin_deferred(client, admin_headers, count_queries):
+    with count_queries() as counter:
+        assert client.get('/api/students', headers=admin_headers).status_code == 200
+    assert _begins(counter)
+    assert set(_begins(counter)) == {'BEGIN DEFERRED'}
+
+def test_write_endpoints_begin_immediate(client, admin_headers, count_queries):
+    with count_queries() as counter:
+        response = client.post('/api/students', headers=admin_headers, json={
+            'studentId': 'TX-0001', 'firstName': 'Lock', 'lastName': 'Test',
+            'email': 'lock-test@school.test', 'grade': '3'
+        })
+    assert response.status_code == 201, response.get_json()
+    assert _begins(counter)[0] == 'BEGIN IMMEDIATE'
+    client.delete(f"/api/students/{response.get_json()['id']}", headers=admin_headers)
+
+def test_reads_do_not_wait_for_a_writer(app, client, admin_headers):
+    # Another process is in the middle of a write transaction
+    with app.app_context():
+        engine = db.engine
+    student_id = client.get('/api/students', headers=admin_headers).get_json()['students'][0]['id']
+    with begin_write(engine) as writer:
+        writer.exec_driver_sql('UPDATE student SET phone = phone WHERE id = ?', (student_id,))
+        for url in ('/api/students', f'/api/students/{student_id}', '/api/dashboard'):
+            assert client.get(url, headers=admin_headers).status_code == 200, url
+
+def test_endpoints_that_commit_on_their_own_connections_hold_no_lock(client, admin_headers):
+    # recompute-status writes range by range outside the request's session
+    response = client.post('/api/fees/recompute-status', headers=admin_headers, json={'chunkSize': 100})
+    assert response.status_code == 200, response.get_json()
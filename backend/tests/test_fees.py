@@ -0,0 +1,111 @@
+"""Fee status engine, ledger and payments."""
+
+import threading
+from datetime import date, timedelta
+import pytest
+from backend.app import db
+from backend.models.fee import Fee
+from backend.models.student import Student
+from backend.utils.fee_engine import LateFeeRules, recompute_fee_status
+from backend.utils.fee_ledger import reconcile_fee_ledger
+
+AS_OF = date.today()
+
+@pytest.fixture
+def student_id(app):
+    with app.app_context():
+        return db.session.query(Student.id).filter(Student.is_active == True).order_by(Student.id).first()[0]
+
+def _add_fee(app, student_id, **values):
+    values = {
+        'fee_type': 'lab', 'amount': 100.0, 'due_date': AS_OF - timedelta(days=40), 'status': 'Pending',
+        'paid_amount': 0.0, 'discount_amount': 0.0, 'late_fee': 0.0, 'semester': '1', 'academic_year': 'T1',
+        **values
+    }
+    with app.app_context():
+        fee = Fee(student_id=student_id, **values)
+        db.session.add(fee)
+        db.session.commit()
+        return fee.id
+
+def _fee(app, fee_id):
+    with app.app_context():
+        fee = db.session.get(Fee, fee_id)
+        return fee.status, fee.late_fee, fee.paid_amount
+
+def _recompute(app, rules):
+    with app.app_context():
+        return recompute_fee_status(db.engine, rules, as_of=AS_OF, chunk_size=500)
+
+def test_late_fee_is_charged_once(app, student_id):
+    fee_id = _add_fee(app, student_id)
+    rules = LateFeeRules(flat=5.0, rate=0.1)
+
+    first = _recompute(app, rules)
+    assert first['rowsChanged']['lateFeesApplied'] >= 1
+    assert _fee(app, fee_id) == ('Overdue', 15.0, 0.0)
+
+    second = _recompute(app, rules)
+    assert second['totalChanged'] == 0
+    assert _fee(app, fee_id) == ('Overdue', 15.0, 0.0)
+
+def test_late_fee_of_nothing_is_not_reapplied(app, student_id):
+    fee_id = _add_fee(app, student_id, amount=10.0)
+    # 0.0001 x 10 rounds to a late fee of 0.00
+    rules = LateFeeRules(rate=0.0001)
+
+    _recompute(app, rules)
+    assert _fee(app, fee_id) == ('Overdue', 0.0, 0.0)
+    assert _recompute(app, rules)['totalChanged'] == 0
+
+def test_late_fee_set_by_hand_is_kept(app, student_id):
+    fee_id = _add_fee(app, student_id, late_fee=2.5)
+    _recompute(app, LateFeeRules(flat=5.0))
+    assert _fee(app, fee_id) == ('Overdue', 2.5, 0.0)
+
+def _ledger_drift(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            return reconcile_fee_ledger(connection)
+
+def test_concurrent_payments_all_count(app, admin_headers, student_id):
+    fee_id = _add_fee(app, student_id, amount=1000.0, due_date=AS_OF + timedelta(days=30))
+    payers, payments = 4, 5
+    barrier = threading.Barrier(payers)
+    statuses = []
+
+    def pay():
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(payments):
+            response = client.post(f'/api/fees/{fee_id}/payments', headers=admin_headers, json={'amount': 10})
+            statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=pay) for _ in range(payers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * payers * payments
+    assert _fee(app, fee_id) == ('Partial', 0.0, 10.0 * payers * payments)
+    assert _ledger_drift(app) == []
+
+def test_ledger_reconciles_after_every_kind_of_change(app, client, admin_headers, student_id):
+    response = client.post('/api/fees', headers=admin_headers, json={
+        'studentId': student_id, 'feeType': 'exam', 'amount': 80, 'dueDate': (AS_OF - timedelta(days=3)).isoformat(),
+        'semester': '2', 'academicYear': 'T2'
+    })
+    assert response.status_code == 201, response.get_json()
+    fee_id = response.get_json()['id']
+    assert client.post(f'/api/fees/{fee_id}/payments', headers=admin_headers, json={'amount': 30}).status_code == 200
+    _recompute(app, LateFeeRules(flat=4.0))
+    assert _fee(app, fee_id) == ('Overdue', 4.0, 30.0)
+    assert _ledger_drift(app) == []
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('UPDATE fee_ledger SET billed = billed + 1')
+            drift = reconcile_fee_ledger(connection, fix=True)
+    assert drift
+    assert _ledger_drift(app) == []
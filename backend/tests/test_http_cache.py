@@ -0,0 +1,65 @@
+"""Conditional GETs: ETags, Last-Modified and 304 responses."""
+
+import pytest
+from sqlalchemy import delete
+from backend.app import db
+from backend.models.student import Student
+from backend.models.user import User
+
+@pytest.mark.parametrize('url', [
+    '/api/students?grade=3',
+    '/api/grades?per_page=5',
+    '/api/attendance?per_page=5',
+    '/api/fees?per_page=5',
+    '/api/announcements',
+])
+def test_repeat_request_is_not_modified(client, admin_headers, url):
+    first = client.get(url, headers=admin_headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/"')
+
+    again = client.get(url, headers={**admin_headers, 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == etag
+
+    assert client.get(url, headers={**admin_headers, 'If-None-Match': 'W/"other"'}).status_code == 200
+
+def test_list_etag_follows_writes(app, client, admin_headers):
+    url = '/api/students?grade=3'
+    etag = client.get(url, headers=admin_headers).headers['ETag']
+    created = client.post('/api/students', headers=admin_headers, json={
+        'studentId': 'ETAG-0001', 'firstName': 'Etag', 'lastName': 'Student',
+        'email': 'etag@school.test', 'grade': '3'
+    })
+    assert created.status_code == 201
+    try:
+        changed = client.get(url, headers={**admin_headers, 'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+    finally:
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(delete(Student.__table__).where(Student.__table__.c.student_id == 'ETAG-0001'))
+
+def test_etag_differs_by_visible_fields(app, client, admin_headers, headers_for):
+    with app.app_context():
+        receptionist = db.session.query(User.id).filter_by(role='receptionist').order_by(User.id).limit(1).scalar()
+    url = '/api/students?grade=3'
+    admin_etag = client.get(url, headers=admin_headers).headers['ETag']
+    response = client.get(url, headers={**headers_for(receptionist), 'If-None-Match': admin_etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != admin_etag
+
+def test_detail_honours_if_modified_since(client, admin_headers):
+    student_id = client.get('/api/students?per_page=1', headers=admin_headers).get_json()['students'][0]['id']
+    url = f'/api/students/{student_id}'
+    first = client.get(url, headers=admin_headers)
+    last_modified = first.headers['Last-Modified']
+
+    again = client.get(url, headers={**admin_headers, 'If-Modified-Since': last_modified})
+    assert again.status_code == 304
+    # If-None-Match wins over If-Modified-Since
+    stale = client.get(url, headers={**admin_headers, 'If-Modified-Since': last_modified, 'If-None-Match': 'W/"x"'})
+    assert stale.status_code == 200
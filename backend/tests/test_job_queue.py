@@ -0,0 +1,148 @@
+"""Job queue leases, fencing, retries and the worker loop."""
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+from backend.utils.job_queue import JOB_TYPES, JobWorker, job_queue, job_type
+
+@pytest.fixture
+def queue(app):
+    """The app's queue, emptied, with an echo job and a failing job registered."""
+    @job_type('test-echo', roles=['admin'])
+    def echo(payload, job):
+        job.progress(1, 1)
+        return payload
+
+    @job_type('test-broken', roles=['admin'])
+    def broken(payload, job):
+        raise RuntimeError('broken on purpose')
+
+    with job_queue.engine.begin() as connection:
+        connection.execute(delete(job_queue.table))
+    yield job_queue
+    JOB_TYPES.pop('test-echo')
+    JOB_TYPES.pop('test-broken')
+
+def _row(queue, job_id):
+    with queue.engine.connect() as connection:
+        return connection.execute(select(queue.table).where(queue.table.c.id == job_id)).mappings().one()
+
+def _expire_lease(queue, job_id):
+    with queue.engine.begin() as connection:
+        connection.execute(
+            update(queue.table).where(queue.table.c.id == job_id)
+            .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+def test_claim_takes_highest_priority_first(queue):
+    low = queue.enqueue('test-echo', {'n': 1})
+    high = queue.enqueue('test-echo', {'n': 2}, priority=5)
+
+    assert queue.claim('worker-a') == (high, 'test-echo', {'n': 2}, None)
+    row = _row(queue, high)
+    assert (row['status'], row['locked_by'], row['attempts']) == ('running', 'worker-a', 1)
+    assert row['lease_expires_at'] > datetime.utcnow()
+
+    assert queue.claim('worker-b')[0] == low
+    assert queue.claim('worker-c') is None
+
+def test_expired_lease_is_reclaimed_and_fenced(queue):
+    job_id = queue.enqueue('test-echo')
+    queue.claim('worker-a')
+    assert queue.claim('worker-b') is None
+
+    _expire_lease(queue, job_id)
+    assert queue.claim('worker-b')[0] == job_id
+    assert _row(queue, job_id)['attempts'] == 2
+
+    # The first worker lost its lease: none of its writes land
+    assert not queue.heartbeat(job_id, 'worker-a')
+    assert not queue.complete(job_id, 'worker-a', {'from': 'a'})
+    assert not queue.fail(job_id, 'worker-a', 'late failure')
+    row = _row(queue, job_id)
+    assert (row['status'], row['locked_by'], row['error']) == ('running', 'worker-b', None)
+
+    assert queue.complete(job_id, 'worker-b', {'from': 'b'})
+    row = _row(queue, job_id)
+    assert (row['status'], row['result'], row['locked_by']) == ('succeeded', '{"from":"b"}', None)
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue):
+    job_id = queue.enqueue('test-echo', max_attempts=1)
+    queue.claim('worker-a')
+    _expire_lease(queue, job_id)
+
+    assert queue.claim('worker-b') is None
+    row = _row(queue, job_id)
+    assert row['status'] == 'failed'
+    assert 'lease expired' in row['error']
+
+def test_failed_attempts_back_off_until_exhausted(queue):
+    job_id = queue.enqueue('test-echo', max_attempts=2)
+    queue.claim('worker-a')
+    assert queue.fail(job_id, 'worker-a', 'first')
+    row = _row(queue, job_id)
+    assert (row['status'], row['error'], row['locked_by']) == ('queued', 'first', None)
+    assert row['run_at'] <= datetime.utcnow()  # JOB_RETRY_BASE_SECONDS is 0 under test
+
+    assert queue.claim('worker-a')[0] == job_id
+    assert queue.fail(job_id, 'worker-a', 'second')
+    row = _row(queue, job_id)
+    assert (row['status'], row['attempts'], row['error']) == ('failed', 2, 'second')
+    assert row['finished_at'] is not None
+
+def test_retry_delay_grows_and_is_capped(queue, monkeypatch):
+    monkeypatch.setattr(queue, 'retry_base_seconds', 10)
+    monkeypatch.setattr(queue, 'retry_max_seconds', 60)
+    assert 9 <= queue.retry_delay(1) <= 11
+    assert 36 <= queue.retry_delay(3) <= 44
+    assert 54 <= queue.retry_delay(10) <= 66
+
+def test_cancel_only_queued_jobs(queue):
+    waiting = queue.enqueue('test-echo')
+    assert queue.cancel(waiting)
+    assert _row(queue, waiting)['status'] == 'cancelled'
+    assert queue.claim('worker-a') is None
+
+    running = queue.enqueue('test-echo')
+    queue.claim('worker-a')
+    assert not queue.cancel(running)
+    assert _row(queue, running)['status'] == 'running'
+
+def test_worker_runs_jobs_to_their_outcome(app, queue):
+    done = queue.enqueue('test-echo', {'echo': True})
+    broken = queue.enqueue('test-broken', max_attempts=2)
+
+    assert JobWorker(app, queue, name='test').run(burst=True) == 3
+    assert _row(queue, done)['status'] == 'succeeded'
+    assert queue.get(done)['result'] == {'echo': True}
+    row = _row(queue, broken)
+    assert (row['status'], row['attempts']) == ('failed', 2)
+    assert row['error'] == 'RuntimeError: broken on purpose'
+
+def test_worker_keeps_polling_through_database_errors(app, queue, monkeypatch):
+    job_id = queue.enqueue('test-echo')
+    claim, complete = queue.claim, queue.complete
+    failures = {'claim': 2, 'complete': 1}
+
+    def flaky(name, method):
+        def call(*args, **kwargs):
+            if failures[name]:
+                failures[name] -= 1
+                raise OperationalError('SELECT 1', {}, Exception('database is locked'))
+            return method(*args, **kwargs)
+        return call
+
+    monkeypatch.setattr(queue, 'poll_interval', 0.01)
+    monkeypatch.setattr(queue, 'claim', flaky('claim', claim))
+    monkeypatch.setattr(queue, 'complete', flaky('complete', complete))
+    worker = JobWorker(app, queue, name='test')
+
+    # The outcome could not be recorded, so the job is left to its lease
+    assert worker.run(max_jobs=1) == 1
+    assert failures == {'claim': 0, 'complete': 0}
+    assert _row(queue, job_id)['status'] == 'running'
+
+    _expire_lease(queue, job_id)
+    assert worker.run(burst=True) == 1
+    assert _row(queue, job_id)['status'] == 'succeeded'
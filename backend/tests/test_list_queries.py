@@ -0,0 +1,25 @@
+"""List endpoints run a fixed number of queries, however large the page."""
+
+import pytest
+
+@pytest.mark.parametrize('url', [
+    '/api/grades',
+    '/api/attendance',
+    '/api/fees',
+    '/api/announcements?includeInactive=true',
+])
+def test_query_count_does_not_grow_with_page_size(client, admin_headers, count_queries, url):
+    separator = '&' if '?' in url else '?'
+    # Warm the user cache so both pages start from the same state
+    assert client.get(url, headers=admin_headers).status_code == 200
+
+    counts = {}
+    for per_page in (5, 100):
+        with count_queries() as counter:
+            response = client.get(f'{url}{separator}per_page={per_page}', headers=admin_headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        key = next(name for name, value in response.get_json().items() if isinstance(value, list))
+        assert len(response.get_json()[key]) == per_page
+        counts[per_page] = counter.count
+
+    assert 0 < counts[5] == counts[100]
@@ -0,0 +1,39 @@
+"""Report card files: content-addressed cards and the per-term manifest."""
+
+import json
+import os
+import threading
+from backend.app import db
+from backend.utils.report_cards import generate_report_cards, prefetch_report_card_inputs
+
+def test_concurrent_runs_share_cards_and_manifest(app, tmp_path):
+    with app.app_context():
+        payloads = prefetch_report_card_inputs(db.session, '7')
+    assert payloads
+
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def generate():
+        barrier.wait()
+        try:
+            generate_report_cards(payloads, str(tmp_path), workers=1)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=generate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    written = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert not [path for path in written if path.endswith('.tmp')]
+    (manifest,) = os.listdir(tmp_path / 'manifests')
+    with open(tmp_path / 'manifests' / manifest) as handle:
+        cards = json.load(handle)['cards']
+    assert len(cards) == len(payloads)
+    assert all(os.path.exists(tmp_path / path) for path in cards.values())
+
+    assert generate_report_cards(payloads, str(tmp_path), workers=1)['unchanged'] == len(payloads)
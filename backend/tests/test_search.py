@@ -0,0 +1,42 @@
+"""Student search: prefix matches first, trigram matches as the fallback."""
+
+import pytest
+from sqlalchemy import delete
+from backend.app import db
+from backend.models.student import Student
+from backend.utils import search
+
+@pytest.fixture
+def add_students(app):
+    """``add_students((last_name, is_active), ...)`` in rowid order; removed afterwards."""
+    created = []
+
+    def add(*students):
+        with app.app_context():
+            for last_name, is_active in students:
+                number = len(created) + 1
+                student = Student(student_id=f'SRCH-{number:04d}', first_name='Search', last_name=last_name,
+                                  email=f'srch{number}@example.test', grade='5', is_active=is_active)
+                db.session.add(student)
+                db.session.commit()
+                created.append(student.student_id)
+
+    yield add
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(delete(Student.__table__).where(Student.__table__.c.student_id.in_(created)))
+
+def _last_names(client, headers, term):
+    response = client.get(f'/api/students?search={term}&fields=lastName', headers=headers)
+    assert response.status_code == 200
+    return [student['lastName'] for student in response.get_json()['students']]
+
+def test_fuzzy_candidates_are_the_best_scoring(client, admin_headers, add_students, monkeypatch):
+    add_students(('Qwerzzzz', True), ('Qwertyuiop', True))
+    monkeypatch.setattr(search, 'FUZZY_CANDIDATE_LIMIT', 1)
+    # A misspelling: no prefix match, so trigrams decide
+    assert _last_names(client, admin_headers, 'Qwertyuipo') == ['Qwertyuiop']
+
+def test_inactive_prefix_match_falls_back_to_fuzzy(client, admin_headers, add_students):
+    add_students(('Zyxwvut', False), ('Zyxwvat', True))
+    assert _last_names(client, admin_headers, 'Zyxwvut') == ['Zyxwvat']
@@ -0,0 +1,88 @@
+"""CSV student import: savepoints around each chunk."""
+
+import pytest
+from sqlalchemy import delete, false, select
+from backend.app import db
+from backend.models.student import Student
+from backend.utils import student_import
+
+HEADER = 'studentId,firstName,lastName,email,grade\n'
+
+@pytest.fixture
+def imported_ids(app):
+    """Student ids the test may create; removed afterwards."""
+    ids = ['IMP-0001', 'IMP-0002', 'IMP-0003', 'IMP-0004']
+    yield ids
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(delete(Student.__table__).where(Student.__table__.c.student_id.in_(ids)))
+
+def _row(student_id, email):
+    return f'{student_id},Imported,Student,{email},7\n'
+
+def _import(client, headers, body, **params):
+    query = '&'.join(f'{name}={value}' for name, value in params.items())
+    return client.post(f'/api/students/import?{query}', data=HEADER + body, content_type='text/csv', headers=headers)
+
+def _stored(app, ids):
+    with app.app_context():
+        return sorted(db.session.execute(select(Student.student_id).where(Student.student_id.in_(ids))).scalars())
+
+def test_conflicting_chunk_rolls_back_to_its_savepoint(app, client, admin_headers, imported_ids, monkeypatch):
+    # As if another request inserted S0000001 after the uniqueness check ran
+    monkeypatch.setattr(student_import, 'or_', lambda *clauses: false())
+    body = _row('IMP-0001', 'imp1@school.test') + _row('S0000001', 'imp2@school.test') + \
+        _row('IMP-0002', 'imp3@school.test')
+    response = _import(client, admin_headers, body, chunkSize=10)
+
+    assert response.status_code == 201, response.get_json()
+    report = response.get_json()
+    assert (report['imported'], report['failed']) == (2, 1)
+    assert report['errors'][0]['studentId'] == 'S0000001'
+    assert report['errors'][0]['errors'][0].startswith('Rejected by the database')
+    assert _stored(app, imported_ids) == ['IMP-0001', 'IMP-0002']
+
+def test_atomic_import_keeps_nothing_after_an_error(app, client, admin_headers, imported_ids):
+    body = _row('IMP-0001', 'imp1@school.test') + _row('IMP-0002', 'imp2@school.test') + \
+        _row('IMP-0003', 'not-an-email')
+    response = _import(client, admin_headers, body, atomic='true', chunkSize=1)
+
+    assert response.status_code == 400
+    assert response.get_json()['imported'] == 0
+    assert _stored(app, imported_ids) == []
+
+def test_dry_run_only_validates(app, client, admin_headers, imported_ids):
+    body = _row('IMP-0001', 'imp1@school.test') + _row('S0000001', 'imp2@school.test')
+    report = _import(client, admin_headers, body, dryRun='true').get_json()
+
+    assert (report['imported'], report['failed']) == (1, 1)
+    assert report['errors'][0]['errors'] == ['Student ID already exists']
+    assert _stored(app, imported_ids) == []
+
+def test_blank_optional_cells_do_not_shift_other_rows(app, client, admin_headers, imported_ids):
+    body = (
+        'studentId,firstName,lastName,email,grade,phone,bloodGroup,dateOfBirth\n'
+        'IMP-0001,A,One,imp1@school.test,7,555-0001,,\n'
+        'IMP-0002,B,Two,imp2@school.test,7,,O+,2010-02-03\n'
+        'IMP-0003,C,Three,imp3@school.test,7,,,\n'
+        'IMP-0004,D,Four,imp4@school.test,7,555-0004,AB-,2011-04-05\n'
+    )
+    response = client.post('/api/students/import?chunkSize=10', data=body, content_type='text/csv',
+                           headers=admin_headers)
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()['imported'] == 4
+
+    with app.app_context():
+        stored = {
+            row.student_id: (row.phone, row.blood_group, row.date_of_birth and row.date_of_birth.isoformat())
+            for row in db.session.execute(
+                select(Student.student_id, Student.phone, Student.blood_group, Student.date_of_birth)
+                .where(Student.student_id.in_(imported_ids))
+            )
+        }
+    assert stored == {
+        'IMP-0001': ('555-0001', None, None),
+        'IMP-0002': (None, 'O+', '2010-02-03'),
+        'IMP-0003': (None, None, None),
+        'IMP-0004': ('555-0004', 'AB-', '2011-04-05'),
+    }
@@ -0,0 +1,99 @@
+"""Student list paging and per-role field visibility."""
+
+import pytest
+from sqlalchemy import delete
+from backend.app import db
+from backend.models.student import Student
+from backend.models.user import User
+
+def _staff_headers(app, headers_for, role):
+    with app.app_context():
+        user_id = db.session.query(User.id).filter_by(role=role, is_active=True).order_by(User.id).limit(1).scalar()
+    return headers_for(user_id)
+
+def test_offset_pages_follow_name_order(client, admin_headers):
+    seen = []
+    page = 1
+    while True:
+        body = client.get(f'/api/students?page={page}&per_page=37&fields=id,lastName', headers=admin_headers).get_json()
+        seen.extend((student['lastName'], student['id']) for student in body['students'])
+        if page >= body['pages']:
+            break
+        page += 1
+    assert len(seen) == body['total'] == len(set(seen))
+    assert seen == sorted(seen)
+
+@pytest.mark.parametrize('query', ['', '&grade=10', '&search=Last1'])
+def test_offset_page_query_is_ordered(client, admin_headers, count_queries, query):
+    with count_queries() as counter:
+        assert client.get(f'/api/students?page=2&per_page=5{query}', headers=admin_headers).status_code == 200
+    paging = [statement for statement in counter.statements if 'OFFSET' in statement]
+    assert paging and all('ORDER BY' in statement for statement in paging)
+
+@pytest.mark.parametrize('role, visible', [
+    ('admin', True), ('principal', True), ('teacher', True), ('receptionist', False)
+])
+def test_medical_fields_by_role(app, client, headers_for, role, visible):
+    headers = _staff_headers(app, headers_for, role)
+    listing = client.get('/api/students?per_page=3', headers=headers)
+    assert listing.status_code == 200
+    student = listing.get_json()['students'][0]
+    assert ('medicalInfo' in student) is visible
+    assert ('bloodGroup' in student) is visible
+
+    detail = client.get(f"/api/students/{student['id']}", headers=headers).get_json()
+    assert ('medicalInfo' in detail) is visible
+
+    requested = client.get('/api/students?per_page=3&fields=id,bloodGroup', headers=headers)
+    if visible:
+        assert requested.status_code == 200
+        assert set(requested.get_json()['students'][0]) == {'id', 'bloodGroup'}
+    else:
+        assert requested.status_code == 400
+        assert 'bloodGroup' in requested.get_json()['message']
+
+def test_unknown_field_is_rejected(client, admin_headers):
+    response = client.get('/api/students?fields=id,shoeSize', headers=admin_headers)
+    assert response.status_code == 400
+
+@pytest.fixture
+def new_student(app):
+    """Body for a student the test creates; removed afterwards."""
+    yield {'studentId': 'VIS-0001', 'firstName': 'Visible', 'lastName': 'Fields',
+           'email': 'visible@school.test', 'grade': '4'}
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(delete(Student.__table__).where(Student.__table__.c.student_id == 'VIS-0001'))
+
+def test_write_responses_follow_role_visibility(app, client, headers_for, admin_headers, new_student):
+    receptionist = _staff_headers(app, headers_for, 'receptionist')
+
+    created = client.post('/api/students', headers=receptionist, json=new_student)
+    assert created.status_code == 201, created.get_json()
+    student = created.get_json()
+    assert student['studentId'] == 'VIS-0001'
+    assert 'medicalInfo' not in student and 'bloodGroup' not in student
+
+    updated = client.put(f"/api/students/{student['id']}", headers=receptionist, json={'phone': '555-0100'})
+    assert updated.status_code == 200
+    assert updated.get_json()['phone'] == '555-0100'
+    assert 'medicalInfo' not in updated.get_json() and 'bloodGroup' not in updated.get_json()
+
+    as_admin = client.put(f"/api/students/{student['id']}", headers=admin_headers, json={'bloodGroup': 'O+'})
+    assert as_admin.get_json()['bloodGroup'] == 'O+'
+
+@pytest.mark.parametrize('field', ['medicalInfo', 'bloodGroup'])
+def test_roles_cannot_write_fields_they_cannot_see(app, client, headers_for, admin_headers, new_student, field):
+    receptionist = _staff_headers(app, headers_for, 'receptionist')
+    refused = client.post('/api/students', headers=receptionist, json={**new_student, field: 'x'})
+    assert refused.status_code == 403
+    assert field in refused.get_json()['message']
+
+    student_id = client.post('/api/students', headers=admin_headers, json=new_student).get_json()['id']
+    refused = client.put(f'/api/students/{student_id}', headers=receptionist, json={field: None})
+    assert refused.status_code == 403
+
+    body = f'studentId,firstName,lastName,email,grade,{field}\nVIS-0002,A,B,vis2@school.test,4,x\n'
+    imported = client.post('/api/students/import', headers=receptionist, data=body, content_type='text/csv')
+    assert imported.status_code == 400
+    assert field in imported.get_json()['message']
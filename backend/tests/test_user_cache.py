@@ -0,0 +1,53 @@
+"""Role claims in tokens versus role changes made elsewhere."""
+
+import pytest
+from flask_jwt_extended import verify_jwt_in_request
+from sqlalchemy import delete, update
+from backend.app import db
+from backend.models.user import User
+from backend.utils.decorators import current_role
+from backend.utils.user_cache import user_cache
+
+@pytest.fixture
+def teacher_id(app):
+    with app.app_context():
+        user = User(email='claims-test@school.test', first_name='Claims', last_name='Test', role='teacher')
+        user.password_hash = 'x'
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    yield user_id
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(delete(User.__table__).where(User.__table__.c.id == user_id))
+    user_cache.invalidate(user_id)
+
+def _role(app, headers):
+    with app.test_request_context(headers=headers):
+        verify_jwt_in_request()
+        return current_role()
+
+def _promote_elsewhere(app, user_id):
+    # A Core update fires no session events, as if another worker saved it
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(update(User.__table__).where(User.__table__.c.id == user_id).values(role='principal'))
+
+def test_recent_claims_skip_the_database(app, teacher_id, headers_for):
+    headers = headers_for(teacher_id)
+    _promote_elsewhere(app, teacher_id)
+    assert _role(app, headers) == ('teacher', True)
+
+def test_claims_older_than_the_cache_ttl_are_rechecked(app, teacher_id, headers_for, monkeypatch):
+    headers = headers_for(teacher_id)
+    _promote_elsewhere(app, teacher_id)
+    user_cache.invalidate(teacher_id)
+    monkeypatch.setattr(user_cache, 'ttl', 0)
+    assert _role(app, headers) == ('principal', True)
+
+def test_local_role_change_revokes_claims_at_once(app, teacher_id, headers_for):
+    headers = headers_for(teacher_id)
+    with app.app_context():
+        db.session.get(User, teacher_id).is_active = False
+        db.session.commit()
+    assert _role(app, headers) == ('teacher', False)
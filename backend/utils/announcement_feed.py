@@ -0,0 +1,380 @@
+
+import asyncio
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import select, func
+from .pagination import encode_cursor, decode_cursor, InvalidCursor
+from .snapshot_cache import snapshot_cache
+
+# Feed order: most urgent first, newest first within a priority
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'normal': 2, 'low': 3}
+
+# Set by the ASGI adapter: it can hold event streams on its event loop
+ASYNC_STREAMS_KEY = 'asgi.async_streams'
+# Set by a view for the adapter: ``stream(send, receive)``, awaited once the
+# response headers are out, writes the rest of the body
+ASYNC_STREAM_KEY = 'asgi.async_stream'
+
+def _rank(item):
+    return PRIORITY_RANK.get(item['priority'], len(PRIORITY_RANK))
+
+def _sort_key(item):
+    return _rank(item), -item['id']
+
+def _visible_to(target, audience):
+    return audience is None or target in (audience, 'all')
+
+class Subscription:
+    """One event stream: its audience and the last event id the client has."""
+
+    def __init__(self, audience, last_event_id=None):
+        self.audience = audience
+        self.last_event_id = last_event_id
+
+class _Snapshot:
+    """The live announcements at one point in time, sorted in feed order."""
+
+    def __init__(self, items, version):
+        self.items = sorted(items, key=_sort_key)
+        self.by_id = {item['id']: item for item in self.items}
+        self.version = version
+        expiries = [item['expiresAt'] for item in self.items if item['expiresAt'] is not None]
+        self.next_expiry = min(expiries) if expiries else None
+        self._audiences = {}
+
+    def for_audience(self, audience):
+        """``(items, sort keys)`` visible to ``audience``, computed once per snapshot."""
+        cached = self._audiences.get(audience)
+        if cached is None:
+            items = [item for item in self.items if _visible_to(item['targetAudience'], audience)]
+            cached = self._audiences[audience] = (items, [_sort_key(item) for item in items])
+        return cached
+
+class AnnouncementFeed:
+    """Per-process, precomputed feed of live announcements.
+
+    The active, unexpired announcements are loaded with their authors in
+    one query and kept in feed order. Each audience's slice is cut once
+    per snapshot, so serving a page is a bisect on the cursor. The
+    snapshot is rebuilt:
+
+    - when a commit in this process touches announcements or users (the
+      snapshot cache's invalidation hook);
+    - when the next announcement reaches ``expires_at``;
+    - at most every ``ttl`` seconds, when a version query shows that
+      another process changed announcements.
+
+    A rebuild diffs the old snapshot against the new one. Each difference
+    becomes an event in a short log: ``announcement`` for new or edited
+    items, and ``expired`` or ``removed`` for items that left the feed.
+    Event streams replay the log from ``Last-Event-ID`` and then wait for
+    new events, so open tabs cost no queries. While any stream is open, a
+    background thread makes sure expiries and other processes' writes are
+    noticed even when no request arrives.
+    """
+
+    def __init__(self, ttl=30, log_size=1000, max_streams=100, heartbeat_seconds=15, stream_seconds=300):
+        self.ttl = ttl
+        self.log_size = log_size
+        self.max_streams = max_streams
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stream_seconds = stream_seconds
+        self.app = None
+        self.boot = f'{os.getpid():x}{int(time.time()):x}'
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._seq = 0
+        self._events = deque(maxlen=log_size)
+        self._build_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._async_waiters = set()
+        self._streams = 0
+        self._subscribers = 0
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl = app.config.get('FEED_CACHE_TTL', self.ttl)
+        self.max_streams = app.config.get('FEED_MAX_STREAMS', self.max_streams)
+        self.heartbeat_seconds = app.config.get('FEED_HEARTBEAT_SECONDS', self.heartbeat_seconds)
+        self.stream_seconds = app.config.get('FEED_STREAM_SECONDS', self.stream_seconds)
+        self._events = deque(self._events, maxlen=app.config.get('FEED_EVENT_LOG', self.log_size))
+        self._snapshot = None
+        self._stale = True
+        snapshot_cache.add_listener(self._tables_changed)
+
+    def _tables_changed(self, tables):
+        # Called from after_commit: only note it, the next read rebuilds
+        if 'announcement' in tables or 'user' in tables:
+            self._stale = True
+            self._wakeup.set()
+
+    # Building
+
+    def _load(self):
+        from ..app import db
+        from ..models.announcement import Announcement
+        from .serializers import get_serializer
+
+        serializer = get_serializer('announcement')
+        stmt, fields = serializer.select()
+        stmt = stmt.where(
+            Announcement.is_active == True,
+            (Announcement.expires_at == None) | (Announcement.expires_at > datetime.utcnow())
+        )
+        with self.app.app_context():
+            db.session.info['use_read_bind'] = True
+            version = db.session.execute(self._version_query()).one()
+            items = serializer.to_dicts(db.session.execute(stmt).all(), fields)
+        return items, tuple(version)
+
+    def _version_query(self):
+        from ..models.announcement import Announcement
+
+        return select(func.count(Announcement.id), func.max(Announcement.id), func.max(Announcement.updated_at))
+
+    def _current_version(self):
+        from ..app import db
+
+        with self.app.app_context():
+            db.session.info['use_read_bind'] = True
+            return tuple(db.session.execute(self._version_query()).one())
+
+    def refresh(self):
+        """The current snapshot, rebuilt first if it may be out of date."""
+        snapshot = self._snapshot
+        now = datetime.utcnow()
+        expired = snapshot is not None and snapshot.next_expiry is not None and snapshot.next_expiry <= now
+        if snapshot is not None and not self._stale and not expired and \
+                time.monotonic() - self._checked_at < self.ttl:
+            return snapshot
+
+        with self._build_lock:
+            snapshot = self._snapshot
+            expired = snapshot is not None and snapshot.next_expiry is not None and \
+                snapshot.next_expiry <= datetime.utcnow()
+            if snapshot is not None and not self._stale and not expired:
+                if time.monotonic() - self._checked_at < self.ttl:
+                    return snapshot
+                # Only the TTL ran out: rebuild if another process wrote
+                if self._current_version() == snapshot.version:
+                    self._checked_at = time.monotonic()
+                    return snapshot
+
+            self._stale = False
+            started = time.monotonic()
+            items, version = self._load()
+            rebuilt = _Snapshot(items, version)
+            self._snapshot = rebuilt
+            self._checked_at = started
+            if snapshot is not None:
+                self._publish_changes(snapshot, rebuilt)
+            return rebuilt
+
+    # Events
+
+    def _publish_changes(self, old, new):
+        now = datetime.utcnow()
+        events = []
+        for item in new.items:
+            if old.by_id.get(item['id']) != item:
+                events.append(('announcement', item['targetAudience'], item))
+        for announcement_id, item in old.by_id.items():
+            if announcement_id not in new.by_id:
+                gone = 'expired' if item['expiresAt'] is not None and item['expiresAt'] <= now else 'removed'
+                events.append((gone, item['targetAudience'], {'id': announcement_id}))
+        if not events:
+            return
+        with self._changed:
+            for kind, target, data in events:
+                self._seq += 1
+                self._events.append((self._seq, kind, target, data))
+            self._changed.notify_all()
+        for loop, waiter in list(self._async_waiters):
+            loop.call_soon_threadsafe(waiter.set)
+
+    def event_id(self, seq=None):
+        return f'{self.boot}-{self._seq if seq is None else seq}'
+
+    def events_since(self, last_event_id, audience):
+        """``(events, reset, seq)`` after ``last_event_id`` for ``audience``.
+
+        ``reset`` means the id is from another process or older than the
+        log, so the client should reload the feed instead of replaying.
+        ``seq`` is the newest event the log held at the time, which is
+        where the client resumes from.
+        """
+        boot, _, seq = (last_event_id or '').rpartition('-')
+        with self._changed:
+            latest = self._seq
+            oldest = self._events[0][0] if self._events else latest + 1
+            if boot != self.boot or not seq.isdigit() or int(seq) > latest or \
+                    (int(seq) < oldest - 1 and int(seq) < latest):
+                return [], True, latest
+            after = int(seq)
+            events = [event for event in self._events if event[0] > after]
+        return [event for event in events if _visible_to(event[2], audience)], False, latest
+
+    def page(self, audience=None, after=None, limit=20):
+        """One page of the audience's feed and the cursor for the next."""
+        snapshot = self.refresh()
+        items, keys = snapshot.for_audience(audience)
+        start = 0
+        if after:
+            rank, announcement_id = decode_cursor(after, 2)
+            if not isinstance(rank, int) or not isinstance(announcement_id, int):
+                raise InvalidCursor('Invalid cursor')
+            start = bisect.bisect_right(keys, (rank, -announcement_id))
+        # Between rebuilds an item may pass its expiry; leave it out already
+        now = datetime.utcnow()
+        page = []
+        position = start
+        while position < len(items) and len(page) < limit:
+            item = items[position]
+            if item['expiresAt'] is None or item['expiresAt'] > now:
+                page.append(item)
+            position += 1
+        next_cursor = None
+        if position < len(items) and page:
+            next_cursor = encode_cursor([_rank(page[-1]), page[-1]['id']])
+        return page, next_cursor
+
+    # Streams
+
+    def open_stream(self):
+        """Reserve a thread-held stream; False when ``max_streams`` are open."""
+        with self._changed:
+            if self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+        self._subscribe()
+        return True
+
+    def close_stream(self):
+        with self._changed:
+            self._streams -= 1
+        self._unsubscribe()
+
+    def _subscribe(self):
+        with self._changed:
+            self._subscribers += 1
+        self._ensure_thread()
+
+    def _unsubscribe(self):
+        with self._changed:
+            self._subscribers -= 1
+
+    def wait(self, after_seq, timeout):
+        """Block until an event newer than ``after_seq`` exists, or ``timeout``."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self._seq > after_seq, timeout)
+
+    def stream(self, subscription, dumps):
+        """Server-sent events for a worker thread, until ``stream_seconds`` pass.
+
+        Pair with :meth:`open_stream`, and call :meth:`close_stream` when
+        the response closes. The client reconnects with Last-Event-ID afterwards, which frees
+        the thread now and then without losing events.
+        """
+        deadline = time.monotonic() + self.stream_seconds
+        yield 'retry: 5000\n\n'
+        last = subscription.last_event_id
+        while True:
+            chunk, last = self._next_chunk(subscription.audience, last, dumps)
+            if chunk:
+                yield chunk
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.wait(self._seq_of(last), min(self.heartbeat_seconds, remaining)):
+                yield ': keepalive\n\n'
+
+    async def stream_async(self, subscription, dumps, send, receive):
+        """Server-sent events on the event loop: no thread per connection."""
+        loop = asyncio.get_running_loop()
+        waiter = asyncio.Event()
+        entry = (loop, waiter)
+        self._async_waiters.add(entry)
+        self._subscribe()
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            last = subscription.last_event_id
+            while not disconnected.done():
+                chunk, last = self._next_chunk(subscription.audience, last, dumps)
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+                waited = asyncio.ensure_future(waiter.wait())
+                done, _ = await asyncio.wait({waited, disconnected}, timeout=self.heartbeat_seconds,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                waited.cancel()
+                waiter.clear()
+                if not done:
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+        finally:
+            disconnected.cancel()
+            self._async_waiters.discard(entry)
+            self._unsubscribe()
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def _seq_of(self, event_id):
+        _, _, seq = (event_id or '').rpartition('-')
+        return int(seq) if seq.isdigit() else self._seq
+
+    def _next_chunk(self, audience, last_event_id, dumps):
+        """The SSE text for events after ``last_event_id``, and the new last id."""
+        if last_event_id is None:
+            # A new client has just loaded the feed: start from now
+            return '', self.event_id()
+        events, reset, latest = self.events_since(last_event_id, audience)
+        # Resume from what the log held then; anything published since is in the next chunk
+        last = self.event_id(latest)
+        if reset:
+            return f'id: {last}\nevent: reset\ndata: {{}}\n\n', last
+        parts = [f'id: {self.event_id(seq)}\nevent: {kind}\ndata: {dumps(data)}\n\n' for seq, kind, _, data in events]
+        # Events for other audiences still advance the client's position
+        return ''.join(parts), last
+
+    # Background refresh while streams are open
+
+    def _ensure_thread(self):
+        # The thread does not survive a fork; start one per process
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='announcement-feed', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            timeout = self.ttl
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.next_expiry is not None:
+                until_expiry = (snapshot.next_expiry - datetime.utcnow()).total_seconds()
+                timeout = max(0.05, min(timeout, until_expiry))
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if not self._subscribers:
+                continue
+            try:
+                self.refresh()
+            except Exception:
+                # The next request or tick tries again
+                time.sleep(1)
+
+announcement_feed = AnnouncementFeed()
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
@@ -0,0 +1,187 @@
+
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import event, inspect, select, func, literal, case, cast, Date, union_all
+from sqlalchemy.orm import Session
+from .upsert import upsert_statement, UnsupportedDialect
+
+STATUS_COLUMNS = ('present', 'absent', 'late', 'excused')
+
+PERIODS = ('day', 'month')
+
+def month_start(day):
+    return day.replace(day=1)
+
+def _period_starts(day):
+    return (('day', day), ('month', month_start(day)))
+
+def apply_attendance_changes(connection, changes):
+    """Fold attendance status changes into the summary table.
+
+    ``changes`` is an iterable of ``(student_id, class_id, date, old_status,
+    new_status)`` with ``None`` for a status that did not exist before or
+    no longer exists. Runs as a single upsert on ``connection``, so it
+    commits or rolls back together with the attendance write.
+    """
+    from ..models.attendance_summary import AttendanceSummary
+
+    deltas = defaultdict(lambda: dict.fromkeys(STATUS_COLUMNS, 0))
+    for student_id, class_id, day, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        for period, period_start in _period_starts(day):
+            counts = deltas[(int(student_id), int(class_id), period, period_start)]
+            if old_status in counts:
+                counts[old_status] -= 1
+            if new_status in counts:
+                counts[new_status] += 1
+
+    rows = [
+        dict(student_id=student_id, class_id=class_id, period=period, period_start=period_start, **counts)
+        for (student_id, class_id, period, period_start), counts in deltas.items()
+        if any(counts.values())
+    ]
+    if not rows:
+        return 0
+
+    connection.execute(upsert_statement(
+        connection.dialect.name,
+        AttendanceSummary.__table__,
+        rows,
+        key_columns=('student_id', 'class_id', 'period', 'period_start'),
+        constraint='uq_attendance_summary_key',
+        increment_columns=STATUS_COLUMNS
+    ))
+    return len(rows)
+
+def _collect_changes(session, flush_context):
+    from ..models.attendance import Attendance
+
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Attendance):
+            changes.append((obj.student_id, obj.class_id, obj.date, None, obj.status))
+    for obj in session.dirty:
+        if not isinstance(obj, Attendance):
+            continue
+        state = inspect(obj)
+        old = {}
+        for key in ('student_id', 'class_id', 'date', 'status'):
+            history = state.attrs[key].history
+            old[key] = history.deleted[0] if history.deleted else getattr(obj, key)
+        changes.append((old['student_id'], old['class_id'], old['date'], old['status'], None))
+        changes.append((obj.student_id, obj.class_id, obj.date, None, obj.status))
+    for obj in session.deleted:
+        if isinstance(obj, Attendance):
+            changes.append((obj.student_id, obj.class_id, obj.date, obj.status, None))
+    if changes:
+        apply_attendance_changes(session.connection(), changes)
+
+def register_summary_hooks():
+    """Keep the summary in step with ORM-level Attendance writes.
+
+    Core statements such as the bulk roll upsert bypass these hooks and
+    call :func:`apply_attendance_changes` themselves.
+    """
+    if not event.contains(Session, 'after_flush', _collect_changes):
+        event.listen(Session, 'after_flush', _collect_changes)
+
+def _month_start_expression(dialect_name, column):
+    if dialect_name == 'sqlite':
+        return func.date(column, 'start of month')
+    if dialect_name == 'postgresql':
+        return cast(func.date_trunc('month', column), Date)
+    if dialect_name in ('mysql', 'mariadb'):
+        return cast(func.date_format(column, '%Y-%m-01'), Date)
+    raise UnsupportedDialect(f'Summary rebuild is not supported on {dialect_name}')
+
+def rebuild_attendance_summary(connection):
+    """Recompute every summary row from the raw attendance table."""
+    from ..models.attendance import Attendance
+    from ..models.attendance_summary import AttendanceSummary
+
+    raw = Attendance.__table__
+    summary = AttendanceSummary.__table__
+    counts = [
+        func.sum(case((raw.c.status == status, 1), else_=0)).label(status)
+        for status in STATUS_COLUMNS
+    ]
+    columns = ['student_id', 'class_id', 'period', 'period_start'] + list(STATUS_COLUMNS)
+
+    connection.execute(summary.delete())
+    inserted = 0
+    for period in PERIODS:
+        if period == 'day':
+            period_start = raw.c.date
+        else:
+            period_start = _month_start_expression(connection.dialect.name, raw.c.date)
+        query = (
+            select(raw.c.student_id, raw.c.class_id, literal(period), period_start, *counts)
+            .group_by(raw.c.student_id, raw.c.class_id, period_start)
+        )
+        result = connection.execute(summary.insert().from_select(columns, query))
+        inserted += result.rowcount
+    return inserted
+
+def split_range(start, end):
+    """Cover ``[start, end]`` with whole months plus loose days at the edges.
+
+    Returns ``(day_ranges, month_starts)``; the day ranges are inclusive
+    ``(first, last)`` pairs.
+    """
+    first_full = start if start.day == 1 else month_start(start + timedelta(days=32 - start.day))
+    next_month = month_start(end + timedelta(days=32 - end.day))
+    last_full_end = end if (end + timedelta(days=1)) == next_month else month_start(end) - timedelta(days=1)
+
+    if first_full > last_full_end:
+        return [(start, end)], []
+
+    day_ranges = []
+    if start < first_full:
+        day_ranges.append((start, first_full - timedelta(days=1)))
+    if last_full_end < end:
+        day_ranges.append((last_full_end + timedelta(days=1), end))
+
+    month_starts = []
+    current = first_full
+    while current <= last_full_end:
+        month_starts.append(current)
+        current = month_start(current + timedelta(days=32))
+    return day_ranges, month_starts
+
+def summary_range_query(start, end, class_id=None):
+    """Per-student totals over ``[start, end]`` read only from the summary.
+
+    Attendance rate counts late as attended and leaves excused days out of
+    the denominator.
+    """
+    from ..models.attendance_summary import AttendanceSummary as S
+
+    day_ranges, month_starts = split_range(start, end)
+    parts = []
+    for first, last in day_ranges:
+        parts.append(select(S).where(S.period == 'day', S.period_start.between(first, last)))
+    if month_starts:
+        parts.append(select(S).where(S.period == 'month', S.period_start.in_(month_starts)))
+    if class_id is not None:
+        parts = [part.where(S.class_id == class_id) for part in parts]
+
+    rows = union_all(*parts).subquery() if len(parts) > 1 else parts[0].subquery()
+    attended = func.sum(rows.c.present + rows.c.late)
+    counted = func.sum(rows.c.present + rows.c.late + rows.c.absent)
+    rate = case((counted > 0, attended * 100.0 / counted), else_=None)
+    return select(
+        rows.c.student_id,
+        func.sum(rows.c.present).label('present'),
+        func.sum(rows.c.absent).label('absent'),
+        func.sum(rows.c.late).label('late'),
+        func.sum(rows.c.excused).label('excused'),
+        rate.label('rate')
+    ).group_by(rows.c.student_id)
+
+def students_below_rate(session, threshold, days, class_id=None, today=None):
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+    totals = summary_range_query(start, today, class_id).subquery()
+    query = select(totals).where(totals.c.rate < threshold).order_by(totals.c.rate, totals.c.student_id)
+    return start, today, session.execute(query).all()
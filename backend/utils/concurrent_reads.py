@@ -0,0 +1,81 @@
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+from .request_metrics import _RequestStats
+
+class ConcurrentReads:
+    """Runs independent read-only queries side by side.
+
+    Each call gets a worker thread with its own app context, and so its own
+    session and pooled connection on the read bind; the request thread
+    waits for all of them, so a handful of slow aggregates take as long as
+    the slowest one instead of their sum. The drivers release the GIL while
+    the database works, which is where the time goes. At most ``workers``
+    run at once across the process. With ``workers`` below 2, or on an
+    engine that hands every thread the same connection (in-memory SQLite),
+    the calls simply run one after another in the request.
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.shutdown()
+        self.workers = app.config.get('CONCURRENT_READ_WORKERS', self.workers)
+
+    def _get_executor(self):
+        # Pools do not survive a fork, so each worker process builds its own
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='concurrent-read')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def run(self, functions):
+        """Call each of ``functions`` (no arguments); returns their results in order."""
+        from ..app import db
+
+        functions = list(functions)
+        if len(functions) < 2 or self.workers < 2 or _shares_connections(db):
+            return [function() for function in functions]
+
+        app = current_app._get_current_object()
+        parent_stats = g.get('sql_stats')
+        futures = [
+            self._get_executor().submit(_call_in_app_context, app, function, parent_stats is not None)
+            for function in functions
+        ]
+        results = []
+        for future in futures:
+            result, stats = future.result()
+            if stats is not None:
+                parent_stats.queries += stats.queries
+                parent_stats.db_time += stats.db_time
+                parent_stats.statements.update(stats.statements)
+            results.append(result)
+        return results
+
+    def shutdown(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+
+concurrent_reads = ConcurrentReads()
+
+def _shares_connections(db):
+    return any(isinstance(engine.pool, (StaticPool, SingletonThreadPool)) for engine in db.engines.values())
+
+def _call_in_app_context(app, function, collect_stats):
+    from ..app import db
+
+    with app.app_context():
+        db.session.info['use_read_bind'] = True
+        # Counted separately and folded into the request's SQL metrics afterwards
+        stats = g.sql_stats = _RequestStats() if collect_stats else None
+        return function(), stats
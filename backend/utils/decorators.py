@@ -1,17 +1,58 @@
 
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from ..models.user import User
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from .user_cache import user_cache, get_user_snapshot
+from .engine import begin_session_write
+from ..app import db
+
+def current_role():
+    """``(role, is_active)`` of the signed-in user; ``(None, False)`` if the user is gone."""
+    claims = get_jwt()
+    user_id = get_jwt_identity()
+
+    # Recent tokens carry role/is_active claims; fall back to the cached
+    # user for older tokens and those issued before a role change
+    if 'role' in claims and user_cache.claims_are_current(user_id, claims.get('iat', 0)):
+        return claims['role'], claims.get('is_active', True)
+
+    snapshot = get_user_snapshot(user_id)
+    if snapshot is None:
+        return None, False
+    return snapshot['role'], snapshot['isActive']
 
 def role_required(allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            if not user or user.role not in allowed_roles:
+            role, is_active = current_role()
+            if not is_active or role not in allowed_roles:
                 return jsonify({'message': 'Access denied'}), 403
             return f(*args, **kwargs)
         return decorated_function
     return decorator
+
+def read_replica(f):
+    """Serve the endpoint's reads from the read bind (DATABASE_READ_URL), if configured.
+
+    The flag lives on the request's session, which is discarded at teardown,
+    so streamed responses keep reading from the replica until they finish.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        db.session.info['use_read_bind'] = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+def write_transaction(f):
+    """Begin the endpoint's transaction as a writer (BEGIN IMMEDIATE on SQLite).
+
+    For endpoints that read and then write, so they wait for the write lock
+    up front instead of failing on it halfway. Read-only endpoints must not
+    use it: they would queue behind every writer for nothing.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        begin_session_write(db.session())
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,226 @@
+
+import sqlite3
+from contextlib import contextmanager
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import Engine
+
+READ_BIND_KEY = 'read'
+JOBS_BIND_KEY = 'jobs'
+
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        # Let SQLAlchemy emit BEGIN itself (below) instead of pysqlite
+        dbapi_connection.isolation_level = None
+
+# Execution option that makes one transaction BEGIN IMMEDIATE on SQLite
+WRITE_OPTIONS = {'sqlite_begin_mode': 'IMMEDIATE'}
+
+def _begin_sqlite_transaction(connection):
+    if connection.dialect.name == 'sqlite':
+        mode = connection.get_execution_options().get('sqlite_begin_mode') or \
+            connection.connection.info.get('sqlite_begin_mode', 'DEFERRED')
+        connection.exec_driver_sql(f'BEGIN {mode}')
+
+@contextmanager
+def begin_write(engine):
+    """``engine.begin()`` for a transaction that reads and then writes.
+
+    On SQLite the write lock is taken at BEGIN, so the transaction waits
+    its turn (busy_timeout) instead of failing when it comes to write
+    after another writer got in first (see :func:`apply_sqlite_pragmas`).
+    Other databases begin as usual.
+    """
+    with engine.connect() as connection:
+        with connection.execution_options(**WRITE_OPTIONS).begin():
+            yield connection
+
+def begin_session_write(session):
+    """Start ``session``'s transaction the way :func:`begin_write` does.
+
+    Call it before the first query of a unit of work that will write. A
+    transaction that has only read so far (an auth lookup, say) is ended
+    first; one that has already written is left as it is.
+    """
+    if session.in_transaction():
+        if session.info.get('has_written'):
+            return session.connection()
+        session.commit()
+    return session.connection(execution_options=WRITE_OPTIONS)
+
+def register_sqlite_transaction_hooks():
+    """Make SQLite transactions start when SQLAlchemy begins them.
+
+    pysqlite only issues BEGIN before DML, so a SAVEPOINT taken after a
+    plain SELECT opens (and its RELEASE commits) a transaction of its own,
+    and rolling back the session no longer undoes it.
+    """
+    if not event.contains(Engine, 'connect', _disable_pysqlite_transactions):
+        event.listen(Engine, 'connect', _disable_pysqlite_transactions)
+        event.listen(Engine, 'begin', _begin_sqlite_transaction)
+
+def create_missing_columns(engine, metadata):
+    """Add nullable columns that an existing table does not have yet.
+
+    Only columns that can be added in place (nullable, no primary or
+    foreign key) are handled; rows written before the column existed
+    read NULL. Returns ``table.column`` names of the columns added.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable or column.primary_key or column.foreign_keys:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.exec_driver_sql(f'ALTER TABLE {engine.dialect.identifier_preparer.format_table(table)} ADD COLUMN {ddl}')
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+def create_missing_indexes(engine, metadata):
+    """Create declared indexes that an existing database does not have yet.
+
+    ``create_all`` skips tables that already exist, and with them any index
+    added to the models since. Returns the names of the indexes created.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    return created
+
+def _sqlite_profile(config):
+    return {
+        'connect_args': {
+            'check_same_thread': False,
+            # pysqlite's own wait, in seconds; the PRAGMA below covers raw calls
+            'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000
+        }
+    }
+
+def _server_profile(config):
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+
+ENGINE_PROFILES = {
+    'sqlite': _sqlite_profile,
+    'server': _server_profile,
+    'none': lambda config: {}
+}
+
+def resolve_engine_profile(config):
+    """The profile named by DB_ENGINE_PROFILE; ``auto`` picks one from the URL."""
+    profile = config.get('DB_ENGINE_PROFILE', 'auto')
+    if profile == 'auto':
+        profile = 'sqlite' if config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') else 'server'
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE '{profile}'")
+    return profile
+
+def configure_engine_options(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS and the read bind from the engine profile.
+
+    Must run before ``db.init_app``. Options already set in the config win.
+    """
+    profile = resolve_engine_profile(app.config)
+    options = ENGINE_PROFILES[profile](app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    read_url = app.config.get('DATABASE_READ_URL')
+    primary_url = app.config['SQLALCHEMY_DATABASE_URI']
+    if not read_url and profile == 'sqlite' and primary_url not in ('sqlite://', 'sqlite:///:memory:'):
+        # Writers take the lock up front (see begin_write), so read-only
+        # endpoints get their own connections to the file and never wait
+        # for a pooled connection held by one
+        read_url = primary_url
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    if read_url:
+        read_profile = 'sqlite' if read_url.startswith('sqlite') else 'server'
+        binds.setdefault(READ_BIND_KEY, dict(ENGINE_PROFILES[read_profile](app.config), url=read_url))
+    # The job queue gets its own engine, on the app database by default, so
+    # worker polling never waits behind request traffic for a pooled connection
+    jobs_url = app.config.get('JOBS_DATABASE_URL') or primary_url
+    jobs_profile = 'sqlite' if jobs_url.startswith('sqlite') else 'server'
+    binds.setdefault(JOBS_BIND_KEY, dict(ENGINE_PROFILES[jobs_profile](app.config), url=jobs_url))
+    app.config['SQLALCHEMY_BINDS'] = binds
+    return profile
+
+def sqlite_pragmas(config):
+    return (
+        ('journal_mode', 'WAL'),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        # Negative sizes are KiB rather than pages
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),
+        ('temp_store', 'MEMORY')
+    )
+
+def apply_sqlite_pragmas(engine, pragmas, begin_mode='DEFERRED'):
+    """Run ``PRAGMA name=value`` on every new connection of a SQLite engine.
+
+    WAL lets readers carry on while one connection writes, and busy_timeout
+    makes writers wait for the lock instead of failing with "database is
+    locked". That wait only happens when the lock is taken at BEGIN: a
+    deferred transaction that has read and then writes (as every insert
+    into the search index does) gets SQLITE_BUSY at once if another writer
+    got in first. Such transactions should start with :func:`begin_write`
+    or :func:`begin_session_write`. ``begin_mode`` is the default for every
+    other transaction; ``'IMMEDIATE'`` there would make every request,
+    reads included, queue for the one write lock.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        connection_record.info['sqlite_begin_mode'] = begin_mode
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', set_pragmas)
+
+class RoutingSession(Session):
+    """Session that sends reads to the read bind while ``info['use_read_bind']`` is set.
+
+    Flushes, and everything after the session has written, stay on the
+    primary, so a request never reads back older data than it wrote.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if getattr(clause, 'is_dml', False):
+            self.info['has_written'] = True
+        if bind is None and self.info.get('use_read_bind') and not self._flushing and not self.info.get('has_written'):
+            engine = self._db.engines.get(READ_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _mark_written(session, flush_context):
+    session.info['has_written'] = True
+
+def register_routing_hooks():
+    if not event.contains(RoutingSession, 'after_flush', _mark_written):
+        event.listen(RoutingSession, 'after_flush', _mark_written)
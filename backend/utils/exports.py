@@ -0,0 +1,157 @@
+
+import csv
+import io
+import zipfile
+from datetime import date, time
+from xml.sax.saxutils import escape
+
+EXPORT_BATCH_SIZE = 1000
+
+def iter_rows(session, stmt, fields, batch_size=EXPORT_BATCH_SIZE):
+    """Rows of output values, fetched ``batch_size`` at a time.
+
+    ``yield_per`` turns on ``stream_results``, so drivers with server-side
+    cursors never hold more than one batch in memory.
+    """
+    result = session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        for row in partition:
+            values = []
+            position = 0
+            for field in fields:
+                width = len(field.columns)
+                value = field.value(row[position:position + width])
+                values.append(value.isoformat() if isinstance(value, (date, time)) else value)
+                position += width
+            yield values
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def csv_chunks(header, rows, batch_size=EXPORT_BATCH_SIZE):
+    """Encode a header and rows as CSV, one chunk of bytes per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in _batched(rows, batch_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+class _Sink:
+    """Write-only file for ``zipfile``; the bytes are drained after each write.
+
+    Having no ``tell``/``seek`` makes ``zipfile`` use data descriptors, so
+    nothing already written ever has to be patched.
+    """
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+def _cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+def _sheet_row(values):
+    return '<row>' + ''.join(_cell(value) for value in values) + '</row>'
+
+def xlsx_chunks(header, rows, sheet_name='Report', batch_size=EXPORT_BATCH_SIZE):
+    """Encode a header and rows as a single-sheet XLSX workbook, batch by batch.
+
+    Cells are inline strings, so there is no shared string table to build up
+    in memory, and the worksheet part is deflated as it is written.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name[:31], {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((_SHEET_HEAD + _sheet_row(header)).encode('utf-8'))
+            for batch in _batched(rows, batch_size):
+                sheet.write(''.join(_sheet_row(values) for values in batch).encode('utf-8'))
+                data = sink.drain()
+                if data:
+                    yield data
+            sheet.write(_SHEET_TAIL.encode('utf-8'))
+    yield sink.drain()
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
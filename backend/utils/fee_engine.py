@@ -0,0 +1,117 @@
+
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, update, func, and_
+from .fee_ledger import aggregate, diff_aggregates, apply_ledger_deltas
+from .snapshot_cache import snapshot_cache
+from .engine import begin_write
+
+DEFAULT_CHUNK_SIZE = 5000
+
+OPEN_STATUSES = ('Pending', 'Partial', 'Overdue')
+
+class LateFeeRules:
+    """Late fee = ``flat`` + ``rate`` x (amount - discount), once ``grace_days`` pass."""
+
+    def __init__(self, grace_days=0, flat=0.0, rate=0.0):
+        self.grace_days = grace_days
+        self.flat = flat
+        self.rate = rate
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            grace_days=config.get('FEE_GRACE_DAYS', 0),
+            flat=config.get('FEE_LATE_FEE_FLAT', 0.0),
+            rate=config.get('FEE_LATE_FEE_RATE', 0.0)
+        )
+
+def _statements(fee, as_of, rules):
+    """The set-based UPDATEs, in the order they must run.
+
+    Each one only matches rows it would change, so a second run over the
+    same data changes nothing.
+    """
+    paid = func.coalesce(fee.c.paid_amount, 0)
+    discount = func.coalesce(fee.c.discount_amount, 0)
+    late_fee = func.coalesce(fee.c.late_fee, 0)
+    net_due = fee.c.amount - discount
+    overdue_before = as_of - timedelta(days=rules.grace_days)
+
+    statements = [
+        ('paid', update(fee).where(
+            fee.c.status.in_(OPEN_STATUSES),
+            paid >= net_due + late_fee
+        ).values(status='Paid')),
+        ('overdue', update(fee).where(
+            fee.c.status.in_(('Pending', 'Partial')),
+            fee.c.due_date < overdue_before,
+            paid < net_due + late_fee
+        ).values(status='Overdue')),
+        ('partial', update(fee).where(
+            fee.c.status == 'Pending',
+            paid > 0,
+            paid < net_due + late_fee
+        ).values(status='Partial')),
+    ]
+    if rules.flat or rules.rate:
+        # Charged once per fee, even when the rules work out to nothing;
+        # a late fee set by hand is left alone
+        statements.append(('lateFeesApplied', update(fee).where(
+            fee.c.status == 'Overdue',
+            fee.c.late_fee_applied_at == None,
+            late_fee == 0
+        ).values(
+            late_fee=func.round(rules.flat + rules.rate * net_due, 2),
+            late_fee_applied_at=datetime.combine(as_of, datetime.min.time())
+        )))
+    return statements
+
+def recompute_fee_status(engine, rules, as_of=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Bring ``Fee.status`` and ``Fee.late_fee`` up to date as of ``as_of``.
+
+    Works through the table in primary-key ranges of ``chunk_size`` rows,
+    committing each range separately so write locks stay short. The fee
+    ledger is adjusted by the before/after difference of each range.
+    ``progress(done, total)`` is called with the ranges committed so far.
+    """
+    from ..models.fee import Fee
+
+    fee = Fee.__table__
+    as_of = as_of or date.today()
+    started = time.perf_counter()
+
+    with engine.connect() as connection:
+        low, high = connection.execute(select(func.min(fee.c.id), func.max(fee.c.id))).one()
+
+    counts = {name: 0 for name, _ in _statements(fee, as_of, rules)}
+    chunks = 0
+    if low is not None:
+        total = len(range(low, high + 1, chunk_size))
+        for start in range(low, high + 1, chunk_size):
+            in_chunk = and_(fee.c.id >= start, fee.c.id < start + chunk_size)
+            with begin_write(engine) as connection:
+                # The ledger moves with the chunk, inside the same transaction
+                before = aggregate(connection, in_chunk)
+                changed = 0
+                for name, stmt in _statements(fee, as_of, rules):
+                    rowcount = connection.execute(stmt.where(in_chunk)).rowcount
+                    counts[name] += rowcount
+                    changed += rowcount
+                if changed:
+                    apply_ledger_deltas(connection, diff_aggregates(before, aggregate(connection, in_chunk)))
+            chunks += 1
+            if progress:
+                progress(chunks, total)
+
+    # Core UPDATEs bypass the session hooks that expire dashboard snapshots
+    if any(counts.values()):
+        snapshot_cache.invalidate_tables({'fee', 'fee_ledger'})
+
+    return {
+        'asOf': as_of.isoformat(),
+        'rowsChanged': counts,
+        'totalChanged': sum(counts.values()),
+        'chunks': chunks,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 1)
+    }
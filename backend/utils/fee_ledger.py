@@ -0,0 +1,235 @@
+
+from collections import defaultdict
+from sqlalchemy import event, inspect, select, func, case, literal
+from sqlalchemy.orm import Session
+from .upsert import upsert_statement
+
+KEY_COLUMNS = ('grade', 'fee_type', 'semester', 'academic_year')
+
+METRIC_COLUMNS = ('fee_count', 'billed', 'discount', 'late_fees', 'collected', 'outstanding', 'overdue')
+
+SETTLED_STATUSES = ('Paid', 'Waived')
+
+# Differences below this are float noise, not drift
+RECONCILE_TOLERANCE = 0.005
+
+def fee_contribution(grade, fee_type, semester, academic_year, amount, discount_amount,
+                     late_fee, paid_amount, status):
+    """The ledger key and metrics one fee row adds. Mirrors :func:`_contribution_columns`."""
+    amount = amount or 0
+    discount = discount_amount or 0
+    late = late_fee or 0
+    paid = paid_amount or 0
+    balance = 0 if status in SETTLED_STATUSES else max(amount - discount + late - paid, 0)
+    key = (grade or '', fee_type, semester or '', academic_year or '')
+    return key, {
+        'fee_count': 1,
+        'billed': amount,
+        'discount': discount,
+        'late_fees': late,
+        'collected': paid,
+        'outstanding': balance,
+        'overdue': balance if status == 'Overdue' else 0
+    }
+
+def _contribution_columns(fee, student):
+    amount = func.coalesce(fee.c.amount, 0)
+    discount = func.coalesce(fee.c.discount_amount, 0)
+    late = func.coalesce(fee.c.late_fee, 0)
+    paid = func.coalesce(fee.c.paid_amount, 0)
+    remaining = amount - discount + late - paid
+    balance = case(
+        (fee.c.status.in_(SETTLED_STATUSES), literal(0.0)),
+        (remaining > 0, remaining),
+        else_=literal(0.0)
+    )
+    keys = [
+        func.coalesce(student.c.grade, '').label('grade'),
+        fee.c.fee_type.label('fee_type'),
+        func.coalesce(fee.c.semester, '').label('semester'),
+        func.coalesce(fee.c.academic_year, '').label('academic_year'),
+    ]
+    metrics = [
+        func.count().label('fee_count'),
+        func.sum(amount).label('billed'),
+        func.sum(discount).label('discount'),
+        func.sum(late).label('late_fees'),
+        func.sum(paid).label('collected'),
+        func.sum(balance).label('outstanding'),
+        func.sum(case((fee.c.status == 'Overdue', balance), else_=literal(0.0))).label('overdue'),
+    ]
+    return keys, metrics
+
+def aggregate_select(where=None):
+    """Ledger rows computed straight from the fee table, optionally for a subset."""
+    from ..models.fee import Fee
+    from ..models.student import Student
+
+    fee, student = Fee.__table__, Student.__table__
+    keys, metrics = _contribution_columns(fee, student)
+    query = select(*keys, *metrics).select_from(fee.outerjoin(student, student.c.id == fee.c.student_id))
+    if where is not None:
+        query = query.where(where)
+    return query.group_by(*keys)
+
+def aggregate(connection, where=None):
+    return {
+        tuple(row[:len(KEY_COLUMNS)]): dict(zip(METRIC_COLUMNS, row[len(KEY_COLUMNS):]))
+        for row in connection.execute(aggregate_select(where))
+    }
+
+def apply_ledger_deltas(connection, deltas):
+    """Add ``{key: {metric: delta}}`` to the ledger in one upsert."""
+    from ..models.fee_ledger import FeeLedger
+
+    rows = [
+        dict(zip(KEY_COLUMNS, key), **{column: metrics.get(column, 0) for column in METRIC_COLUMNS})
+        for key, metrics in deltas.items()
+        if any(abs(value) > 1e-9 for value in metrics.values())
+    ]
+    if not rows:
+        return 0
+    connection.execute(upsert_statement(
+        connection.dialect.name,
+        FeeLedger.__table__,
+        rows,
+        key_columns=KEY_COLUMNS,
+        constraint='uq_fee_ledger_key',
+        increment_columns=METRIC_COLUMNS
+    ))
+    return len(rows)
+
+def diff_aggregates(before, after):
+    deltas = {}
+    for key in set(before) | set(after):
+        old = before.get(key, {})
+        new = after.get(key, {})
+        deltas[key] = {column: (new.get(column) or 0) - (old.get(column) or 0) for column in METRIC_COLUMNS}
+    return deltas
+
+def rebuild_fee_ledger(connection):
+    """Replace the ledger with totals recomputed from every fee row."""
+    from ..models.fee_ledger import FeeLedger
+
+    ledger = FeeLedger.__table__
+    connection.execute(ledger.delete())
+    result = connection.execute(
+        ledger.insert().from_select(list(KEY_COLUMNS) + list(METRIC_COLUMNS), aggregate_select())
+    )
+    return result.rowcount
+
+def reconcile_fee_ledger(connection, fix=False):
+    """Compare the ledger with a fresh aggregate; optionally rebuild it.
+
+    Returns the list of keys whose stored totals drifted, with both sides.
+    """
+    from ..models.fee_ledger import FeeLedger
+
+    ledger = FeeLedger.__table__
+    expected = aggregate(connection)
+    stored = {
+        tuple(row[:len(KEY_COLUMNS)]): dict(zip(METRIC_COLUMNS, row[len(KEY_COLUMNS):]))
+        for row in connection.execute(select(
+            *[ledger.c[column] for column in KEY_COLUMNS],
+            *[ledger.c[column] for column in METRIC_COLUMNS]
+        ))
+    }
+
+    drift = []
+    empty = dict.fromkeys(METRIC_COLUMNS, 0)
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, empty)
+        have = stored.get(key, empty)
+        if any(abs((want[c] or 0) - (have[c] or 0)) > RECONCILE_TOLERANCE for c in METRIC_COLUMNS):
+            drift.append({'key': dict(zip(KEY_COLUMNS, key)), 'expected': want, 'stored': have})
+
+    if fix and drift:
+        rebuild_fee_ledger(connection)
+    return drift
+
+def _fee_values(fee, grade, history=False):
+    state = inspect(fee)
+
+    def value(name):
+        if history:
+            deleted = state.attrs[name].history.deleted
+            if deleted:
+                return deleted[0]
+        return getattr(fee, name)
+
+    return (
+        grade, value('fee_type'), value('semester'), value('academic_year'), value('amount'),
+        value('discount_amount'), value('late_fee'), value('paid_amount'), value('status')
+    )
+
+def _collect_fee_changes(session, flush_context):
+    from ..models.fee import Fee
+    from ..models.student import Student
+
+    fees_new = [obj for obj in session.new if isinstance(obj, Fee)]
+    fees_dirty = [obj for obj in session.dirty if isinstance(obj, Fee) and session.is_modified(obj)]
+    fees_deleted = [obj for obj in session.deleted if isinstance(obj, Fee)]
+    regraded = [
+        obj for obj in session.dirty
+        if isinstance(obj, Student) and inspect(obj).attrs.grade.history.has_changes()
+    ]
+    if not (fees_new or fees_dirty or fees_deleted or regraded):
+        return
+
+    connection = session.connection()
+    student_table = Student.__table__
+    student_ids = {
+        fee.student_id for fee in fees_new + fees_dirty + fees_deleted
+    } | {
+        history_id for fee in fees_dirty
+        for history_id in inspect(fee).attrs.student_id.history.deleted
+    }
+    grades = dict(connection.execute(
+        select(student_table.c.id, student_table.c.grade).where(student_table.c.id.in_(student_ids))
+    ).all()) if student_ids else {}
+
+    # Regraded students move their fees from the old grade to the new one,
+    # unless those fees are already being handled below
+    old_grades = {}
+    for student in regraded:
+        deleted = inspect(student).attrs.grade.history.deleted
+        old_grades[student.id] = deleted[0] if deleted else student.grade
+    changed_fees = {id(obj) for obj in fees_new + fees_dirty + fees_deleted}
+    moves = []
+    with session.no_autoflush:
+        for student in regraded:
+            for fee in session.query(Fee).filter(Fee.student_id == student.id):
+                if id(fee) not in changed_fees:
+                    moves.append((fee, old_grades[student.id], student.grade))
+
+    deltas = defaultdict(lambda: dict.fromkeys(METRIC_COLUMNS, 0))
+
+    def add(values, sign):
+        key, metrics = fee_contribution(*values)
+        for column, value in metrics.items():
+            deltas[key][column] += sign * value
+
+    for fee in fees_new:
+        add(_fee_values(fee, grades.get(fee.student_id)), 1)
+    for fee in fees_dirty:
+        old_student = inspect(fee).attrs.student_id.history.deleted
+        old_student = old_student[0] if old_student else fee.student_id
+        old_grade = old_grades.get(old_student, grades.get(old_student))
+        add(_fee_values(fee, old_grade, history=True), -1)
+        add(_fee_values(fee, grades.get(fee.student_id)), 1)
+    for fee in fees_deleted:
+        old_grade = old_grades.get(fee.student_id, grades.get(fee.student_id))
+        add(_fee_values(fee, old_grade, history=True), -1)
+    for fee, old_grade, new_grade in moves:
+        add(_fee_values(fee, old_grade), -1)
+        add(_fee_values(fee, new_grade), 1)
+
+    apply_ledger_deltas(connection, deltas)
+
+def register_ledger_hooks():
+    """Fold ORM-level Fee writes into the ledger inside the same flush.
+
+    Core UPDATEs, like the fee status engine, diff the ledger themselves.
+    """
+    if not event.contains(Session, 'after_flush', _collect_fee_changes):
+        event.listen(Session, 'after_flush', _collect_fee_changes)
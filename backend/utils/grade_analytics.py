@@ -0,0 +1,143 @@
+
+import numpy as np
+from sqlalchemy import select
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+HISTOGRAM_BINS = np.arange(0, 101, 10)
+
+def load_cohort(session, class_id=None, grade_level=None, academic_year=None,
+                semester=None, subject=None):
+    """Fetch the cohort's assessments as one columnar result set.
+
+    A class is scoped through its grade level, the same way class
+    membership is resolved elsewhere. Returns a dict of NumPy arrays keyed
+    by column.
+    """
+    from ..models.grade import Grade
+    from ..models.student import Student
+    from ..models.class_model import Class
+
+    # Plain table columns skip ORM row processing on large cohorts
+    grade, student, class_ = Grade.__table__.c, Student.__table__.c, Class.__table__.c
+    query = (
+        select(grade.student_id, grade.subject, grade.marks_obtained, grade.total_marks, grade.weight)
+        .join(Student.__table__, student.id == grade.student_id)
+        .where(student.is_active == True)
+    )
+    if class_id is not None:
+        query = query.join(Class.__table__, class_.grade == student.grade).where(class_.id == class_id)
+    if grade_level:
+        query = query.where(student.grade == grade_level)
+    if academic_year:
+        query = query.where(grade.academic_year == academic_year)
+    if semester:
+        query = query.where(grade.semester == semester)
+    if subject:
+        query = query.where(grade.subject == subject)
+
+    rows = session.execute(query).all()
+    if not rows:
+        return None
+
+    student_ids, subjects, marks, totals, weights = zip(*rows)
+    return {
+        'student_id': np.fromiter(student_ids, dtype=np.int64, count=len(rows)),
+        'subject': np.array(subjects, dtype=object),
+        'marks': np.fromiter(marks, dtype=np.float64, count=len(rows)),
+        'total': np.fromiter(totals, dtype=np.float64, count=len(rows)),
+        'weight': np.fromiter((1.0 if w is None else w for w in weights), dtype=np.float64, count=len(rows)),
+    }
+
+def _weighted_means(groups, group_count, values, weights):
+    weight_sums = np.bincount(groups, weights=weights, minlength=group_count)
+    value_sums = np.bincount(groups, weights=values * weights, minlength=group_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weight_sums > 0, value_sums / weight_sums, np.nan)
+
+def dense_rank(scores):
+    """1 for the highest score; ties share a rank and leave no gaps."""
+    _, inverse = np.unique(-np.round(scores, 6), return_inverse=True)
+    return inverse + 1
+
+def percentile_rank(scores):
+    """Share of the cohort scoring at or below each score, 0-100."""
+    ordered = np.sort(scores)
+    return np.searchsorted(ordered, scores, side='right') / len(scores) * 100
+
+def distribution(scores):
+    if len(scores) == 0:
+        return None
+    return {
+        'mean': round(float(np.mean(scores)), 2),
+        'std': round(float(np.std(scores)), 2),
+        'min': round(float(np.min(scores)), 2),
+        'max': round(float(np.max(scores)), 2),
+        'percentiles': {
+            str(p): round(float(v), 2)
+            for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES))
+        }
+    }
+
+def histogram(scores):
+    counts, edges = np.histogram(np.clip(scores, 0, 100), bins=HISTOGRAM_BINS)
+    return [
+        {'from': int(low), 'to': int(high), 'count': int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ]
+
+def analyze_cohort(columns):
+    """Weighted averages, dense ranks, percentiles and histograms.
+
+    Each assessment counts as its percentage score times its weight. The
+    overall average weighs every assessment across subjects; subject
+    statistics are taken over each student's weighted subject average.
+    """
+    valid = columns['total'] > 0
+    student_ids = columns['student_id'][valid]
+    subjects = columns['subject'][valid]
+    weights = columns['weight'][valid]
+    scores = columns['marks'][valid] / columns['total'][valid] * 100
+
+    students, student_index = np.unique(student_ids, return_inverse=True)
+    student_count = len(students)
+    averages = _weighted_means(student_index, student_count, scores, weights)
+
+    subject_names, subject_index = np.unique(subjects.astype(str), return_inverse=True)
+    pair_index = subject_index * student_count + student_index
+    pair_means = _weighted_means(
+        pair_index, len(subject_names) * student_count, scores, weights
+    ).reshape(len(subject_names), student_count)
+
+    ranked = ~np.isnan(averages)
+    students, averages = students[ranked], averages[ranked]
+
+    subject_stats = []
+    for name, means in zip(subject_names, pair_means):
+        means = means[~np.isnan(means)]
+        subject_stats.append({
+            'subject': str(name),
+            'studentCount': int(len(means)),
+            'distribution': distribution(means),
+        })
+
+    ranks = dense_rank(averages) if len(averages) else averages
+    percentiles = percentile_rank(averages) if len(averages) else averages
+    order = np.lexsort((students, ranks))
+
+    return {
+        'studentCount': int(len(students)),
+        'assessmentCount': int(valid.sum()),
+        'distribution': distribution(averages),
+        'histogram': histogram(averages),
+        'subjects': subject_stats,
+        'students': [
+            {
+                'studentId': int(students[i]),
+                'weightedAverage': round(float(averages[i]), 2),
+                'rank': int(ranks[i]),
+                'percentile': round(float(percentiles[i]), 2)
+            }
+            for i in order
+        ]
+    }
@@ -0,0 +1,88 @@
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+    def __init__(self, retry_after):
+        super().__init__('Server busy, please retry shortly')
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """Runs PBKDF2 hashing on a bounded thread or process pool.
+
+    At most ``workers`` hashes run at once and at most ``max_pending`` may be
+    queued or running; beyond that :class:`HashingBusy` is raised straight
+    away instead of tying up another request worker.
+    """
+
+    def __init__(self, pool='thread', workers=4, max_pending=64, timeout=10, retry_after=2):
+        self.pool = pool
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._executor = None
+        self._executor_pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.shutdown()
+        self.pool = app.config.get('HASHING_POOL', self.pool)
+        self.workers = app.config.get('HASHING_WORKERS', self.workers)
+        self.max_pending = app.config.get('HASHING_MAX_PENDING', self.max_pending)
+        self.timeout = app.config.get('HASHING_TIMEOUT', self.timeout)
+        self.retry_after = app.config.get('HASHING_RETRY_AFTER', self.retry_after)
+
+    def _get_executor(self):
+        # Pools do not survive a fork, so each worker process builds its own
+        if self._executor is None or self._executor_pid != os.getpid():
+            if self.pool == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='password-hasher'
+                )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingBusy(self.retry_after)
+            self._pending += 1
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except Exception:
+                self._pending -= 1
+                raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy(self.retry_after)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._executor_pid = None
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,66 @@
+
+import hashlib
+from collections import namedtuple
+from flask import request, make_response
+from sqlalchemy import select, func
+
+Validators = namedtuple('Validators', 'etag last_modified total')
+
+def _weak_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def _representation(fields):
+    return ','.join(field.name for field in fields)
+
+def collection_validators(session, stmt, model, related=(), fields=()):
+    """Version a filtered list without loading it.
+
+    One aggregate over the rows ``stmt`` selects: their count, highest id
+    and newest ``updated_at``, plus the newest ``updated_at`` of each
+    ``related`` model whose columns appear in the response (names, say).
+    Any insert, delete or update that could change the page changes one of
+    these. The ETag also covers the request's path and query string, so
+    each page and filter has its own, and the names of the output
+    ``fields``, which differ by role. ``total`` is the row count, so the
+    caller need not count again.
+
+    Lists get no Last-Modified: a hard delete does not move ``updated_at``.
+    """
+    columns = [func.count(), func.max(model.id), func.max(model.updated_at)]
+    columns += [select(func.max(other.updated_at)).scalar_subquery() for other in related]
+    row = session.execute(stmt.with_only_columns(*columns).order_by(None)).one()
+    return Validators(_weak_etag(request.full_path, _representation(fields), *row), None, row[0])
+
+def resource_validators(updated_at, fields=()):
+    """ETag and Last-Modified of a single row from its ``updated_at``."""
+    return Validators(_weak_etag(request.full_path, _representation(fields), updated_at), updated_at, None)
+
+def content_validators(*parts):
+    """An ETag for a response built from ``parts`` rather than from a query."""
+    return Validators(_weak_etag(request.full_path, *parts), None, None)
+
+def is_not_modified(validators):
+    """Whether the request's conditional headers still match.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    without it, and only when a Last-Modified is known.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(validators.etag.removeprefix('W/').strip('"'))
+    if request.if_modified_since and validators.last_modified:
+        # HTTP dates have whole-second precision
+        return validators.last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+def with_validators(response, validators):
+    """Attach the validators; ``no-cache`` makes clients revalidate each time."""
+    response = make_response(response)
+    response.headers['ETag'] = validators.etag
+    if validators.last_modified:
+        response.last_modified = validators.last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified_response(validators):
+    return with_validators(('', 304), validators)
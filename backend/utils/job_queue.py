@@ -0,0 +1,397 @@
+
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, insert, and_, or_
+from .engine import JOBS_BIND_KEY, begin_write
+
+logger = logging.getLogger(__name__)
+
+JobType = namedtuple('JobType', 'name handler roles max_attempts validate')
+
+# Job type name -> JobType; filled in by @job_type where each feature lives
+JOB_TYPES = {}
+
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+def job_type(name, roles, max_attempts=None, validate=None):
+    """Register ``handler(payload, job)`` as the code behind jobs of type ``name``.
+
+    ``roles`` may enqueue it. ``validate(payload)`` runs at enqueue time
+    and raises ValueError for a bad payload. The handler reports progress
+    through ``job.progress(done, total)`` and returns a JSON-serializable
+    result. Raising makes the attempt fail; it is retried with backoff
+    until ``max_attempts`` (default JOB_MAX_ATTEMPTS) is used up.
+    """
+    def register(handler):
+        JOB_TYPES[name] = JobType(name, handler, tuple(roles), max_attempts, validate)
+        return handler
+    return register
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+class JobQueue:
+    """Durable job queue kept in a table, with no broker.
+
+    Workers claim the runnable job with the highest priority (oldest
+    first) by compare-and-set on its row, which takes a lease of
+    ``lease_seconds``. While the job runs, a heartbeat renews the lease.
+    A worker that dies stops renewing, so once the lease runs out the job
+    is claimed again. Every write a worker makes about a job is fenced on
+    ``locked_by``, so a worker that lost its lease cannot overwrite the
+    new owner's progress or outcome. Failed attempts go back into the
+    queue after an exponential backoff, until ``max_attempts`` is reached.
+    """
+
+    def __init__(self, lease_seconds=60, max_attempts=3, retry_base_seconds=10, retry_max_seconds=3600,
+                 poll_interval=1.0):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_interval = poll_interval
+        self.app = None
+        self._engine = None
+
+    def init_app(self, app):
+        self.app = app
+        self._engine = None
+        self.lease_seconds = app.config.get('JOB_LEASE_SECONDS', self.lease_seconds)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_base_seconds = app.config.get('JOB_RETRY_BASE_SECONDS', self.retry_base_seconds)
+        self.retry_max_seconds = app.config.get('JOB_RETRY_MAX_SECONDS', self.retry_max_seconds)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+
+    @property
+    def engine(self):
+        from ..app import db
+
+        if self._engine is None:
+            with self.app.app_context():
+                self._engine = db.engines[JOBS_BIND_KEY]
+        return self._engine
+
+    @property
+    def table(self):
+        from ..models.job import Job
+
+        return Job.__table__
+
+    def enqueue(self, kind, payload=None, priority=0, max_attempts=None, run_at=None, created_by=None):
+        """Persist a new job and return its id; the payload is validated first."""
+        definition = JOB_TYPES.get(kind)
+        if definition is None:
+            raise ValueError(f"Unknown job type '{kind}'")
+        payload = payload or {}
+        if definition.validate:
+            definition.validate(payload)
+        now = datetime.utcnow()
+        with self.engine.begin() as connection:
+            return connection.execute(insert(self.table).values(
+                kind=kind,
+                payload=_dumps(payload),
+                status='queued',
+                priority=int(priority),
+                attempts=0,
+                max_attempts=int(max_attempts or definition.max_attempts or self.max_attempts),
+                run_at=run_at or now,
+                created_by=created_by,
+                created_at=now,
+                updated_at=now
+            )).inserted_primary_key[0]
+
+    def get(self, job_id):
+        with self.engine.connect() as connection:
+            row = connection.execute(select(self.table).where(self.table.c.id == job_id)).mappings().first()
+        return job_to_dict(row) if row else None
+
+    def recent(self, status=None, kind=None, created_by=None, limit=50):
+        table = self.table
+        stmt = select(table).order_by(table.c.id.desc()).limit(limit)
+        if status:
+            stmt = stmt.where(table.c.status == status)
+        if kind:
+            stmt = stmt.where(table.c.kind == kind)
+        if created_by is not None:
+            stmt = stmt.where(table.c.created_by == created_by)
+        with self.engine.connect() as connection:
+            return [job_to_dict(row) for row in connection.execute(stmt).mappings()]
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started; returns whether it was cancelled."""
+        table = self.table
+        now = datetime.utcnow()
+        with self.engine.begin() as connection:
+            return connection.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == 'queued')
+                .values(status='cancelled', finished_at=now, updated_at=now)
+            ).rowcount == 1
+
+    def _runnable(self, now):
+        table = self.table
+        return or_(
+            and_(table.c.status == 'queued', table.c.run_at <= now),
+            # Abandoned by a worker that stopped renewing its lease
+            and_(table.c.status == 'running', table.c.lease_expires_at < now,
+                 table.c.attempts < table.c.max_attempts)
+        )
+
+    def claim(self, worker_id, kinds=None):
+        """Lease the next runnable job to ``worker_id``.
+
+        Returns ``(id, kind, payload, created_by)``, or None when nothing is runnable.
+        """
+        table = self.table
+        now = datetime.utcnow()
+        runnable = self._runnable(now)
+        candidates = (
+            select(table.c.id, table.c.kind, table.c.payload, table.c.created_by)
+            .where(runnable)
+            .order_by(table.c.priority.desc(), table.c.run_at, table.c.id)
+            .limit(5)
+            # Postgres/MySQL: concurrent claimers skip each other's rows;
+            # SQLite claims run one at a time under the write lock (begin_write)
+            .with_for_update(skip_locked=True)
+        )
+        if kinds:
+            candidates = candidates.where(table.c.kind.in_(kinds))
+
+        with begin_write(self.engine) as connection:
+            self._fail_exhausted(connection, now)
+            for job_id, kind, payload, created_by in connection.execute(candidates).all():
+                claimed = connection.execute(
+                    update(table)
+                    .where(table.c.id == job_id, runnable)
+                    .values(
+                        status='running',
+                        locked_by=worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=table.c.attempts + 1,
+                        started_at=now,
+                        updated_at=now
+                    )
+                ).rowcount
+                if claimed:
+                    return job_id, kind, json.loads(payload), created_by
+        return None
+
+    def _fail_exhausted(self, connection, now):
+        """Jobs whose last attempt's worker vanished: out of attempts, so failed."""
+        table = self.table
+        connection.execute(
+            update(table)
+            .where(
+                table.c.status == 'running',
+                table.c.lease_expires_at < now,
+                table.c.attempts >= table.c.max_attempts
+            )
+            .values(
+                status='failed',
+                error='Worker stopped responding (lease expired)',
+                locked_by=None,
+                finished_at=now,
+                updated_at=now
+            )
+        )
+
+    def _fenced_update(self, job_id, worker_id, **values):
+        with self.engine.begin() as connection:
+            return self._fenced(connection, job_id, worker_id, **values)
+
+    def _fenced(self, connection, job_id, worker_id, **values):
+        table = self.table
+        values['updated_at'] = datetime.utcnow()
+        return connection.execute(
+            update(table)
+            .where(table.c.id == job_id, table.c.locked_by == worker_id, table.c.status == 'running')
+            .values(**values)
+        ).rowcount == 1
+
+    def heartbeat(self, job_id, worker_id, **progress):
+        """Renew the lease (and record progress); False once the lease is lost."""
+        return self._fenced_update(
+            job_id, worker_id,
+            lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+            **progress
+        )
+
+    def complete(self, job_id, worker_id, result):
+        return self._fenced_update(
+            job_id, worker_id,
+            status='succeeded', result=_dumps(result), error=None, locked_by=None,
+            lease_expires_at=None, finished_at=datetime.utcnow()
+        )
+
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt: back into the queue after a backoff, or failed for good."""
+        table = self.table
+        now = datetime.utcnow()
+        # The attempt count is read and acted on in one transaction, so a
+        # reclaim in between cannot leave a stale count deciding the outcome
+        with begin_write(self.engine) as connection:
+            row = connection.execute(
+                select(table.c.attempts, table.c.max_attempts)
+                .where(table.c.id == job_id, table.c.locked_by == worker_id, table.c.status == 'running')
+                .with_for_update()
+            ).first()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if attempts < max_attempts:
+                return self._fenced(
+                    connection, job_id, worker_id,
+                    status='queued', error=error, locked_by=None, lease_expires_at=None,
+                    run_at=now + timedelta(seconds=self.retry_delay(attempts))
+                )
+            return self._fenced(
+                connection, job_id, worker_id,
+                status='failed', error=error, locked_by=None, lease_expires_at=None, finished_at=now
+            )
+
+    def retry_delay(self, attempts):
+        """Exponential backoff after the ``attempts``-th failure, with 10% jitter."""
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return delay * random.uniform(0.9, 1.1)
+
+job_queue = JobQueue()
+
+def job_to_dict(row):
+    return {
+        'id': row['id'],
+        'type': row['kind'],
+        'status': row['status'],
+        'priority': row['priority'],
+        'attempts': row['attempts'],
+        'maxAttempts': row['max_attempts'],
+        'progress': {
+            'done': row['progress_done'],
+            'total': row['progress_total'],
+            'message': row['progress_message']
+        },
+        'payload': json.loads(row['payload']),
+        'result': json.loads(row['result']) if row['result'] is not None else None,
+        'error': row['error'],
+        'createdBy': row['created_by'],
+        'createdAt': row['created_at'],
+        'runAt': row['run_at'],
+        'startedAt': row['started_at'],
+        'finishedAt': row['finished_at']
+    }
+
+class RunningJob:
+    """What a handler sees of its job: the id, who queued it, and progress reporting."""
+
+    def __init__(self, queue, job_id, worker_id, created_by=None, progress_interval=1.0):
+        self.queue = queue
+        self.id = job_id
+        self.worker_id = worker_id
+        self.created_by = created_by
+        self.lease_lost = False
+        self.progress_interval = progress_interval
+        self._last_progress = 0.0
+
+    def progress(self, done, total=None, message=None):
+        """Record progress; written at most once per ``progress_interval`` until done."""
+        now = time.monotonic()
+        if now - self._last_progress < self.progress_interval and (total is None or done < total):
+            return
+        self._last_progress = now
+        values = {'progress_done': done, 'progress_total': total}
+        if message is not None:
+            values['progress_message'] = message[:200]
+        if not self.queue.heartbeat(self.id, self.worker_id, **values):
+            self.lease_lost = True
+
+class JobWorker:
+    """Runs jobs from the queue one at a time in this process.
+
+    Each job runs inside an app context. A heartbeat thread renews the
+    lease every third of ``lease_seconds``. SIGTERM and SIGINT stop the
+    worker once the job in hand is done. With ``burst`` the worker exits
+    as soon as the queue has nothing runnable.
+    """
+
+    def __init__(self, app, queue=None, kinds=None, name=None):
+        self.app = app
+        self.queue = queue or job_queue
+        self.kinds = kinds
+        self.id = f"{name or socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def install_signal_handlers(self):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: self.stopping.set())
+
+    def run(self, burst=False, max_jobs=None):
+        """Work until stopped; returns how many jobs were run."""
+        processed = 0
+        while not self.stopping.is_set() and (max_jobs is None or processed < max_jobs):
+            try:
+                claimed = self.queue.claim(self.id, self.kinds)
+            except Exception:
+                # The database may be locked, restarting or unreachable; keep polling
+                logger.exception('Claiming a job failed; retrying in %.1fs', self.queue.poll_interval)
+                self.stopping.wait(self.queue.poll_interval)
+                continue
+            if claimed is None:
+                if burst:
+                    break
+                self.stopping.wait(self.queue.poll_interval)
+                continue
+            self.execute(*claimed)
+            processed += 1
+        return processed
+
+    def execute(self, job_id, kind, payload, created_by=None):
+        from ..app import db
+
+        running = RunningJob(self.queue, job_id, self.id, created_by=created_by)
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(running, finished), name=f'job-{job_id}-heartbeat', daemon=True
+        )
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            definition = JOB_TYPES.get(kind)
+            if definition is None:
+                raise LookupError(f"No handler for job type '{kind}' in this worker")
+            with self.app.app_context():
+                try:
+                    result = definition.handler(payload, running)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            finished.set()
+            logger.exception('Job %s (%s) failed', job_id, kind)
+            record, outcome = self.queue.fail, f'{type(e).__name__}: {e}'
+        else:
+            finished.set()
+            logger.info('Job %s (%s) finished in %.1fs', job_id, kind, time.perf_counter() - started)
+            record, outcome = self.queue.complete, result
+        try:
+            recorded = record(job_id, self.id, outcome)
+        except Exception:
+            # The lease is no longer renewed, so the job is claimed again once it runs out
+            logger.exception('Could not record the outcome of job %s (%s); it will run again', job_id, kind)
+            return
+        if not recorded:
+            logger.warning('Job %s (%s) lost its lease before finishing; outcome discarded', job_id, kind)
+
+    def _heartbeat(self, running, finished):
+        while not finished.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(running.id, self.id):
+                    running.lease_lost = True
+                    return
+            except Exception:
+                logger.exception('Heartbeat for job %s failed', running.id)
@@ -0,0 +1,72 @@
+
+from datetime import date, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """The stock provider, with dates and times as ISO 8601 strings.
+
+    Models and serializers hand back raw ``date``/``datetime`` values and
+    leave formatting to the provider, so each value is encoded exactly once.
+    """
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, (date, time)):
+            return value.isoformat()
+        return DefaultJSONProvider.default(value)
+
+class OrjsonProvider(IsoJSONProvider):
+    """JSON responses encoded by orjson.
+
+    Output matches ``IsoJSONProvider``: naive datetimes keep their
+    microseconds and no offset, keys stay sorted, and anything orjson does
+    not know natively goes through the same ``default``.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for json.dumps options get the stock encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def _option(self):
+        option = self.option
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self._app.debug if self.compact is None else not self.compact:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Skip the str round trip: orjson already produces UTF-8 bytes
+        body = orjson.dumps(obj, default=self.default, option=self._option()) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'default': IsoJSONProvider
+}
+
+def init_json_provider(app):
+    """Install the provider named by JSON_PROVIDER (``auto`` prefers orjson)."""
+    name = app.config.get('JSON_PROVIDER', 'auto')
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'default'
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER '{name}'")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_PROVIDER=orjson needs the orjson package')
+    app.json = JSON_PROVIDERS[name](app)
@@ -0,0 +1,65 @@
+
+import base64
+import json
+from sqlalchemy import tuple_, select, func
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_more = next_cursor is not None
+        self.total = total
+
+def keyset_paginate_select(session, stmt, order_by, after=None, limit=DEFAULT_LIMIT,
+                           include_total=False, descending=False):
+    """Page through the column-only ``select()`` ``stmt`` by the unique key ``order_by``.
+
+    ``order_by`` is a list of columns whose combined value is unique (end it
+    with the primary key), ``after`` is the opaque cursor from the previous
+    page. Pages cost an index range scan instead of OFFSET, and the total is
+    only counted when asked for.
+
+    The key columns are appended to each row, so the statement does not need
+    to project them itself; readers of the rows should index by position.
+    """
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    total = None
+    if include_total:
+        total = session.execute(
+            select(func.count()).select_from(stmt.order_by(None).subquery())
+        ).scalar()
+
+    stmt = stmt.add_columns(*order_by)
+    if after:
+        values = decode_cursor(after, len(order_by))
+        key = tuple_(*order_by)
+        stmt = stmt.where(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    ordering = [column.desc() for column in order_by] if descending else list(order_by)
+    rows = session.execute(stmt.order_by(*ordering).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-len(order_by):])
+
+    return KeysetPage(rows, next_cursor, total)
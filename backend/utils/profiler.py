@@ -0,0 +1,202 @@
+
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import g, request
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+class Profile:
+    """Stack samples from one profiling session, per thread."""
+
+    def __init__(self, profile_id, kind, label, duration, interval):
+        self.id = profile_id
+        self.kind = kind
+        self.label = label
+        self.duration = duration
+        self.interval = interval
+        self.started_at = time.time()
+        self.elapsed = None
+        self.samples = 0
+        self.stacks = {}
+        self.stop_event = threading.Event()
+
+    @property
+    def running(self):
+        return self.elapsed is None
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'label': self.label,
+            'status': 'running' if self.running else 'finished',
+            'startedAt': self.started_at,
+            'durationSeconds': self.duration,
+            'elapsedSeconds': self.elapsed,
+            'intervalMs': self.interval * 1000,
+            'samples': self.samples
+        }
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed stacks: ``thread;outer;...;inner count`` per line."""
+        lines = []
+        for thread, stacks in sorted(self.stacks.items()):
+            for stack, count in stacks.most_common():
+                lines.append(';'.join((thread,) + tuple(_frame_label(frame) for frame in stack)) + f' {count}')
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self):
+        """The speedscope file format, one sampled profile per thread."""
+        frames = []
+        frame_index = {}
+        profiles = []
+        for thread, stacks in sorted(self.stacks.items()):
+            samples = []
+            weights = []
+            for stack, count in stacks.most_common():
+                indexes = []
+                for frame in stack:
+                    if frame not in frame_index:
+                        frame_index[frame] = len(frames)
+                        frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                    indexes.append(frame_index[frame])
+                samples.append(indexes)
+                weights.append(count * self.interval)
+            profiles.append({
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f'{self.label} ({self.id})',
+            'exporter': 'emsu-backend',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': profiles
+        }
+
+def _frame_label(frame):
+    return f'{frame[0]} ({frame[1]}:{frame[2]})'
+
+_code_frames = {}
+
+def _frame_key(code):
+    frame = _code_frames.get(code)
+    if frame is None:
+        path = code.co_filename
+        try:
+            relative = os.path.relpath(path)
+            path = path if relative.startswith('..') else relative
+        except ValueError:
+            pass
+        frame = _code_frames[code] = (code.co_name, path, code.co_firstlineno)
+    return frame
+
+def _sample(profile, thread_ids):
+    """Sampler thread: walk the selected threads' stacks every ``interval``."""
+    own = threading.get_ident()
+    started = time.perf_counter()
+    deadline = started + profile.duration
+    try:
+        while not profile.stop_event.wait(profile.interval) and time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (thread_ids is not None and ident not in thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_key(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                thread = names.get(ident, str(ident))
+                profile.stacks.setdefault(thread, Counter())[tuple(stack)] += 1
+            profile.samples += 1
+    finally:
+        profile.elapsed = round(time.perf_counter() - started, 3)
+
+class SamplingProfiler:
+    """Opt-in statistical profiler for the running worker.
+
+    A session samples every thread's Python stack each ``interval`` from a
+    background thread, for at most ``max_seconds``; no tracing hooks are
+    installed, so requests run at full speed between samples. One request
+    can be profiled on its own by sending ``X-Profile-Token`` with the
+    configured PROFILER_TOKEN. Results stay in this process (the last
+    ``max_profiles``) and export as collapsed stacks or speedscope JSON.
+    With PROFILER_ENABLED off nothing is registered at all.
+    """
+
+    def __init__(self, interval=0.005, max_seconds=60, max_profiles=20):
+        self.enabled = False
+        self.token = None
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILER_ENABLED', self.enabled)
+        self.token = app.config.get('PROFILER_TOKEN', self.token)
+        self.interval = app.config.get('PROFILER_INTERVAL_MS', self.interval * 1000) / 1000
+        self.max_seconds = app.config.get('PROFILER_MAX_SECONDS', self.max_seconds)
+        if self.enabled and self.token:
+            app.before_request(_start_request_profile)
+            app.after_request(_tag_response)
+            app.teardown_request(_stop_request_profile)
+
+    def start(self, duration, interval=None, thread_ids=None, kind='worker', label='worker'):
+        duration = min(duration, self.max_seconds)
+        with self._lock:
+            if kind == 'worker' and any(
+                profile.running and profile.kind == 'worker' for profile in self._profiles.values()
+            ):
+                raise RuntimeError('A worker profile is already running')
+            profile = Profile(f'{os.getpid()}-{next(self._ids)}', kind, label, duration, interval or self.interval)
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        threading.Thread(
+            target=_sample, args=(profile, thread_ids), name=f'profiler-{profile.id}', daemon=True
+        ).start()
+        return profile
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def profiles(self):
+        with self._lock:
+            return list(self._profiles.values())
+
+sampling_profiler = SamplingProfiler()
+
+def _start_request_profile():
+    supplied = request.headers.get(PROFILE_HEADER)
+    if supplied and hmac.compare_digest(supplied, sampling_profiler.token):
+        g.profile = sampling_profiler.start(
+            sampling_profiler.max_seconds, thread_ids={threading.get_ident()},
+            kind='request', label=f'{request.method} {request.path}'
+        )
+
+def _tag_response(response):
+    profile = g.get('profile')
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+def _stop_request_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop_event.set()
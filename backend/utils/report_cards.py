@@ -0,0 +1,280 @@
+
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from sqlalchemy import select, func, case
+
+# Bump when the rendered layout changes so every card is regenerated
+TEMPLATE_VERSION = '1'
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late', 'excused')
+
+SETTLED_STATUSES = ('Paid', 'Waived')
+
+# HTML renders in well under a millisecond; below this many cards per
+# process, starting the pool costs more than it saves
+MIN_CARDS_PER_WORKER = 5000
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def prefetch_report_card_inputs(session, grade_level, academic_year=None, semester=None,
+                                date_from=None, date_to=None):
+    """Everything the cards for one grade level need, in four queries.
+
+    Returns one plain, picklable payload per active student, ordered by
+    last name, so rendering needs no database access.
+    """
+    from ..models.student import Student
+    from ..models.grade import Grade
+    from ..models.attendance import Attendance
+    from ..models.fee import Fee
+
+    student, grade, attendance, fee = (
+        Student.__table__.c, Grade.__table__.c, Attendance.__table__.c, Fee.__table__.c
+    )
+    cohort = select(student.id).where(student.grade == grade_level, student.is_active == True)
+
+    students = session.execute(
+        select(student.id, student.student_id, student.first_name, student.last_name, student.grade)
+        .where(student.id.in_(cohort))
+        .order_by(student.last_name, student.id)
+    ).all()
+    if not students:
+        return []
+
+    grade_query = select(
+        grade.student_id, grade.subject, grade.exam_type, grade.marks_obtained, grade.total_marks,
+        grade.grade_letter, grade.weight, grade.remarks, grade.exam_date
+    ).where(grade.student_id.in_(cohort))
+    if academic_year:
+        grade_query = grade_query.where(grade.academic_year == academic_year)
+    if semester:
+        grade_query = grade_query.where(grade.semester == semester)
+    assessments = defaultdict(lambda: defaultdict(list))
+    for row in session.execute(grade_query.order_by(grade.student_id, grade.subject, grade.exam_date, grade.id)):
+        assessments[row.student_id][row.subject].append({
+            'examType': row.exam_type,
+            'marksObtained': row.marks_obtained,
+            'totalMarks': row.total_marks,
+            'percentage': round(row.marks_obtained / row.total_marks * 100, 2) if row.total_marks else None,
+            'gradeLetter': row.grade_letter,
+            'weight': 1.0 if row.weight is None else row.weight,
+            'remarks': row.remarks,
+            'examDate': _iso(row.exam_date)
+        })
+
+    attendance_query = select(
+        attendance.student_id, attendance.status, func.count()
+    ).where(attendance.student_id.in_(cohort))
+    if date_from:
+        attendance_query = attendance_query.where(attendance.date >= date_from)
+    if date_to:
+        attendance_query = attendance_query.where(attendance.date <= date_to)
+    attendance_totals = defaultdict(lambda: dict.fromkeys(ATTENDANCE_STATUSES, 0))
+    for student_id, status, count in session.execute(
+        attendance_query.group_by(attendance.student_id, attendance.status)
+    ):
+        if status in ATTENDANCE_STATUSES:
+            attendance_totals[student_id][status] = count
+
+    remaining = (
+        fee.amount - func.coalesce(fee.discount_amount, 0)
+        + func.coalesce(fee.late_fee, 0) - func.coalesce(fee.paid_amount, 0)
+    )
+    balance = case(
+        (fee.status.in_(SETTLED_STATUSES), 0.0),
+        (remaining > 0, remaining),
+        else_=0.0
+    )
+    fee_query = select(
+        fee.student_id,
+        func.sum(fee.amount - func.coalesce(fee.discount_amount, 0) + func.coalesce(fee.late_fee, 0)),
+        func.sum(func.coalesce(fee.paid_amount, 0)),
+        func.sum(balance),
+        func.sum(case((fee.status == 'Overdue', 1), else_=0))
+    ).where(fee.student_id.in_(cohort))
+    if academic_year:
+        fee_query = fee_query.where(fee.academic_year == academic_year)
+    if semester:
+        fee_query = fee_query.where(fee.semester == semester)
+    fee_totals = {
+        row[0]: row[1:] for row in session.execute(fee_query.group_by(fee.student_id))
+    }
+
+    term = {
+        'gradeLevel': grade_level,
+        'academicYear': academic_year,
+        'semester': semester,
+        'dateFrom': _iso(date_from),
+        'dateTo': _iso(date_to)
+    }
+    payloads = []
+    for row in students:
+        subjects = []
+        weighted_total = weight_total = 0.0
+        for subject, items in sorted(assessments[row.id].items()):
+            scored = [item for item in items if item['percentage'] is not None]
+            weights = sum(item['weight'] for item in scored)
+            average = (
+                round(sum(item['percentage'] * item['weight'] for item in scored) / weights, 2)
+                if weights else None
+            )
+            if average is not None:
+                weighted_total += average * weights
+                weight_total += weights
+            subjects.append({'subject': subject, 'assessments': items, 'weightedPercentage': average})
+
+        counts = attendance_totals[row.id]
+        counted = counts['present'] + counts['late'] + counts['absent']
+        billed, paid, outstanding, overdue = fee_totals.get(row.id, (0, 0, 0, 0))
+        payloads.append({
+            'term': term,
+            'student': {
+                'id': row.id,
+                'studentId': row.student_id,
+                'name': f'{row.first_name} {row.last_name}',
+                'grade': row.grade
+            },
+            'subjects': subjects,
+            'overallPercentage': round(weighted_total / weight_total, 2) if weight_total else None,
+            'attendance': dict(
+                counts,
+                attendanceRate=round((counts['present'] + counts['late']) / counted * 100, 2) if counted else None
+            ),
+            'fees': {
+                'billed': round(billed or 0, 2),
+                'paid': round(paid or 0, 2),
+                'outstanding': round(outstanding or 0, 2),
+                'overdueItems': overdue or 0,
+                'status': 'Overdue' if overdue else ('Clear' if not outstanding else 'Outstanding')
+            }
+        })
+    return payloads
+
+def input_digest(payload):
+    """Content address of a card: its inputs plus the template version."""
+    canonical = json.dumps([TEMPLATE_VERSION, payload], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _text(value, suffix=''):
+    return '&ndash;' if value is None else escape(f'{value}{suffix}')
+
+def render_report_card(payload):
+    """Render one card as a standalone HTML document."""
+    student, term = payload['student'], payload['term']
+    period = ' '.join(filter(None, [term['academicYear'], term['semester'] and f"Semester {term['semester']}"]))
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8">',
+        f"<title>Report card &ndash; {escape(student['name'])}</title>",
+        '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;width:100%;'
+        'margin-bottom:1.5em}th,td{border:1px solid #ccc;padding:4px 8px;text-align:left}'
+        'th{background:#f3f3f3}</style></head><body>',
+        f"<h1>{escape(student['name'])}</h1>",
+        f"<p>Student ID {escape(student['studentId'])} &middot; Grade {escape(student['grade'])}"
+        f"{' &middot; ' + escape(period) if period else ''}</p>",
+        f"<h2>Overall: {_text(payload['overallPercentage'], '%')}</h2>"
+    ]
+    for subject in payload['subjects']:
+        parts.append(
+            f"<h3>{escape(subject['subject'])} &ndash; {_text(subject['weightedPercentage'], '%')}</h3>"
+            '<table><tr><th>Assessment</th><th>Date</th><th>Marks</th><th>%</th>'
+            '<th>Grade</th><th>Weight</th><th>Remarks</th></tr>'
+        )
+        for item in subject['assessments']:
+            parts.append(
+                f"<tr><td>{_text(item['examType'])}</td><td>{_text(item['examDate'])}</td>"
+                f"<td>{_text(item['marksObtained'])} / {_text(item['totalMarks'])}</td>"
+                f"<td>{_text(item['percentage'])}</td><td>{_text(item['gradeLetter'])}</td>"
+                f"<td>{_text(item['weight'])}</td><td>{_text(item['remarks'])}</td></tr>"
+            )
+        parts.append('</table>')
+
+    attendance, fees = payload['attendance'], payload['fees']
+    parts.append(
+        '<h3>Attendance</h3><table><tr><th>Present</th><th>Late</th><th>Absent</th>'
+        '<th>Excused</th><th>Rate</th></tr>'
+        f"<tr><td>{attendance['present']}</td><td>{attendance['late']}</td><td>{attendance['absent']}</td>"
+        f"<td>{attendance['excused']}</td><td>{_text(attendance['attendanceRate'], '%')}</td></tr></table>"
+        '<h3>Fees</h3><table><tr><th>Billed</th><th>Paid</th><th>Outstanding</th><th>Status</th></tr>'
+        f"<tr><td>{fees['billed']:.2f}</td><td>{fees['paid']:.2f}</td><td>{fees['outstanding']:.2f}</td>"
+        f"<td>{escape(fees['status'])}</td></tr></table>"
+        '</body></html>'
+    )
+    return ''.join(parts)
+
+def card_path(output_dir, digest):
+    return os.path.join(output_dir, digest[:2], f'{digest}.html')
+
+def _write_atomically(path, text):
+    # A temporary name of its own, so concurrent writers of the same file
+    # (an HTTP run and a job, or two request threads) never share one
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        handle.write(text)
+    os.replace(temporary, path)
+
+def _render_to_file(job):
+    """Worker entry point: render and write atomically, so partial files never appear."""
+    payload, path = job
+    _write_atomically(path, render_report_card(payload))
+    return path
+
+def generate_report_cards(payloads, output_dir, workers=None, progress=None):
+    """Render the cards whose inputs changed since they were last written.
+
+    Cards live at ``<output_dir>/<digest[:2]>/<digest>.html``, so an
+    unchanged card is found by its digest and skipped. A manifest per term
+    maps student ids to their current card. ``progress(done, total)`` is
+    called as cards complete.
+    """
+    started = time.perf_counter()
+    cards = {}
+    jobs = []
+    for payload in payloads:
+        digest = input_digest(payload)
+        path = card_path(output_dir, digest)
+        cards[payload['student']['id']] = os.path.relpath(path, output_dir)
+        if not os.path.exists(path):
+            jobs.append((payload, path))
+
+    total = len(jobs)
+    if progress:
+        progress(0, total)
+    if total:
+        workers = min(workers or os.cpu_count() or 1, max(1, total // MIN_CARDS_PER_WORKER))
+        if workers == 1:
+            for done, job in enumerate(jobs, 1):
+                _render_to_file(job)
+                if progress:
+                    progress(done, total)
+        else:
+            # Large chunks keep pickling overhead small next to the rendering
+            chunksize = max(1, min(64, total // (workers * 4)))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for done, _ in enumerate(executor.map(_render_to_file, jobs, chunksize=chunksize), 1):
+                    if progress:
+                        progress(done, total)
+
+    if payloads:
+        term = payloads[0]['term']
+        name = '-'.join(str(term[key] or 'all') for key in ('gradeLevel', 'academicYear', 'semester'))
+        name = re.sub(r'[^\w.-]+', '_', name)
+        manifest_path = os.path.join(output_dir, 'manifests', f'{name}.json')
+        _write_atomically(manifest_path, json.dumps(
+            {'term': term, 'templateVersion': TEMPLATE_VERSION, 'cards': cards}, indent=2
+        ))
+
+    return {
+        'students': len(payloads),
+        'generated': total,
+        'unchanged': len(payloads) - total,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,219 @@
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import g, request, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Request duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+def fingerprint(statement):
+    """The shape of a statement: literals and IN-list lengths folded away."""
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    return _PLACEHOLDER_LIST.sub('(?)', statement)
+
+class _RequestStats:
+    __slots__ = ('started', 'queries', 'db_time', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+class _EndpointStats:
+    __slots__ = ('requests', 'seconds', 'db_seconds', 'queries', 'n_plus_one', 'slow_queries', 'buckets')
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.n_plus_one = 0
+        self.slow_queries = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+class RequestMetrics:
+    """Per-endpoint SQL and timing metrics for this worker process.
+
+    Cursor events count every statement a request runs and the time spent
+    in the driver. At the end of the request the totals are folded into
+    per-endpoint counters (rendered for Prometheus by :meth:`render`),
+    statements repeated ``n_plus_one_threshold`` times or more with the
+    same shape are logged as a likely N+1, and ``Server-Timing`` is added
+    when enabled. Statements slower than ``slow_query_ms`` are logged
+    wherever they run.
+    """
+
+    def __init__(self, slow_query_ms=200, n_plus_one_threshold=10, server_timing=False):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.server_timing = server_timing
+        self.enabled = True
+        self._endpoints = {}
+        self._recent_n_plus_one = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SQL_METRICS_ENABLED', self.enabled)
+        self.slow_query_ms = app.config.get('SLOW_QUERY_MS', self.slow_query_ms)
+        self.n_plus_one_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        self.server_timing = app.config.get('SERVER_TIMING', self.server_timing)
+        if not self.enabled:
+            return
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _discard_failed_query)
+        app.before_request(_start_request)
+        app.after_request(_add_server_timing)
+        app.teardown_request(_finish_request)
+
+    def record_query(self, statement, elapsed):
+        stats = g.get('sql_stats') if has_app_context() else None
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[fingerprint(statement)] += 1
+        if elapsed * 1000 >= self.slow_query_ms:
+            endpoint = request.endpoint if has_request_context() else None
+            logger.warning('Slow query (%.1f ms, %s): %s', elapsed * 1000, endpoint or 'no request',
+                           _WHITESPACE.sub(' ', statement)[:1000])
+            if stats is not None:
+                with self._lock:
+                    self._endpoint(_endpoint_key()).slow_queries += 1
+
+    def _endpoint(self, key):
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats()
+        return stats
+
+    def record_request(self, key, stats):
+        elapsed = time.perf_counter() - stats.started
+        repeated = [
+            (shape, count) for shape, count in stats.statements.items()
+            if count >= self.n_plus_one_threshold
+        ]
+        with self._lock:
+            endpoint = self._endpoint(key)
+            endpoint.requests += 1
+            endpoint.seconds += elapsed
+            endpoint.db_seconds += stats.db_time
+            endpoint.queries += stats.queries
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if elapsed <= bound:
+                    endpoint.buckets[index] += 1
+            if repeated:
+                endpoint.n_plus_one += 1
+                for shape, count in repeated:
+                    self._recent_n_plus_one.append({
+                        'endpoint': key[1], 'method': key[0], 'count': count, 'statement': shape[:1000],
+                        'at': time.time()
+                    })
+        for shape, count in repeated:
+            logger.warning('Possible N+1 in %s %s: %d x %s', key[0], key[1], count, shape[:300])
+
+    def recent_n_plus_one(self):
+        with self._lock:
+            return list(self._recent_n_plus_one)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._recent_n_plus_one.clear()
+
+    def render(self):
+        """Counters and histograms in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(
+                (key, (stats.requests, stats.seconds, stats.db_seconds, stats.queries,
+                       stats.n_plus_one, stats.slow_queries, list(stats.buckets)))
+                for key, stats in self._endpoints.items()
+            )
+        lines = []
+
+        def family(name, kind, description, samples):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def labels(key, **extra):
+            pairs = [('method', key[0]), ('endpoint', key[1])] + list(extra.items())
+            return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+        histogram = []
+        for key, (requests, seconds, _, _, _, _, buckets) in endpoints:
+            for bound, count in zip(DURATION_BUCKETS, buckets):
+                histogram.append(f'emsu_request_duration_seconds_bucket{labels(key, le=repr(bound))} {count}')
+            histogram.append(f'emsu_request_duration_seconds_bucket{labels(key, le="+Inf")} {requests}')
+            histogram.append(f'emsu_request_duration_seconds_sum{labels(key)} {seconds:.6f}')
+            histogram.append(f'emsu_request_duration_seconds_count{labels(key)} {requests}')
+        family('emsu_request_duration_seconds', 'histogram', 'Time from request start to teardown.', histogram)
+        family('emsu_request_db_seconds_total', 'counter', 'Time spent executing SQL statements.',
+               [f'emsu_request_db_seconds_total{labels(key)} {values[2]:.6f}' for key, values in endpoints])
+        family('emsu_request_queries_total', 'counter', 'SQL statements executed.',
+               [f'emsu_request_queries_total{labels(key)} {values[3]}' for key, values in endpoints])
+        family('emsu_request_n_plus_one_total', 'counter',
+               'Requests that repeated one statement shape at least the N+1 threshold.',
+               [f'emsu_request_n_plus_one_total{labels(key)} {values[4]}' for key, values in endpoints])
+        family('emsu_slow_queries_total', 'counter', 'Statements slower than SLOW_QUERY_MS.',
+               [f'emsu_slow_queries_total{labels(key)} {values[5]}' for key, values in endpoints])
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _endpoint_key():
+    # The rule, not the URL, so /students/1 and /students/2 share a series
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return request.method, rule
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if started:
+        request_metrics.record_query(statement, time.perf_counter() - started.pop())
+
+def _discard_failed_query(exception_context):
+    connection = exception_context.connection
+    started = connection.info.get('query_started') if connection is not None else None
+    if started:
+        started.pop()
+
+def _start_request():
+    g.sql_stats = _RequestStats()
+
+def _add_server_timing(response):
+    stats = g.get('sql_stats')
+    if stats is not None and request_metrics.server_timing:
+        total = (time.perf_counter() - stats.started) * 1000
+        db_time = stats.db_time * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_time:.1f};desc="{stats.queries} queries", '
+            f'app;dur={max(total - db_time, 0):.1f}, total;dur={total:.1f}'
+        )
+    return response
+
+def _finish_request(exc):
+    stats = g.pop('sql_stats', None)
+    if stats is not None:
+        request_metrics.record_request(_endpoint_key(), stats)
@@ -0,0 +1,120 @@
+
+import re
+from sqlalchemy import text, inspect, Integer, Float
+
+# Two FTS5 indexes over the student table, kept in sync by triggers:
+#   student_fts      word tokens with prefix indexes for ranked typeahead
+#   student_trigram  trigrams for substring and fuzzy (partial overlap) matches
+SEARCH_COLUMNS = ('first_name', 'last_name', 'student_id', 'email')
+
+# bm25 column weights, in SEARCH_COLUMNS order
+PREFIX_WEIGHTS = '8.0, 10.0, 6.0, 2.0'
+
+# Fuzzy matching ORs trigrams together, so only the best ranked are kept
+FUZZY_CANDIDATE_LIMIT = 200
+
+MIN_FUZZY_LENGTH = 3
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def _ddl():
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in SEARCH_COLUMNS)
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS student_fts USING fts5("
+        f"{columns}, content='student', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS student_trigram USING fts5("
+        f"{columns}, content='student', content_rowid='id', tokenize='trigram')",
+    ]
+    for index in ('student_fts', 'student_trigram'):
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON student BEGIN "
+            f"INSERT INTO {index}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON student BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {columns} ON student BEGIN "
+            f"INSERT INTO {index}({index}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {index}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        ]
+    return statements
+
+def is_search_index_supported(bind):
+    return bind.dialect.name == 'sqlite'
+
+def create_student_search_index(target, connection, **kw):
+    """``after_create`` hook for the student table."""
+    if not is_search_index_supported(connection):
+        return
+    for statement in _ddl():
+        connection.exec_driver_sql(statement)
+
+def ensure_student_search_index(engine):
+    """Create the index on an existing database and backfill it."""
+    if not is_search_index_supported(engine):
+        return False
+    with engine.begin() as connection:
+        existing = set(inspect(connection).get_table_names())
+        if 'student' not in existing:
+            return False
+        missing = {'student_fts', 'student_trigram'} - existing
+        for statement in _ddl():
+            connection.exec_driver_sql(statement)
+        for index in missing:
+            connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+    return True
+
+def _prefix_query(tokens):
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def _fuzzy_query(tokens):
+    trigrams = []
+    for token in tokens:
+        if len(token) < MIN_FUZZY_LENGTH:
+            continue
+        for i in range(len(token) - MIN_FUZZY_LENGTH + 1):
+            trigram = token[i:i + MIN_FUZZY_LENGTH]
+            if trigram not in trigrams:
+                trigrams.append(trigram)
+    return ' OR '.join(f'"{trigram}"' for trigram in trigrams)
+
+def _match_subquery(index, match, score, limit=-1):
+    # The LIMIT keeps SQLite from flattening the subquery into the outer
+    # join, which would turn one MATCH into a MATCH per student row. A
+    # real limit keeps the best scores, not the first rows FTS returns.
+    order = ' ORDER BY score' if limit >= 0 else ''
+    sql = f"SELECT rowid, {score} AS score FROM {index} WHERE {index} MATCH :match{order} LIMIT {int(limit)}"
+    return text(sql).bindparams(match=match).columns(rowid=Integer, score=Float).subquery('student_search')
+
+def student_search_subquery(session, term):
+    """Ranked matches for ``term`` as a ``(rowid, score)`` subquery.
+
+    Lower scores rank first. Prefix matches on whole words are used when
+    there are any; otherwise the best trigram matches are returned, which
+    catch substrings and misspellings. Returns ``None`` when the term has
+    nothing searchable in it.
+    """
+    tokens = [token.lower() for token in _TOKEN_RE.findall(term)]
+    if not tokens:
+        return None
+
+    prefix = _prefix_query(tokens)
+    # Only active students are listed, so a prefix match on an inactive
+    # one must not keep the fuzzy matches from being tried
+    has_prefix_match = session.execute(
+        text(
+            "SELECT 1 FROM student_fts JOIN student ON student.id = student_fts.rowid "
+            "WHERE student_fts MATCH :match AND student.is_active = 1 LIMIT 1"
+        ),
+        {'match': prefix}
+    ).first()
+    if has_prefix_match:
+        return _match_subquery('student_fts', prefix, f'bm25(student_fts, {PREFIX_WEIGHTS})')
+
+    fuzzy = _fuzzy_query(tokens)
+    if not fuzzy:
+        return None
+    return _match_subquery(
+        'student_trigram', fuzzy, 'bm25(student_trigram)', limit=FUZZY_CANDIDATE_LIMIT
+    )
@@ -0,0 +1,283 @@
+
+from math import ceil
+from flask import request
+from sqlalchemy import select, func, inspect
+from sqlalchemy.orm import aliased
+from .pagination import keyset_paginate_select
+
+def full_name(first_name, last_name):
+    return f"{first_name} {last_name}" if first_name is not None else None
+
+def percentage(marks_obtained, total_marks):
+    return round((marks_obtained / total_marks) * 100, 2)
+
+# Roles that may see a student's medical details
+MEDICAL_ROLES = ('admin', 'principal', 'teacher')
+
+def requested_fields():
+    """Field names from ``?fields=a,b,c``, or None for the default set."""
+    value = request.args.get('fields')
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+class Field:
+    """One output key, the columns it is built from, and the join it needs.
+
+    ``roles`` limits the field to those roles; None means everyone.
+    """
+
+    def __init__(self, name, *columns, build=None, join=None, roles=None):
+        self.name = name
+        self.columns = columns
+        self.build = build
+        self.join = join
+        self.roles = roles
+
+    def value(self, values):
+        return self.build(*values) if self.build else values[0]
+
+    def visible_to(self, role):
+        return self.roles is None or role in self.roles
+
+class ListSerializer:
+    """Builds list payloads straight from row tuples.
+
+    Only the columns behind the requested fields are selected, and each
+    related model a field needs (a student or teacher name, say) is brought
+    in through a single outer join instead of a lazy load per row. The
+    output keys and values match the model's ``to_dict()``; dates are left
+    to the JSON provider.
+    """
+
+    def __init__(self, model, fields, joins=None):
+        self.model = model
+        self.fields = {field.name: field for field in fields}
+        self.joins = joins or {}
+
+    def resolve(self, names=None, role=None):
+        """The fields to output, in request order.
+
+        Without ``names`` that is every field ``role`` may see. Fields the
+        role may not see are reported as unknown, like misspelt ones.
+        """
+        visible = {name: field for name, field in self.fields.items() if field.visible_to(role)}
+        if not names:
+            return list(visible.values())
+        unknown = [name for name in names if name not in visible]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return [visible[name] for name in dict.fromkeys(names)]
+
+    def select(self, names=None, role=None):
+        fields = self.resolve(names, role)
+        columns = [column for field in fields for column in field.columns]
+        stmt = select(*columns).select_from(self.model)
+        planned = []
+        for field in fields:
+            if field.join and field.join not in planned:
+                planned.append(field.join)
+                target, onclause = self.joins[field.join]
+                stmt = stmt.outerjoin(target, onclause)
+        return stmt, fields
+
+    def related_models(self, fields):
+        """Models other than the root whose columns ``fields`` read."""
+        return tuple(dict.fromkeys(
+            inspect(self.joins[field.join][0]).mapper.class_ for field in fields if field.join
+        ))
+
+    def to_dicts(self, rows, fields):
+        items = []
+        for row in rows:
+            item = {}
+            position = 0
+            for field in fields:
+                width = len(field.columns)
+                item[field.name] = field.value(row[position:position + width])
+                position += width
+            items.append(item)
+        return items
+
+def paginated_list(session, serializer, stmt, fields, order_by, key, total=None):
+    """Run a serializer statement with the request's pagination arguments.
+
+    ``?after=<cursor>&limit=N`` pages by key (newest first); otherwise
+    ``?page=&per_page=`` pages by offset and reports the total. Pass
+    ``total`` when the caller has already counted the matching rows.
+    """
+    if 'after' in request.args:
+        page = keyset_paginate_select(
+            session, stmt, order_by,
+            after=request.args.get('after'),
+            limit=request.args.get('limit', request.args.get('per_page', 20, type=int), type=int),
+            include_total=request.args.get('include_total', 'false').lower() == 'true',
+            descending=True
+        )
+        result = {
+            key: serializer.to_dicts(page.items, fields),
+            'next_cursor': page.next_cursor,
+            'has_more': page.has_more
+        }
+        if page.total is not None:
+            result['total'] = page.total
+        return result
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(min(request.args.get('per_page', 20, type=int), 100), 1)
+    if total is None:
+        total = session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+    rows = session.execute(
+        stmt.order_by(*[column.desc() for column in order_by])
+        .limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    return {
+        key: serializer.to_dicts(rows, fields),
+        'total': total,
+        'pages': ceil(total / per_page) if total else 0,
+        'current_page': page
+    }
+
+def _student_serializer():
+    from ..models.student import Student
+
+    return ListSerializer(Student, [
+        Field('id', Student.id),
+        Field('studentId', Student.student_id),
+        Field('firstName', Student.first_name),
+        Field('lastName', Student.last_name),
+        Field('email', Student.email),
+        Field('phone', Student.phone),
+        Field('address', Student.address),
+        Field('dateOfBirth', Student.date_of_birth),
+        Field('grade', Student.grade),
+        Field('enrollmentDate', Student.enrollment_date),
+        Field('isActive', Student.is_active),
+        Field('guardianName', Student.guardian_name),
+        Field('guardianPhone', Student.guardian_phone),
+        Field('guardianEmail', Student.guardian_email),
+        Field('profilePicture', Student.profile_picture),
+        Field('medicalInfo', Student.medical_info, roles=MEDICAL_ROLES),
+        Field('emergencyContact', Student.emergency_contact),
+        Field('transportMode', Student.transport_mode),
+        Field('bloodGroup', Student.blood_group, roles=MEDICAL_ROLES),
+    ])
+
+def _grade_serializer():
+    from ..models.grade import Grade
+    from ..models.student import Student
+    from ..models.teacher import Teacher
+
+    student = aliased(Student)
+    teacher = aliased(Teacher)
+    return ListSerializer(Grade, [
+        Field('id', Grade.id),
+        Field('studentId', Grade.student_id),
+        Field('studentName', student.first_name, student.last_name, build=full_name, join='student'),
+        Field('subject', Grade.subject),
+        Field('examType', Grade.exam_type),
+        Field('marksObtained', Grade.marks_obtained),
+        Field('totalMarks', Grade.total_marks),
+        Field('gradeLetter', Grade.grade_letter),
+        Field('percentage', Grade.marks_obtained, Grade.total_marks, build=percentage),
+        Field('semester', Grade.semester),
+        Field('academicYear', Grade.academic_year),
+        Field('teacherId', Grade.teacher_id),
+        Field('teacherName', teacher.first_name, teacher.last_name, build=full_name, join='teacher'),
+        Field('examDate', Grade.exam_date),
+        Field('remarks', Grade.remarks),
+        Field('weight', Grade.weight),
+        Field('createdAt', Grade.created_at),
+    ], joins={
+        'student': (student, student.id == Grade.student_id),
+        'teacher': (teacher, teacher.id == Grade.teacher_id),
+    })
+
+def _attendance_serializer():
+    from ..models.attendance import Attendance
+    from ..models.student import Student
+    from ..models.class_model import Class
+
+    student = aliased(Student)
+    class_ = aliased(Class)
+    return ListSerializer(Attendance, [
+        Field('id', Attendance.id),
+        Field('studentId', Attendance.student_id),
+        Field('studentName', student.first_name, student.last_name, build=full_name, join='student'),
+        Field('classId', Attendance.class_id),
+        Field('className', class_.name, join='class'),
+        Field('date', Attendance.date),
+        Field('status', Attendance.status),
+        Field('markedBy', Attendance.marked_by),
+        Field('notes', Attendance.notes),
+        Field('timeIn', Attendance.time_in),
+        Field('timeOut', Attendance.time_out),
+        Field('createdAt', Attendance.created_at),
+    ], joins={
+        'student': (student, student.id == Attendance.student_id),
+        'class': (class_, class_.id == Attendance.class_id),
+    })
+
+def _fee_serializer():
+    from ..models.fee import Fee
+    from ..models.student import Student
+
+    student = aliased(Student)
+    return ListSerializer(Fee, [
+        Field('id', Fee.id),
+        Field('studentId', Fee.student_id),
+        Field('studentName', student.first_name, student.last_name, build=full_name, join='student'),
+        Field('feeType', Fee.fee_type),
+        Field('amount', Fee.amount),
+        Field('dueDate', Fee.due_date),
+        Field('paidAmount', Fee.paid_amount),
+        Field('status', Fee.status),
+        Field('paymentDate', Fee.payment_date),
+        Field('paymentMethod', Fee.payment_method),
+        Field('semester', Fee.semester),
+        Field('academicYear', Fee.academic_year),
+        Field('transactionId', Fee.transaction_id),
+        Field('discountAmount', Fee.discount_amount),
+        Field('lateFee', Fee.late_fee),
+        Field('receiptNumber', Fee.receipt_number),
+        Field('createdAt', Fee.created_at),
+    ], joins={
+        'student': (student, student.id == Fee.student_id),
+    })
+
+def _announcement_serializer():
+    from ..models.announcement import Announcement
+    from ..models.user import User
+
+    author = aliased(User)
+    return ListSerializer(Announcement, [
+        Field('id', Announcement.id),
+        Field('title', Announcement.title),
+        Field('content', Announcement.content),
+        Field('authorId', Announcement.author_id),
+        Field('authorName', author.first_name, author.last_name, build=full_name, join='author'),
+        Field('targetAudience', Announcement.target_audience),
+        Field('priority', Announcement.priority),
+        Field('isActive', Announcement.is_active),
+        Field('createdAt', Announcement.created_at),
+        Field('expiresAt', Announcement.expires_at),
+        Field('attachmentUrl', Announcement.attachment_url),
+    ], joins={
+        'author': (author, author.id == Announcement.author_id),
+    })
+
+_FACTORIES = {
+    'student': _student_serializer,
+    'grade': _grade_serializer,
+    'attendance': _attendance_serializer,
+    'fee': _fee_serializer,
+    'announcement': _announcement_serializer,
+}
+
+_serializers = {}
+
+def get_serializer(name):
+    """Serializers are built on first use, once the mappers are configured."""
+    if name not in _serializers:
+        _serializers[name] = _FACTORIES[name]()
+    return _serializers[name]
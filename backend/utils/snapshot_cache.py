@@ -0,0 +1,125 @@
+
+import time
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'tables', 'lock', 'generation')
+
+    def __init__(self, tables):
+        self.value = None
+        self.fresh_until = 0.0
+        self.stale_until = 0.0
+        self.tables = frozenset(tables)
+        self.lock = threading.Lock()
+        self.generation = 0
+
+class SnapshotCache:
+    """Per-process cache of dashboard snapshots with write-driven invalidation.
+
+    Each entry remembers the tables it was built from. Committed writes to
+    any of those tables expire it at once; otherwise it expires after
+    ``ttl`` seconds. An expired entry is still served for up to
+    ``stale_ttl`` seconds while exactly one request rebuilds it
+    (stale-while-revalidate); only a missing or fully stale entry makes
+    callers wait, and then only for the one build in progress.
+    """
+
+    def __init__(self, ttl=60, stale_ttl=600):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('DASHBOARD_CACHE_TTL', self.ttl)
+        self.stale_ttl = app.config.get('DASHBOARD_CACHE_STALE_TTL', self.stale_ttl)
+        if not event.contains(Session, 'after_flush', _collect_changed_tables):
+            event.listen(Session, 'after_flush', _collect_changed_tables)
+            event.listen(Session, 'after_commit', _invalidate_committed_tables)
+            event.listen(Session, 'after_soft_rollback', _discard_changed_tables)
+
+    def _entry(self, key, tables):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(tables)
+            return entry
+
+    def fresh(self, key, default=None):
+        """The entry's value if it is fresh, otherwise ``default``; never builds."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry.fresh_until:
+            return entry.value
+        return default
+
+    def get_or_build(self, key, tables, builder):
+        entry = self._entry(key, tables)
+        now = time.monotonic()
+        if now < entry.fresh_until:
+            return entry.value
+
+        if now < entry.stale_until:
+            # Someone else is already rebuilding: serve the stale snapshot
+            if not entry.lock.acquire(blocking=False):
+                return entry.value
+        else:
+            entry.lock.acquire()
+        try:
+            # The snapshot may have been rebuilt while we waited for the lock
+            if time.monotonic() < entry.fresh_until:
+                return entry.value
+            started = time.monotonic()
+            generation = entry.generation
+            value = builder()
+            entry.value = value
+            entry.stale_until = started + self.ttl + self.stale_ttl
+            # A write that committed mid-build leaves the new snapshot expired
+            entry.fresh_until = started + self.ttl if entry.generation == generation else 0.0
+            return value
+        finally:
+            entry.lock.release()
+
+    def add_listener(self, callback):
+        """Also call ``callback(tables)`` whenever committed writes invalidate ``tables``."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def invalidate_tables(self, tables):
+        tables = set(tables)
+        if not tables:
+            return
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if entry.tables & tables]
+        for entry in entries:
+            entry.generation += 1
+            entry.fresh_until = 0.0
+        for listener in self._listeners:
+            listener(tables)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+snapshot_cache = SnapshotCache()
+
+def note_tables_changed(session, *tables):
+    """Record Core-level writes so they invalidate snapshots on commit."""
+    session.info.setdefault('snapshot_tables', set()).update(tables)
+
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault('snapshot_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            changed.add(table.name)
+
+def _invalidate_committed_tables(session):
+    tables = session.info.pop('snapshot_tables', None)
+    if tables:
+        snapshot_cache.invalidate_tables(tables)
+
+def _discard_changed_tables(session, previous_transaction):
+    session.info.pop('snapshot_tables', None)
@@ -0,0 +1,171 @@
+
+import csv
+from datetime import datetime
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+
+DEFAULT_IMPORT_CHUNK_SIZE = 500
+
+# CSV header -> Student column; headers match the JSON keys of create_student
+IMPORT_COLUMNS = {
+    'studentId': 'student_id',
+    'firstName': 'first_name',
+    'lastName': 'last_name',
+    'email': 'email',
+    'phone': 'phone',
+    'address': 'address',
+    'dateOfBirth': 'date_of_birth',
+    'grade': 'grade',
+    'guardianName': 'guardian_name',
+    'guardianPhone': 'guardian_phone',
+    'guardianEmail': 'guardian_email',
+    'medicalInfo': 'medical_info',
+    'emergencyContact': 'emergency_contact',
+    'transportMode': 'transport_mode',
+    'bloodGroup': 'blood_group'
+}
+
+REQUIRED_COLUMNS = ('studentId', 'firstName', 'lastName', 'email', 'grade')
+
+class ImportFormatError(ValueError):
+    """The upload as a whole is unusable (bad header, not CSV)."""
+
+def _parse_row(record):
+    # Every row carries every column (None when blank): one executemany
+    # compiles its INSERT from the first row's keys
+    values = dict.fromkeys(IMPORT_COLUMNS.values())
+    errors = []
+    for header, column in IMPORT_COLUMNS.items():
+        value = (record.get(header) or '').strip()
+        if not value:
+            if header in REQUIRED_COLUMNS:
+                errors.append(f'{header} is required')
+            continue
+        if header == 'dateOfBirth':
+            try:
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                errors.append('dateOfBirth must be YYYY-MM-DD')
+                continue
+        elif header == 'email' and '@' not in value:
+            errors.append('email is invalid')
+        values[column] = value
+    return values, errors
+
+class StudentImport:
+    """Validate and insert a CSV of students chunk by chunk.
+
+    Each chunk costs one uniqueness query for all its student ids and
+    emails, and one executemany INSERT inside a savepoint. If the INSERT
+    still conflicts (a concurrent write), the chunk is retried row by row
+    so only the offending rows fail. Headers in ``excluded_columns``
+    (fields the caller's role may not set) reject the whole upload.
+    """
+
+    def __init__(self, session, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE, dry_run=False, excluded_columns=()):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.excluded_columns = tuple(excluded_columns)
+        self.total = 0
+        self.imported = 0
+        self.errors = []
+        self._seen_ids = set()
+        self._seen_emails = set()
+
+    def run(self, text_stream):
+        reader = csv.DictReader(text_stream)
+        headers = set(reader.fieldnames or ())
+        missing = [header for header in REQUIRED_COLUMNS if header not in headers]
+        if missing:
+            raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+        unknown = sorted(headers - set(IMPORT_COLUMNS))
+        if unknown:
+            raise ImportFormatError(f"Unknown columns: {', '.join(unknown)}")
+        excluded = [header for header in self.excluded_columns if header in headers]
+        if excluded:
+            raise ImportFormatError(f"Columns not allowed for your role: {', '.join(excluded)}")
+
+        chunk = []
+        for record in reader:
+            self.total += 1
+            chunk.append((reader.line_num, record))
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk)
+                chunk = []
+        if chunk:
+            self._process(chunk)
+        return self
+
+    def _fail(self, line, values, messages):
+        self.errors.append({'row': line, 'studentId': values.get('student_id'), 'errors': messages})
+
+    def _process(self, chunk):
+        from ..models.student import Student
+
+        parsed = []
+        for line, record in chunk:
+            values, messages = _parse_row(record)
+            if not messages:
+                if values['student_id'] in self._seen_ids:
+                    messages.append('studentId is repeated in the file')
+                if values['email'] in self._seen_emails:
+                    messages.append('email is repeated in the file')
+                self._seen_ids.add(values['student_id'])
+                self._seen_emails.add(values['email'])
+            if messages:
+                self._fail(line, values, messages)
+            else:
+                parsed.append((line, values))
+        if not parsed:
+            return
+
+        table = Student.__table__
+        ids = [values['student_id'] for _, values in parsed]
+        emails = [values['email'] for _, values in parsed]
+        existing_ids = set()
+        existing_emails = set()
+        for student_id, email in self.session.execute(
+            select(table.c.student_id, table.c.email).where(
+                or_(table.c.student_id.in_(ids), table.c.email.in_(emails))
+            )
+        ):
+            existing_ids.add(student_id)
+            existing_emails.add(email)
+
+        rows = []
+        for line, values in parsed:
+            messages = []
+            if values['student_id'] in existing_ids:
+                messages.append('Student ID already exists')
+            if values['email'] in existing_emails:
+                messages.append('Email already registered')
+            if messages:
+                self._fail(line, values, messages)
+            else:
+                rows.append((line, values))
+        if not rows or self.dry_run:
+            self.imported += len(rows)
+            return
+
+        try:
+            with self.session.begin_nested():
+                self.session.execute(table.insert(), [values for _, values in rows])
+            self.imported += len(rows)
+        except IntegrityError:
+            for line, values in rows:
+                try:
+                    with self.session.begin_nested():
+                        self.session.execute(table.insert(), [values])
+                    self.imported += 1
+                except IntegrityError as e:
+                    self._fail(line, values, [f'Rejected by the database: {e.orig}'])
+
+    def report(self):
+        return {
+            'dryRun': self.dry_run,
+            'total': self.total,
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda error: error['row'])
+        }
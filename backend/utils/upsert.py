@@ -0,0 +1,32 @@
+
+from importlib import import_module
+
+class UnsupportedDialect(RuntimeError):
+    """A statement has no form for the database in use."""
+
+def upsert_statement(dialect_name, table, rows, key_columns, constraint,
+                     update_columns=(), increment_columns=()):
+    """INSERT ... ON CONFLICT for ``rows`` in the given dialect.
+
+    On a conflict on ``key_columns`` (the unique ``constraint``),
+    ``update_columns`` are overwritten with the new values and
+    ``increment_columns`` have the new values added to them.
+    """
+    # Only the dialect in use is imported
+    if dialect_name in ('sqlite', 'postgresql'):
+        stmt = import_module(f'sqlalchemy.dialects.{dialect_name}').insert(table).values(rows)
+        new = stmt.excluded
+    elif dialect_name in ('mysql', 'mariadb'):
+        stmt = import_module('sqlalchemy.dialects.mysql').insert(table).values(rows)
+        new = stmt.inserted
+    else:
+        raise UnsupportedDialect(f'Upsert is not supported on {dialect_name}')
+
+    values = {column: new[column] for column in update_columns}
+    values.update({column: table.c[column] + new[column] for column in increment_columns})
+
+    if dialect_name == 'sqlite':
+        return stmt.on_conflict_do_update(index_elements=list(key_columns), set_=values)
+    if dialect_name == 'postgresql':
+        return stmt.on_conflict_do_update(constraint=constraint, set_=values)
+    return stmt.on_duplicate_key_update(values)
@@ -0,0 +1,133 @@
+
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+AUTHZ_FIELDS = ('role', 'is_active')
+
+def user_claims(user):
+    """Extra JWT claims that let role checks skip the database."""
+    return {'role': user.role, 'is_active': bool(user.is_active)}
+
+class UserCache:
+    """In-process LRU/TTL cache of ``User.to_dict()`` snapshots.
+
+    A token's role claims are only trusted for ``ttl`` seconds after it was
+    issued; older tokens are checked against the cached user instead. A
+    role change or deactivation saved in this process takes effect here at
+    once (tokens issued before it stop being trusted). Other workers know
+    nothing of it, so there it takes effect within ``ttl`` seconds, when
+    both their copy of the user and the token's claims have expired.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._authz_changed_at = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        if not event.contains(Session, 'after_flush', _collect_user_changes):
+            event.listen(Session, 'after_flush', _collect_user_changes)
+            event.listen(Session, 'after_commit', _apply_user_changes)
+            event.listen(Session, 'after_soft_rollback', _discard_user_changes)
+
+    def get(self, user_id):
+        key = int(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def set(self, user_id, snapshot):
+        key = int(user_id)
+        with self._lock:
+            self._entries[key] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._authz_changed_at.clear()
+
+    def mark_authz_changed(self, user_id):
+        now = time.time()
+        with self._lock:
+            self._authz_changed_at[int(user_id)] = now
+            # Claims that old are no longer trusted anyway
+            cutoff = now - self.ttl
+            for key in [k for k, at in self._authz_changed_at.items() if at < cutoff]:
+                del self._authz_changed_at[key]
+
+    def claims_are_current(self, user_id, issued_at):
+        """Whether a token issued at ``issued_at`` may be trusted for its claims."""
+        if time.time() - issued_at >= self.ttl:
+            return False
+        with self._lock:
+            changed_at = self._authz_changed_at.get(int(user_id))
+        return changed_at is None or issued_at > changed_at
+
+user_cache = UserCache()
+
+def _collect_user_changes(session, flush_context):
+    from ..models.user import User
+
+    pending = session.info.setdefault('user_cache_pending', {})
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, User) or obj.id is None:
+            continue
+        state = inspect(obj)
+        authz_changed = obj not in session.new and any(
+            state.attrs[field].history.has_changes() for field in AUTHZ_FIELDS
+        )
+        _, was_changed = pending.get(obj.id, (None, False))
+        pending[obj.id] = (obj.to_dict(), authz_changed or was_changed)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending[obj.id] = (None, True)
+
+def _apply_user_changes(session):
+    pending = session.info.pop('user_cache_pending', None)
+    if not pending:
+        return
+    for user_id, (snapshot, authz_changed) in pending.items():
+        if authz_changed:
+            user_cache.mark_authz_changed(user_id)
+        if snapshot is None:
+            user_cache.invalidate(user_id)
+        else:
+            user_cache.set(user_id, snapshot)
+
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop('user_cache_pending', None)
+
+def get_user_snapshot(user_id):
+    """Cached ``to_dict()`` of a user, loaded from the database on a miss."""
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        from ..app import db
+        from ..models.user import User
+
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        snapshot = user.to_dict()
+        user_cache.set(user.id, snapshot)
+    return snapshot
@@ -0,0 +1,100 @@
+
+import os
+import atexit
+import logging
+import threading
+from sqlalchemy import update, bindparam
+
+logger = logging.getLogger(__name__)
+
+class LastLoginBuffer:
+    """Write-behind buffer for ``User.last_login``.
+
+    Successful logins only record a timestamp in memory. A background thread
+    writes the latest timestamp per user in one executemany UPDATE every
+    ``interval`` seconds, or sooner once ``batch_size`` users are waiting,
+    so a login burst takes the database write lock a handful of times
+    instead of once per login.
+    """
+
+    def __init__(self, interval=5.0, batch_size=500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('LAST_LOGIN_FLUSH_INTERVAL', self.interval)
+        self.batch_size = app.config.get('LAST_LOGIN_BATCH_SIZE', self.batch_size)
+        atexit.register(self.flush)
+
+    def record(self, user_id, when):
+        with self._lock:
+            current = self._pending.get(user_id)
+            if current is None or when > current:
+                self._pending[user_id] = when
+            full = len(self._pending) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # The flusher thread does not survive a fork; start one per process
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='last-login-flusher', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to flush last_login updates')
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch or self.app is None:
+            return 0
+
+        from ..app import db
+        from ..models.user import User
+        from .user_cache import user_cache
+
+        table = User.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('user_id'))
+            # A login is not an edit: keep updated_at (and the ETags built on it)
+            .values(last_login=bindparam('login_at'), updated_at=table.c.updated_at)
+        )
+        params = [{'user_id': user_id, 'login_at': when} for user_id, when in batch.items()]
+        try:
+            with self.app.app_context():
+                db.session.execute(stmt, params)
+                db.session.commit()
+        except Exception:
+            # Put the batch back so the next flush retries it
+            with self._lock:
+                for user_id, when in batch.items():
+                    current = self._pending.get(user_id)
+                    if current is None or when > current:
+                        self._pending[user_id] = when
+            raise
+        for user_id in batch:
+            user_cache.invalidate(user_id)
+        return len(batch)
+
+last_login_buffer = LastLoginBuffer()